@@ -0,0 +1,116 @@
+import asyncio
+import weakref
+
+import httpx
+
+from flight_search import IATA_CODE_PATTERN, THROTTLE_RETRIES, FlightSearch
+
+# Connections kept to Kiwi API per event loop. Searches beyond this wait for
+# a free connection instead of opening new ones.
+MAX_CONNECTIONS = 100
+
+
+class AsyncFlightSearch:
+    """
+    Non-blocking search of the cheapest flights of one route.
+
+    Queries are built and results converted by a `FlightSearch`, so both
+    return the same FlightData; only the HTTP call differs. Requests go
+    through an `httpx.AsyncClient` pooled per event loop and wait for the
+    rate limiter with `asyncio.sleep`, its file lock being taken on a worker
+    thread, so a single worker can hold hundreds
+    of searches in flight. Cancelling the awaiting task closes the
+    connection to Kiwi API.
+
+    Attributes:
+        flight_search (FlightSearch): Builds the queries and the FlightData objects.
+        timeout (httpx.Timeout): Connect and read timeouts of every call.
+        limits (httpx.Limits): Connection pool size of every client.
+        transport (httpx.AsyncBaseTransport): Transport of the clients, mainly to stub Kiwi API.
+    """
+
+    def __init__(self, flight_search=None, timeout=None, limits=None, transport=None):
+        self.flight_search = flight_search or FlightSearch()
+        self.timeout = timeout or httpx.Timeout(30, connect=5)
+        self.limits = limits or httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=20)
+        self.transport = transport
+        # An AsyncClient is bound to the loop that opened its connections.
+        self._clients = weakref.WeakKeyDictionary()
+
+    def client(self):
+        """
+        Return the client of the running event loop, creating it on first use.
+
+        Returns:
+            httpx.AsyncClient: The pooled client.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(
+                base_url=self.flight_search.BASE_URL,
+                # requests drops unset headers; httpx refuses them.
+                headers={name: value for name, value in self.flight_search.HEADERS.items() if value is not None},
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self.transport,
+            )
+        return client
+
+    async def aclose(self):
+        """Close the client of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def search_route(self, from_code, to_code, max_stopovers=0, limit=10):
+        """
+        Searches the cheapest flights of a route.
+
+        Args:
+            from_code (str): IATA code of the departure city.
+            to_code (str): IATA code of the destination.
+            max_stopovers (int): Maximum number of stopovers allowed. Defaults to 0.
+            limit (int): Maximum number of flights returned. Defaults to 10.
+
+        Returns:
+            list: FlightData objects, cheapest first.
+
+        Raises:
+            ValueError: If an argument is invalid.
+            httpx.HTTPError: If Kiwi API could not be reached or answered with an error.
+        """
+        # Only codes are accepted: resolving a city name may call Kiwi API synchronously.
+        for code in (from_code, to_code):
+            if not isinstance(code, str) or not IATA_CODE_PATTERN.match(code):
+                raise ValueError(f"'{code}' is not an IATA code.")
+        _, _, params = self.flight_search._prepare_search([from_code], [to_code], max_stopovers, limit)
+        response = await self._get(self.flight_search.SEARCH, params)
+        response.raise_for_status()
+        try:
+            results = response.json()["data"]
+        except (ValueError, KeyError) as e:
+            raise httpx.DecodingError(f"Malformed search response: {e}", request=response.request) from e
+        return [self.flight_search._build_flight_data(result, max_stopovers) for result in results]
+
+    async def _get(self, endpoint, params):
+        """
+        Sends a GET request to Kiwi API through the rate limiter, retrying throttled (429) calls.
+
+        Args:
+            endpoint (str): Endpoint path appended to the base URL.
+            params (dict): Query parameters.
+
+        Returns:
+            httpx.Response: The response of the last attempt.
+        """
+        rate_limiter = self.flight_search.rate_limiter
+        for _ in range(THROTTLE_RETRIES + 1):
+            await rate_limiter.aacquire()
+            response = await self.client().get(endpoint, params=params)
+            # Both take the file lock of the shared limiter state.
+            if response.status_code != 429:
+                await asyncio.to_thread(rate_limiter.on_success)
+                return response
+            await asyncio.to_thread(rate_limiter.on_throttled, response.headers.get("Retry-After"))
+        return response
@@ -0,0 +1,245 @@
+"""
+End-to-end throughput benchmark for PriceTracker against the local stand-in server.
+
+Runs main.py's full flow (reset, IATA update, lowest-price search and
+notification) in a scratch copy of `destinations/`, with empty caches, and
+reports wall time per phase, throughput, p50/p99 latency per endpoint and
+Kiwi calls per route.
+
+Usage, from the repository root:
+
+    python -m benchmarks.benchmark asia --latency 0.2 --workers 8
+"""
+import argparse
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from email.message import EmailMessage
+from urllib.parse import urlsplit
+
+from benchmarks.stub_server import StubConfig, StubServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("continent", nargs="?", default="asia")
+    parser.add_argument("--runs", type=int, default=1, help="Number of full sweeps to run.")
+    parser.add_argument("--workers", type=int, default=8, help="PriceTracker max_workers.")
+    parser.add_argument("--destinations-per-query", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean stub latency in seconds.")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Stub latency jitter in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Probability of a 429 on Kiwi calls.")
+    parser.add_argument("--results", type=int, default=5, help="Itineraries generated per route.")
+    parser.add_argument("--rate-limit", type=float, default=1000.0, help="Kiwi requests per second allowed.")
+    parser.add_argument("--strip-iata", action="store_true", help="Drop stored IATA codes to exercise lookups.")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep caches between runs.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """
+    Run the benchmark described by the parsed arguments.
+
+    Returns:
+        dict: The benchmark report.
+    """
+    config = StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        results_per_pair=args.results,
+    )
+    workdir = tempfile.mkdtemp(prefix="flighttracker-bench-")
+    previous_cwd = os.getcwd()
+    try:
+        with StubServer(config) as stub:
+            os.environ.update(
+                {
+                    "KIWI_BASE_URL": stub.base_url,
+                    "SHEETY_BASE_URL": f"{stub.base_url}/sheety",
+                    "KIWI_API_KEY": "benchmark",
+                    "KIWI_RATE_LIMIT": str(args.rate_limit),
+                    "KIWI_RATE_BURST": str(max(1, int(args.rate_limit))),
+                    "FLIGHT_CACHE_DIR": os.path.join(workdir, ".cache"),
+                    "FLIGHT_DESTINATIONS_DIR": os.path.join(workdir, "destinations"),
+                }
+            )
+            os.chdir(workdir)
+            sys.path.insert(0, REPO_ROOT)
+            return _run_sweeps(args, stub, workdir)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _prepare_destinations(workdir, strip_iata):
+    """Start a run from a pristine copy of the destination files."""
+    destinations_dir = os.path.join(workdir, "destinations")
+    shutil.rmtree(destinations_dir, ignore_errors=True)
+    shutil.copytree(os.path.join(REPO_ROOT, "destinations"), destinations_dir)
+    if not strip_iata:
+        return
+    for file_name in os.listdir(destinations_dir):
+        path = os.path.join(destinations_dir, file_name)
+        with open(path, "r") as destinations_file:
+            data = json.load(destinations_file)
+        for destination in data["destinations"].values():
+            destination["iataCode"] = ""
+        with open(path, "w") as destinations_file:
+            json.dump(data, destinations_file)
+
+
+def _run_sweeps(args, stub, workdir):
+    # Imported here so the environment above is in place before module level
+    # configuration (cache directory, rate limits) is read.
+    import pyshorteners.shorteners.tinyurl as tinyurl
+    from http_client import HttpClient
+    from main import PriceTracker
+    from notification_manager import NotificationManager
+
+    class TimedHttpClient(HttpClient):
+        """HttpClient recording the latency of every request per endpoint."""
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.latencies = defaultdict(list)
+
+        def request(self, method, url, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().request(method, url, **kwargs)
+            finally:
+                path = urlsplit(url).path
+                self.latencies[f"{method.upper()} {path}"].append(time.perf_counter() - started)
+
+    class StubNotificationManager(NotificationManager):
+        """NotificationManager sending through the stand-in Gmail endpoint."""
+
+        def __init__(self, base_url, http_client):
+            super().__init__()
+            self.base_url = base_url
+            self.http_client = http_client
+
+        def send_email(self, text):
+            message = EmailMessage()
+            message.set_content(text)
+            message["Subject"] = "New cheap flights found!"
+            encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
+            response = self.http_client.post(
+                f"{self.base_url}/gmail/v1/users/me/messages/send", json={"raw": encoded_message}
+            )
+            return response.json()
+
+    original_tinyurl = tinyurl.Shortener.api_url
+    tinyurl.Shortener.api_url = f"{stub.base_url}/api-create.php"
+    client = TimedHttpClient(backoff_factor=0.05)
+    phases = defaultdict(list)
+
+    @contextmanager
+    def timed(phase):
+        started = time.perf_counter()
+        yield
+        phases[phase].append(time.perf_counter() - started)
+
+    try:
+        routes = 0
+        for run_index in range(args.runs):
+            if run_index and not args.warm_cache:
+                shutil.rmtree(os.path.join(workdir, ".cache"), ignore_errors=True)
+            _prepare_destinations(workdir, args.strip_iata)
+            tracker = PriceTracker(
+                max_workers=args.workers, destinations_per_query=args.destinations_per_query
+            )
+            tracker.flight_searcher.http_client = client
+            tracker.data_manager.http_client = client
+            tracker.notification_manager = StubNotificationManager(stub.base_url, client)
+
+            with timed("total"):
+                with timed("reset"):
+                    tracker.reset_lowest_prices(args.continent)
+                destination_data = tracker.load_data(args.continent)
+                with timed("iata"):
+                    tracker.update_iata_codes(args.continent, destination_data)
+                with timed("search"):
+                    tracker.find_lowest_prices(args.continent, destination_data)
+                with timed("sheet"):
+                    tracker.sync_sheet(destination_data)
+            routes += len(destination_data["departure_cities"]) * len(destination_data["destinations"])
+    finally:
+        tinyurl.Shortener.api_url = original_tinyurl
+        client.close()
+
+    stats = stub.stats()
+    total_time = sum(phases["total"])
+    search_calls = stats["calls"].get("/v2/search", 0)
+    return {
+        "continent": args.continent,
+        "runs": args.runs,
+        "routes": routes,
+        "phases": {phase: round(sum(times) / len(times), 4) for phase, times in phases.items()},
+        "routes_per_second": round(routes / total_time, 2) if total_time else None,
+        "requests_per_second": round(sum(stats["calls"].values()) / total_time, 2) if total_time else None,
+        "kiwi_search_calls_per_route": round(search_calls / routes, 3) if routes else None,
+        "server_calls": stats["calls"],
+        "server_statuses": stats["statuses"],
+        "latency": {
+            endpoint: {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+            }
+            for endpoint, samples in sorted(client.latencies.items())
+        },
+        "notifications_sent": len(stub.sent_messages),
+    }
+
+
+def print_report(report):
+    print(f"Continent: {report['continent']} ({report['runs']} run(s), {report['routes']} routes)")
+    for phase, seconds in report["phases"].items():
+        print(f"  {phase:<8} {seconds:8.3f}s")
+    print(f"Throughput: {report['routes_per_second']} routes/s, {report['requests_per_second']} requests/s")
+    print(f"Kiwi search calls per route: {report['kiwi_search_calls_per_route']}")
+    print("Latency per endpoint:")
+    for endpoint, latency in report["latency"].items():
+        print(
+            f"  {endpoint:<45} n={latency['count']:<5} "
+            f"p50={latency['p50_ms']:>8.2f}ms p99={latency['p99_ms']:>8.2f}ms"
+        )
+    print("Server responses:")
+    for status, count in sorted(report["server_statuses"].items()):
+        print(f"  {status:<45} {count}")
+    print(f"Notifications sent: {report['notifications_sent']}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
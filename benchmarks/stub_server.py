@@ -0,0 +1,278 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubConfig:
+    """
+    Behaviour of the stand-in server.
+
+    Attributes:
+        latency (float): Mean latency in seconds added to every response.
+        jitter (float): Maximum random deviation in seconds from `latency`.
+        error_rate (float): Probability of answering a request with a 503.
+        throttle_rate (float): Probability of answering a Kiwi request with a 429.
+        results_per_pair (int): Itineraries generated per origin/destination pair in a search.
+        seed (int): Seed for the random generator, so runs are reproducible.
+    """
+
+    def __init__(
+        self,
+        latency=0.05,
+        jitter=0.02,
+        error_rate=0.0,
+        throttle_rate=0.0,
+        results_per_pair=5,
+        seed=42,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.results_per_pair = results_per_pair
+        self.seed = seed
+
+
+class StubServer:
+    """
+    A local stand-in for Kiwi (Tequila), Sheety, Gmail and TinyURL.
+
+    Endpoints:
+        GET  /locations/query                   Kiwi location lookup.
+        GET  /v2/search                         Kiwi search, honouring comma separated fly_from/fly_to.
+        GET  /sheety/prices, PUT /sheety/prices/<id>   GET honours If-None-Match.
+        GET  /sheety/users,  POST /sheety/users
+        POST /gmail/v1/users/me/messages/send   Gmail send.
+        GET  /api-create.php                    TinyURL shortening.
+
+    Every request is recorded, see `stats`.
+
+    Attributes:
+        config (StubConfig): Latency, error and result size settings.
+        base_url (str): URL the server listens on, available after `start`.
+    """
+
+    KIWI_ENDPOINTS = ("/locations/query", "/v2/search")
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StubConfig()
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.base_url = f"http://{host}:{self._server.server_port}"
+        self.prices = [
+            {"id": row_id, "city": f"City {row_id}", "iataCode": "", "lowestPrice": 1500}
+            for row_id in range(2, 12)
+        ]
+        self.users = []
+        self.sent_messages = []
+        self.reset_stats()
+
+    def start(self):
+        """Serve requests from a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reset_stats(self):
+        """Forget every recorded request."""
+        with self._stats_lock:
+            self._calls = defaultdict(int)
+            self._statuses = defaultdict(int)
+            self._route_calls = defaultdict(int)
+
+    def stats(self):
+        """
+        Return what the server has seen since the last reset.
+
+        Returns:
+            dict: `calls` per endpoint, `statuses` per (endpoint, status) and
+            `route_calls` per "FROM-TO" pair queried through /v2/search.
+        """
+        with self._stats_lock:
+            return {
+                "calls": dict(self._calls),
+                "statuses": {f"{endpoint} {code}": count for (endpoint, code), count in self._statuses.items()},
+                "route_calls": dict(self._route_calls),
+            }
+
+    def _record(self, endpoint, status):
+        with self._stats_lock:
+            self._calls[endpoint] += 1
+            self._statuses[(endpoint, status)] += 1
+
+    def _roll(self):
+        with self._random_lock:
+            return self._random.random()
+
+    def _delay(self):
+        with self._random_lock:
+            jitter = self._random.uniform(-self.config.jitter, self.config.jitter)
+        time.sleep(max(0.0, self.config.latency + jitter))
+
+    def _search(self, query):
+        origins = query.get("fly_from", [""])[0].split(",")
+        destinations = query.get("fly_to", [""])[0].split(",")
+        limit = int(query.get("limit", ["1"])[0])
+        with self._stats_lock:
+            for origin in origins:
+                for destination in destinations:
+                    self._route_calls[f"{origin}-{destination}"] += 1
+
+        today = datetime.now()
+        data = []
+        with self._random_lock:
+            for origin in origins:
+                for destination in destinations:
+                    for _ in range(self.config.results_per_pair):
+                        departure = today + timedelta(days=self._random.randint(7, 180))
+                        arrival = departure + timedelta(days=self._random.randint(5, 20))
+                        data.append(
+                            {
+                                "flyFrom": origin,
+                                "flyTo": destination,
+                                "cityCodeFrom": origin,
+                                "cityCodeTo": destination,
+                                "cityFrom": origin,
+                                "cityTo": destination,
+                                "price": self._random.randint(150, 2000),
+                                "deep_link": f"https://www.kiwi.com/deep?from={origin}&to={destination}"
+                                             f"&id={self._random.getrandbits(32)}",
+                                "route": [
+                                    {
+                                        "cityTo": destination,
+                                        "airline": self._random.choice(["AM", "UA", "TK", "NH"]),
+                                        "local_departure": departure.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                                        "local_arrival": departure.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                                    },
+                                    {
+                                        "cityTo": origin,
+                                        "airline": "AM",
+                                        "local_departure": arrival.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                                        "local_arrival": arrival.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                                    },
+                                ],
+                            }
+                        )
+        data.sort(key=lambda itinerary: itinerary["price"])
+        if query.get("one_for_city", ["0"])[0] == "1":
+            cheapest = {}
+            for itinerary in data:
+                cheapest.setdefault(itinerary["flyTo"], itinerary)
+            data = list(cheapest.values())
+        data = data[:limit]
+        return {"_results": len(data), "data": data}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, endpoint, status, body=None, content_type="application/json", headers=None):
+                stub._record(endpoint, status)
+                if body is None:
+                    payload = b""
+                elif isinstance(body, str):
+                    payload = body.encode()
+                else:
+                    payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_json(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if not length:
+                    return {}
+                return json.loads(self.rfile.read(length))
+
+            def _handle(self, method):
+                parts = urlsplit(self.path)
+                path = parts.path
+                query = parse_qs(parts.query)
+                body = self._read_json() if method in ("POST", "PUT") else {}
+                stub._delay()
+
+                if path.startswith("/sheety/prices/"):
+                    endpoint = "/sheety/prices/<id>"
+                else:
+                    endpoint = path
+
+                if stub._roll() < stub.config.error_rate:
+                    return self._send(endpoint, 503, {"error": "stub error"})
+                if endpoint in stub.KIWI_ENDPOINTS and stub._roll() < stub.config.throttle_rate:
+                    return self._send(endpoint, 429, {"error": "too many requests"})
+
+                if method == "GET" and path == "/locations/query":
+                    term = query.get("term", [""])[0]
+                    code = "".join(char for char in term.upper() if char.isalpha())[:3]
+                    return self._send(endpoint, 200, {"locations": [{"code": code}]})
+                if method == "GET" and path == "/v2/search":
+                    return self._send(endpoint, 200, stub._search(query))
+                if method == "GET" and path == "/sheety/prices":
+                    etag = f'"{hashlib.sha1(json.dumps(stub.prices).encode()).hexdigest()}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._send(endpoint, 304, headers={"ETag": etag})
+                    return self._send(endpoint, 200, {"prices": stub.prices}, headers={"ETag": etag})
+                if method == "PUT" and endpoint == "/sheety/prices/<id>":
+                    row_id = int(path.rsplit("/", 1)[1])
+                    for row in stub.prices:
+                        if row["id"] == row_id:
+                            row.update(body.get("price", {}))
+                            return self._send(endpoint, 200, {"price": row})
+                    return self._send(endpoint, 404, {"error": "not found"})
+                if method == "GET" and path == "/sheety/users":
+                    return self._send(endpoint, 200, {"users": stub.users})
+                if method == "POST" and path == "/sheety/users":
+                    user = dict(body.get("user", {}), id=len(stub.users) + 2)
+                    stub.users.append(user)
+                    return self._send(endpoint, 200, {"user": user})
+                if method == "POST" and path == "/gmail/v1/users/me/messages/send":
+                    stub.sent_messages.append(body.get("raw"))
+                    return self._send(endpoint, 200, {"id": f"stub-{len(stub.sent_messages)}"})
+                if method == "GET" and path == "/api-create.php":
+                    with stub._random_lock:
+                        token = stub._random.getrandbits(40)
+                    return self._send(endpoint, 200, f"https://tinyurl.com/{token:x}", "text/plain")
+                return self._send(endpoint, 404, {"error": "unknown endpoint"})
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_PUT(self):
+                self._handle("PUT")
+
+        return Handler
@@ -0,0 +1,356 @@
+import glob
+import json
+import os
+import threading
+import time
+
+from destination_store import DESTINATIONS_DIR
+from file_lock import file_lock
+
+# Resolved from this file rather than the working directory, so main.py and
+# the Django commands share the same caches and rate limiter state.
+CACHE_DIR = os.getenv("FLIGHT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+
+
+class PersistentCache:
+    """
+    A small on-disk key/value cache with TTL and LRU eviction.
+
+    Entries are kept in memory and mirrored on disk, so every process on the
+    host that points at the same file shares the same entries. Like the
+    destination store, the file is a JSON snapshot plus an append-only
+    journal of the entries stored since: storing an entry appends one line
+    under a file lock instead of rewriting every entry. Once the journal
+    holds more records than there are live entries, or the cache outgrows
+    `max_entries`, it is folded into a new snapshot that replaces the old one
+    atomically, so writes cost amortised O(1).
+
+    Attributes:
+        path (str): Location of the JSON snapshot backing the cache.
+        journal_path (str): Location of the journal of entries stored since the snapshot.
+        ttl (float): Seconds an entry stays fresh. None means entries never expire.
+        max_entries (int): Maximum number of entries kept before the least recently used are evicted.
+    """
+
+    def __init__(self, path, ttl=None, max_entries=1024):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        # key -> [value, stored_at, last_used]
+        self._entries = {}
+        self._mtime = None
+        # Bytes and records of the journal already merged into `_entries`.
+        self._journal_offset = 0
+        self._journal_records = 0
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for a key.
+
+        Args:
+            key (str): Cache key.
+            default: Value returned when the key is missing or expired.
+
+        Returns:
+            The cached value, or `default`.
+        """
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None or not self._is_fresh(entry, now):
+                return default
+            entry[2] = now
+            return entry[0]
+
+    def get_with_age(self, key):
+        """
+        Return the cached value for a key together with its age.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            tuple: (value, age in seconds), or (None, None) when the key is missing or expired.
+        """
+        with self._lock:
+            self._reload()
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None or not self._is_fresh(entry, now):
+                return None, None
+            entry[2] = now
+            return entry[0], now - entry[1]
+
+    def set(self, key, value):
+        """
+        Store a value and persist it to disk.
+
+        Args:
+            key (str): Cache key.
+            value: Any JSON serialisable value.
+        """
+        self.update({key: value})
+
+    def update(self, items, overwrite=True):
+        """
+        Store several values with a single write to disk.
+
+        Args:
+            items (dict): Mapping of keys to JSON serialisable values.
+            overwrite (bool): When False, fresh entries already in the cache are kept as they are.
+        """
+        with self._lock, file_lock(self.path):
+            self._reload()
+            now = time.time()
+            records = {}
+            for key, value in items.items():
+                entry = self._entries.get(key)
+                if not overwrite and entry is not None and self._is_fresh(entry, now):
+                    continue
+                records[key] = self._entries[key] = [value, now, now]
+            if not records:
+                return
+            if self._journal_records + len(records) > len(self._entries) or len(self._entries) > self.max_entries:
+                self._evict(now)
+                self._write()
+            else:
+                self._append(records)
+
+    def _is_fresh(self, entry, now):
+        return self.ttl is None or now - entry[1] < self.ttl
+
+    def _merge(self, key, entry):
+        current = self._entries.get(key)
+        if current is None or entry[1] > current[1]:
+            self._entries[key] = entry
+        else:
+            current[2] = max(current[2], entry[2])
+
+    def _reload(self):
+        """Merge entries written by other processes since the last read."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            # A new snapshot, with the journal written before it folded in.
+            try:
+                with open(self.path, "r") as cache_file:
+                    on_disk = json.load(cache_file)
+            except (OSError, ValueError):
+                on_disk = {}
+            for key, entry in on_disk.items():
+                self._merge(key, entry)
+            self._mtime = mtime
+            self._journal_offset = 0
+            self._journal_records = 0
+        self._read_journal()
+
+    def _read_journal(self):
+        try:
+            if os.path.getsize(self.journal_path) == self._journal_offset:
+                return
+            with open(self.journal_path, "rb") as journal:
+                journal.seek(self._journal_offset)
+                data = journal.read()
+        except OSError:
+            return
+        # A line still being appended is read on the next reload.
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                key, entry = json.loads(line)
+            except ValueError:
+                # A torn line from a crash mid-append; the records around it are intact.
+                continue
+            self._merge(key, entry)
+            self._journal_records += 1
+        self._journal_offset += end
+
+    def _evict(self, now):
+        self._entries = {
+            key: entry
+            for key, entry in self._entries.items()
+            if self._is_fresh(entry, now)
+        }
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            by_last_use = sorted(self._entries, key=lambda key: self._entries[key][2])
+            for key in by_last_use[:overflow]:
+                del self._entries[key]
+
+    def _append(self, records):
+        """Append entries to the journal; the file lock must be held."""
+        with open(self.journal_path, "ab") as journal:
+            lines = b"".join(json.dumps([key, entry]).encode() + b"\n" for key, entry in records.items())
+            if journal.tell() > self._journal_offset:
+                # Bytes left by a writer that crashed mid-line: start on a line of our own.
+                lines = b"\n" + lines
+            journal.write(lines)
+            self._journal_offset = journal.tell()
+        self._journal_records += len(records)
+
+    def _write(self):
+        """Fold every entry into a new snapshot and empty the journal; the file lock must be held."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(self._entries, cache_file)
+        os.replace(tmp_path, self.path)
+        open(self.journal_path, "w").close()
+        self._mtime = os.path.getmtime(self.path)
+        self._journal_offset = 0
+        self._journal_records = 0
+
+
+class IataCodeCache(PersistentCache):
+    """
+    City name to IATA code cache, pre-seeded from the destination files.
+
+    Keys are case-folded city names.
+    """
+
+    def __init__(
+        self,
+        path=os.path.join(CACHE_DIR, "iata_codes.json"),
+        ttl=30 * 24 * 60 * 60,
+        max_entries=5000,
+        destinations_dir=DESTINATIONS_DIR,
+    ):
+        super().__init__(path, ttl=ttl, max_entries=max_entries)
+        self.seed_from_destinations(destinations_dir)
+
+    @staticmethod
+    def key(city):
+        """Return the normalised cache key for a city name."""
+        return city.strip().casefold()
+
+    def seed_from_destinations(self, destinations_dir):
+        """
+        Load every known `iataCode` from the destination JSON files.
+
+        Args:
+            destinations_dir (str): Directory holding the `<continent>.json` files.
+        """
+        codes = {}
+        for file_name in glob.glob(os.path.join(destinations_dir, "*.json")):
+            try:
+                with open(file_name, "r") as destinations_file:
+                    destinations = json.load(destinations_file)["destinations"]
+            except (OSError, ValueError, KeyError):
+                continue
+            for destination in destinations.values():
+                if destination.get("iataCode"):
+                    codes[self.key(destination["city"])] = destination["iataCode"]
+        if codes:
+            self.update(codes, overwrite=False)
+
+
+class ResponseCache(PersistentCache):
+    """
+    Cache of search results keyed on the normalised query parameters.
+
+    Entries younger than `fresh_ttl` are served as they are. Entries older
+    than that but still within `stale_ttl` are served immediately while a
+    background refresh replaces them (stale-while-revalidate).
+
+    Attributes:
+        fresh_ttl (float): Seconds an entry is served without revalidation.
+        stale_ttl (float): Extra seconds a stale entry may still be served while it is refreshed.
+    """
+
+    def __init__(
+        self,
+        path=os.path.join(CACHE_DIR, "search_responses.json"),
+        fresh_ttl=60 * 60,
+        stale_ttl=6 * 60 * 60,
+        max_entries=2000,
+    ):
+        super().__init__(path, ttl=fresh_ttl + stale_ttl, max_entries=max_entries)
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        # key -> thread refreshing it
+        self._refreshing = {}
+
+    @staticmethod
+    def key(params):
+        """
+        Return the cache key for a set of query parameters.
+
+        Comma separated location lists are upper-cased and sorted so the same
+        cities in a different order share an entry.
+
+        Args:
+            params (dict): Query parameters of the search.
+
+        Returns:
+            str: The normalised key.
+        """
+        normalised = {}
+        for name, value in params.items():
+            if name in ("fly_from", "fly_to"):
+                value = ",".join(sorted(code.strip().upper() for code in str(value).split(",")))
+            normalised[name] = str(value)
+        return json.dumps(normalised, sort_keys=True)
+
+    def fetch(self, params, loader):
+        """
+        Return cached results for the parameters, loading them on a miss.
+
+        Args:
+            params (dict): Query parameters of the search.
+            loader (callable): Called without arguments to fetch fresh results. Returning None means the
+                fetch failed and nothing is cached.
+
+        Returns:
+            The cached or freshly loaded results, or None if they could not be loaded.
+        """
+        key = self.key(params)
+        value, age = self.get_with_age(key)
+        if value is not None:
+            if age >= self.fresh_ttl:
+                self._revalidate(key, loader)
+            return value
+
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def join_refreshes(self, timeout=None):
+        """
+        Wait for the background refreshes in flight.
+
+        Refresh threads are not daemonic, so the interpreter (and every
+        worker process) also waits for them before exiting.
+
+        Args:
+            timeout (float): Seconds to wait for each refresh. None waits until they finish.
+        """
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def _revalidate(self, key, loader):
+        """Refresh a stale entry in the background, once per key at a time."""
+
+        def refresh():
+            try:
+                value = loader()
+                if value is not None:
+                    self.set(key, value)
+            finally:
+                with self._lock:
+                    self._refreshing.pop(key, None)
+
+        with self._lock:
+            if key in self._refreshing:
+                return
+            thread = self._refreshing[key] = threading.Thread(target=refresh)
+            thread.start()
@@ -0,0 +1,155 @@
+import bisect
+import difflib
+import glob
+import json
+import os
+import unicodedata
+
+from destination_store import DESTINATIONS_DIR
+
+# Keys ranked per prefix search at most. Very broad prefixes ("s") match
+# thousands of keys; ranking the first ones in alphabetical order keeps a
+# lookup well under a millisecond.
+SCAN_LIMIT = 200
+
+
+def fold(text):
+    """
+    Return the case and accent insensitive form of a name.
+
+    Args:
+        text (str): A city name or query, e.g. "São Paulo".
+
+    Returns:
+        str: The folded text with single spaces, e.g. "sao paulo".
+    """
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def destination_cities(destinations_dir=DESTINATIONS_DIR):
+    """
+    Yield every city with a known IATA code in the destination files.
+
+    Args:
+        destinations_dir (str): Directory holding the `<continent>.json` files.
+
+    Yields:
+        tuple: (city name, IATA code).
+    """
+    for file_name in sorted(glob.glob(os.path.join(destinations_dir, "*.json"))):
+        try:
+            with open(file_name, "r") as destinations_file:
+                destinations = json.load(destinations_file)["destinations"]
+        except (OSError, ValueError, KeyError):
+            continue
+        for destination in destinations.values():
+            if destination.get("iataCode"):
+                yield destination["city"], destination["iataCode"]
+
+
+class CityIndex:
+    """
+    In-memory prefix index of city names and IATA codes.
+
+    Every word of a folded name, and the code itself, is a key in a sorted
+    array, so a prefix lookup is a binary search followed by a short scan:
+    "sao", "paulo" and "gru" all find São Paulo. Queries matching no prefix
+    fall back to fuzzy matching of whole names starting with the same
+    letter, to absorb typos.
+
+    Attributes:
+        fuzzy_cutoff (float): Minimum similarity, between 0 and 1, of a fuzzy match.
+    """
+
+    def __init__(self, cities=(), fuzzy_cutoff=0.75):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        entries = set()
+        self._codes = {}
+        for name, code in cities:
+            code = code.strip().upper()
+            folded = fold(name)
+            self._codes.setdefault(folded, code)
+            entries.add((folded, folded, name, code))
+            entries.add((code.casefold(), folded, name, code))
+            for position, char in enumerate(folded):
+                if char == " ":
+                    entries.add((folded[position + 1:], folded, name, code))
+        # (key, folded name, city name, IATA code), sorted by key for binary search.
+        self._entries = sorted(entries)
+        self._keys = [entry[0] for entry in self._entries]
+        self._names = sorted(self._codes)
+
+    @classmethod
+    def from_destinations(cls, destinations_dir=DESTINATIONS_DIR, **kwargs):
+        """
+        Build an index of the cities in the destination files.
+
+        Args:
+            destinations_dir (str): Directory holding the `<continent>.json` files.
+
+        Returns:
+            CityIndex: The index.
+        """
+        return cls(destination_cities(destinations_dir), **kwargs)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def resolve(self, name):
+        """
+        Return the IATA code of a city given by its exact name, ignoring case and accents.
+
+        Args:
+            name (str): City name.
+
+        Returns:
+            str: The IATA code, or None if the city is not in the index.
+        """
+        return self._codes.get(fold(name))
+
+    def search(self, query, limit=10, fuzzy=True):
+        """
+        Return the cities matching a typed prefix.
+
+        Args:
+            query (str): What the user typed so far.
+            limit (int): Maximum number of cities returned.
+            fuzzy (bool): Fall back to fuzzy matching when no name starts with the query.
+
+        Returns:
+            list: (city name, IATA code) tuples, names starting with the query first, then shorter names.
+        """
+        query = fold(query)
+        if not query:
+            return []
+
+        matches = {}
+        for _, (folded, name, code) in zip(range(SCAN_LIMIT), self._scan(query, prefix=True)):
+            rank = (not folded.startswith(query), len(name), name)
+            matches[(name, code)] = min(rank, matches.get((name, code), rank))
+        if matches:
+            return sorted(matches, key=matches.get)[:limit]
+
+        if not fuzzy:
+            return []
+        # Typos rarely hit the first letter, so only names sharing it are compared.
+        start = bisect.bisect_left(self._names, query[0])
+        end = bisect.bisect_left(self._names, chr(ord(query[0]) + 1))
+        results = []
+        for folded in difflib.get_close_matches(query, self._names[start:end], n=limit, cutoff=self.fuzzy_cutoff):
+            results.extend(
+                (name, code) for entry_folded, name, code in self._scan(folded, prefix=False) if entry_folded == folded
+            )
+        return list(dict.fromkeys(results))[:limit]
+
+    def _scan(self, key, prefix):
+        """Yield the (folded name, name, code) of every entry whose key starts with, or equals, `key`."""
+        position = bisect.bisect_left(self._keys, key)
+        while position < len(self._keys):
+            entry_key, folded, name, code = self._entries[position]
+            if not (entry_key.startswith(key) if prefix else entry_key == key):
+                return
+            yield folded, name, code
+            position += 1
@@ -1,4 +1,8 @@
-import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import CACHE_DIR, PersistentCache
+from http_client import get_default_client
 from user import User
 
 
@@ -7,26 +11,42 @@ class DataManager:
     This class provides methods to interact with a Sheety API.
 
     Attributes:
-        BASE_URL (str): The base URL of the Sheety API.
+        BASE_URL (str): The base URL of the Sheety API. Can be overridden with the SHEETY_BASE_URL environment variable.
         PRICES_ENDPOINT (str): The endpoint for prices in the Sheety API.
         USERS_ENDPOINT (str): The endpoint for users in the Sheety API.
         TOKEN (str): The token used for authentication with the Sheety API.
         AUTH_HEADERS (dict): A dictionary containing the headers needed for authenticated requests.
+        http_client (HttpClient): Pooled HTTP client used for every call to the Sheety API.
+        snapshot (PersistentCache): Last known copy of the prices sheet with its validators, used for
+            conditional GETs and to diff updates against.
+        max_workers (int): Maximum number of row updates sent at the same time.
     """
 
-    def __init__(self):
-        self.BASE_URL = (
-            "https://api.sheety.co/102369f1e8e69906cd018849bc15350e/flightDeals"
+    SNAPSHOT_KEY = "prices"
+
+    def __init__(self, http_client=None, snapshot=None, max_workers=8):
+        self.BASE_URL = os.getenv(
+            "SHEETY_BASE_URL",
+            "https://api.sheety.co/102369f1e8e69906cd018849bc15350e/flightDeals",
         )
         self.PRICES_ENDPOINT = "/prices"
         self.USERS_ENDPOINT = "/users"
         self.TOKEN = "esanchez_flight_search"
         self.AUTH_HEADERS = {"Authorization": f"Bearer {self.TOKEN}"}
+        self.http_client = http_client or get_default_client()
+        self.snapshot = snapshot if snapshot is not None else PersistentCache(
+            os.path.join(CACHE_DIR, "sheety_snapshot.json")
+        )
+        self.max_workers = max_workers
 
     def get_prices(self) -> dict:
         """
         Fetch all available flight deals from the API.
 
+        The request is conditional on the validators of the local snapshot,
+        so an unchanged sheet answers 304 and is served from the snapshot
+        instead of being downloaded again.
+
         Returns:
             dict: All available flight deals as per the response from the API.
 
@@ -34,33 +54,130 @@ class DataManager:
             Exception: If there's an error fetching data from the API, this exception will be raised.
         """
         url = f"{self.BASE_URL}{self.PRICES_ENDPOINT}"
+        snapshot = self.snapshot.get(self.SNAPSHOT_KEY)
+        headers = dict(self.AUTH_HEADERS)
+        if snapshot is not None:
+            if snapshot.get("etag"):
+                headers["If-None-Match"] = snapshot["etag"]
+            if snapshot.get("last_modified"):
+                headers["If-Modified-Since"] = snapshot["last_modified"]
         try:
-            response = requests.get(url, headers=self.AUTH_headers)
+            response = self.http_client.get(url, headers=headers)
+            if response.status_code == 304 and snapshot is not None:
+                return snapshot["rows"]
             response.raise_for_status()
-            return response.json()["prices"]
+            prices = response.json()["prices"]
         except Exception as e:
             print(f"Error fetching prices: {str(e)}")
+            return None
+
+        self.snapshot.set(
+            self.SNAPSHOT_KEY,
+            {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "rows": prices,
+            },
+        )
+        return prices
 
-    def _update_row(self, row_id, data):
+    def sync_prices(self, rows, current_rows=None):
         """
-        Update a specific record on the API.
+        Bring the sheet in line with the given rows, writing only what changed.
+
+        Every row is compared with the sheet as it is now, fetched with a
+        conditional GET so an unchanged sheet is served from the snapshot, and
+        only the fields that differ are sent; the changed rows are written
+        concurrently over the pooled session.
+
+        Args:
+            rows (list): Dictionaries holding the row 'id' and the desired field values, e.g. 'iataCode' or 'lowestPrice'.
+            current_rows (list, optional): The sheet as just returned by `get_prices`, to skip fetching it again.
+
+        Returns:
+            int: Number of rows written successfully.
+        """
+        # Edits made on the sheet since the last sync would be missed by a diff against the snapshot.
+        if current_rows is None:
+            current_rows = self.get_prices() or []
+        changes = self.diff_rows(current_rows, rows)
+        if not changes:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._put_row, changes, changes.values()))
+        written = {row_id: data for (row_id, data), ok in zip(changes.items(), results) if ok}
+        self._apply_to_snapshot(written)
+        return len(written)
+
+    @staticmethod
+    def diff_rows(current_rows, rows):
+        """
+        Compute the fields that differ between the sheet and the desired rows.
+
+        Args:
+            current_rows (list): Rows as they are on the sheet.
+            rows (list): Desired rows, each holding its 'id'.
+
+        Returns:
+            dict: Row ids mapped to the fields that need to be written; unchanged rows are left out.
+        """
+        current = {row["id"]: row for row in current_rows}
+        changes = {}
+        for row in rows:
+            existing = current.get(row["id"], {})
+            changed = {
+                field: value
+                for field, value in row.items()
+                if field != "id" and existing.get(field) != value
+            }
+            if changed:
+                changes[row["id"]] = changed
+        return changes
+
+    def _put_row(self, row_id, data):
+        """
+        Send one row update to the API.
 
         Args:
             row_id (int): ID of the record that needs updating.
             data (dict): New values to update the existing ones.
 
         Returns:
-            None
-
-        Raises:
-            Exception: If there's an issue while making PUT request or parsing JSON.
+            bool: True if the API accepted the update.
         """
         url = f"{self.BASE_URL}{self.PRICES_ENDPOINT}/{row_id}"
         body = {"price": data}
         try:
-            requests.put(url, headers=self.AUTH.Headers, json=body)
+            response = self.http_client.put(url, headers=self.AUTH_HEADERS, json=body)
+            response.raise_for_status()
+            return True
         except Exception as e:
             print(f"Error updating row: {str(e)}")
+            return False
+
+    def _apply_to_snapshot(self, changes):
+        """Record rows written by this client in the snapshot, so they are not sent again."""
+        snapshot = self.snapshot.get(self.SNAPSHOT_KEY)
+        if snapshot is None or not changes:
+            return
+        rows = [dict(row, **changes.get(row["id"], {})) for row in snapshot["rows"]]
+        # The sheet changed, so the stored validators no longer describe it.
+        self.snapshot.set(self.SNAPSHOT_KEY, {"etag": None, "last_modified": None, "rows": rows})
+
+    def _update_row(self, row_id, data):
+        """
+        Update a specific record on the API.
+
+        Args:
+            row_id (int): ID of the record that needs updating.
+            data (dict): New values to update the existing ones.
+
+        Returns:
+            None
+        """
+        if self._put_row(row_id, data):
+            self._apply_to_snapshot({row_id: data})
 
     def update_iata_code(self, row):
         """
@@ -102,7 +219,7 @@ class DataManager:
         }
         url = f"{self.BASE_URL}{self.USERS_ENDPOINT}"
         try:
-            response = requests.post(url, headers=self.AUTH_HEADERS, json=body)
+            response = self.http_client.post(url, headers=self.AUTH_HEADERS, json=body)
             print(response.text)
         except Exception as e:
             print(f"Error adding user: {str(e)}")
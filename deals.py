@@ -0,0 +1,124 @@
+import numpy as np
+
+
+class PriceMatrix:
+    """
+    Prices found by a sweep, one row per destination and one column per departure city.
+
+    Attributes:
+        destinations (list): Destination keys, in row order.
+        origins (list): Departure cities, in column order.
+        prices (numpy.ndarray): Price of the cheapest flight per cell, `inf` where none was found.
+        flights (dict): (row, column) mapped to the FlightData of that cell.
+        alternatives (dict): Destination keys mapped to the cheapest flights found from any origin,
+            cheapest first, when the sweep collected more than one flight per cell.
+        searched_at (int): Unix timestamp, in whole seconds, of the start of the sweep, or None.
+            Observations recorded by the sweep itself are at or after it.
+    """
+
+    def __init__(self, destinations, origins):
+        self.destinations = list(destinations)
+        self.origins = list(origins)
+        self.prices = np.full((len(self.destinations), len(self.origins)), np.inf)
+        self.flights = {}
+        self.alternatives = {}
+        self.searched_at = None
+        self._rows = {destination: row for row, destination in enumerate(self.destinations)}
+        self._columns = {origin: column for column, origin in enumerate(self.origins)}
+
+    def add(self, destination, origin, flight):
+        """
+        Store a flight in its cell, keeping the cheapest one.
+
+        Args:
+            destination: Destination key.
+            origin (str): Departure city.
+            flight (FlightData): The flight found.
+        """
+        row, column = self._rows[destination], self._columns[origin]
+        if flight.price < self.prices[row, column]:
+            self.prices[row, column] = flight.price
+            self.flights[(row, column)] = flight
+
+    def cheapest(self):
+        """
+        Return the cheapest flight per destination.
+
+        Returns:
+            dict: Destination keys mapped to FlightData, for destinations with at least one flight.
+        """
+        if not self.origins:
+            return {}
+        best_origin = np.argmin(self.prices, axis=1)
+        return {
+            self.destinations[row]: self.flights[(row, column)]
+            for row, column in enumerate(best_origin)
+            if (row, column) in self.flights
+        }
+
+
+def evaluate_deals(
+    prices,
+    lowest_prices,
+    min_drop=0.0,
+    min_drop_pct=0.0,
+    min_zscore=None,
+    mean=None,
+    std=None,
+):
+    """
+    Evaluate a whole sweep at once: cheapest origin, price drop and deal thresholds per destination.
+
+    A destination is a deal when its cheapest price is below the stored
+    lowest price by at least `min_drop` and `min_drop_pct` percent and, when
+    `min_zscore` is given, at least that many standard deviations below the
+    historical mean of its cell. Cells without history pass the z-score test.
+
+    Args:
+        prices (numpy.ndarray): Destinations x origins price matrix, `inf` where no flight was found.
+        lowest_prices (numpy.ndarray): Stored lowest price per destination.
+        min_drop (float): Minimum absolute drop below the stored lowest price.
+        min_drop_pct (float): Minimum drop below the stored lowest price, in percent.
+        min_zscore (float): Minimum number of standard deviations below the historical mean.
+        mean (numpy.ndarray): Historical mean price per cell, same shape as `prices`.
+        std (numpy.ndarray): Historical standard deviation per cell, same shape as `prices`.
+
+    Returns:
+        dict: Arrays with one entry per destination: `best_origin` (column index), `best_price`,
+        `drop`, `drop_pct`, `zscore` (NaN without history) and the boolean `is_deal`.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    lowest_prices = np.asarray(lowest_prices, dtype=np.float64)
+    rows = np.arange(prices.shape[0])
+
+    if prices.shape[1]:
+        best_origin = np.argmin(prices, axis=1)
+        best_price = prices[rows, best_origin]
+    else:
+        best_origin = np.zeros(len(rows), dtype=np.intp)
+        best_price = np.full(len(rows), np.inf)
+
+    found = np.isfinite(best_price)
+    drop = np.where(found, lowest_prices - best_price, 0.0)
+    drop_pct = np.divide(
+        drop * 100, lowest_prices, out=np.zeros_like(drop), where=lowest_prices > 0
+    )
+    is_deal = found & (drop > 0) & (drop >= min_drop) & (drop_pct >= min_drop_pct)
+
+    zscore = np.full(len(rows), np.nan)
+    if mean is not None and std is not None and prices.shape[1]:
+        best_mean = np.asarray(mean, dtype=np.float64)[rows, best_origin]
+        best_std = np.asarray(std, dtype=np.float64)[rows, best_origin]
+        has_history = found & np.isfinite(best_mean) & (best_std > 0)
+        zscore[has_history] = (best_price[has_history] - best_mean[has_history]) / best_std[has_history]
+        if min_zscore is not None:
+            is_deal &= ~has_history | (zscore <= -min_zscore)
+
+    return {
+        "best_origin": best_origin,
+        "best_price": best_price,
+        "drop": drop,
+        "drop_pct": drop_pct,
+        "zscore": zscore,
+        "is_deal": is_deal,
+    }
@@ -0,0 +1,136 @@
+import json
+import os
+
+from file_lock import file_lock
+
+DESTINATIONS_DIR = os.getenv(
+    "FLIGHT_DESTINATIONS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "destinations")
+)
+
+
+class DestinationStore:
+    """
+    Journaled storage for a `destinations/<continent>.json` file.
+
+    Changes are tracked in memory per city and field. Flushing appends only
+    the changed records to an append-only journal next to the JSON file,
+    so a flush costs O(changed records) and never truncates the snapshot.
+    Once the journal grows past `compact_size` bytes it is folded into a
+    new snapshot, which is written to a temporary file and atomically
+    renamed over the old one. Every read and write holds a per-file lock,
+    so parallel sweeps do not clobber each other.
+
+    Attributes:
+        path (str): Location of the JSON snapshot.
+        journal_path (str): Location of the change journal.
+        compact_size (int): Journal size, in bytes, that triggers a compaction.
+    """
+
+    def __init__(self, continent, directory=DESTINATIONS_DIR, compact_size=64 * 1024):
+        self.path = os.path.join(directory, f"{continent}.json")
+        self.journal_path = os.path.join(directory, f"{continent}.journal")
+        self.compact_size = compact_size
+        self._data = None
+        self._dirty = {}
+
+    @property
+    def data(self):
+        """The destination data, loaded on first access."""
+        if self._data is None:
+            self.load()
+        return self._data
+
+    def load(self):
+        """
+        Read the snapshot and replay the journal on top of it.
+
+        Returns:
+            dict: The destination data. Unflushed changes are discarded.
+        """
+        with file_lock(self.path):
+            self._data, _ = self._read()
+        self._dirty = {}
+        return self._data
+
+    def update(self, city, **fields):
+        """
+        Change fields of a destination and mark them dirty.
+
+        Args:
+            city (str): Key of the destination in the `destinations` mapping.
+            **fields: Field names and their new values.
+        """
+        destination = self.data["destinations"][city]
+        changed = {name: value for name, value in fields.items() if destination.get(name) != value}
+        if changed:
+            destination.update(changed)
+            self._dirty.setdefault(city, {}).update(changed)
+
+    def flush(self):
+        """Append the dirty records to the journal, compacting it when it has grown too long."""
+        if not self._dirty:
+            return
+        with file_lock(self.path):
+            self._drop_torn_record()
+            with open(self.journal_path, "a") as journal:
+                for city, fields in self._dirty.items():
+                    journal.write(json.dumps({"city": city, "fields": fields}) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._dirty = {}
+            if os.path.getsize(self.journal_path) >= self.compact_size:
+                self._compact()
+
+    def compact(self):
+        """Fold the journal into a new snapshot."""
+        self.flush()
+        with file_lock(self.path):
+            self._compact()
+
+    def _compact(self):
+        data, records = self._read()
+        if not records:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as destinations_file:
+            json.dump(data, destinations_file)
+            destinations_file.flush()
+            os.fsync(destinations_file.fileno())
+        os.replace(tmp_path, self.path)
+        open(self.journal_path, "w").close()
+
+    def _drop_torn_record(self):
+        """Cut a torn last line left by a crash mid-append, so the next record starts on its own line."""
+        try:
+            journal = open(self.journal_path, "rb+")
+        except FileNotFoundError:
+            return
+        with journal:
+            size = journal.seek(0, os.SEEK_END)
+            if not size:
+                return
+            journal.seek(size - 1)
+            if journal.read(1) == b"\n":
+                return
+            journal.seek(0)
+            journal.truncate(journal.read().rfind(b"\n") + 1)
+
+    def _read(self):
+        """Return the snapshot with the journal applied and the number of records replayed."""
+        with open(self.path, "r") as destinations_file:
+            data = json.load(destinations_file)
+        records = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-append; the records before it are intact.
+                        continue
+                    destination = data["destinations"].get(record["city"])
+                    if destination is not None:
+                        destination.update(record["fields"])
+                    records += 1
+        return data, records
+
@@ -0,0 +1,31 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; fall back to in-process locking only.
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive advisory lock shared by every process on this host.
+
+    The lock is taken on a sibling ``<path>.lock`` file so the protected file
+    itself can be atomically replaced while the lock is held.
+
+    Args:
+        path (str): Path of the file to protect.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -1,6 +1,29 @@
-from datetime import datetime
+from datetime import date
 from dataclasses import dataclass
 
+import numpy as np
+
+# Columns of the structured array built by `flight_records`. Deep links are
+# long and rarely needed, so records keep the position of the itinerary in
+# the raw `data` list instead.
+FLIGHT_RECORD_DTYPE = np.dtype(
+    [
+        ("index", np.int32),
+        ("departure_airport", "U4"),
+        ("arrival_airport", "U4"),
+        ("departure_city_code", "U4"),
+        ("arrival_city_code", "U4"),
+        ("from_city", "U32"),
+        ("to_city", "U32"),
+        ("price", np.float64),
+        ("local_departure", "datetime64[D]"),
+        ("local_arrival", "datetime64[D]"),
+        ("step_over_city", "U32"),
+        ("stopovers", np.int8),
+        ("airline", "U4"),
+    ]
+)
+
 
 @dataclass
 class FlightData:
@@ -13,36 +36,51 @@ class FlightData:
         from_city (str): The city from which the flight originates.
         to_city (str): The destination city of the flight.
         price (float): The cost of the flight.
-        local_departure (str): The date and time when the flight departs in ISO format.
-        local_arrival (str): The date and time when the flight arrives in ISO format.
+        local_departure (datetime.date): The departure date; an ISO timestamp passed in is converted.
+        local_arrival (datetime.date): The arrival date; an ISO timestamp passed in is converted.
         step_over_city (str): Any intermediate stops during the journey. Can be None if there are no stopovers.
         airline (str): The name of the airline operating this flight.
         link (str): An optional URL linking to more information about the flight.
+        stopovers (int): Number of stopovers on the way to the destination.
 
     Methods:
         __post_init__: Converts the dates into a Python `datetime.date` object after initialization.
         __str__: Returns a formatted string representation of the flight details.
     """
 
+    __slots__ = (
+        "departure_airport",
+        "arrival_airport",
+        "from_city",
+        "to_city",
+        "price",
+        "local_departure",
+        "local_arrival",
+        "step_over_city",
+        "airline",
+        "link",
+        "stopovers",
+    )
+
     departure_airport: str
     arrival_airport: str
     from_city: str
     to_city: str
     price: float
-    local_departure: str
-    local_arrival: str
+    local_departure: date
+    local_arrival: date
     step_over_city: str
     airline: str
     link: str
+    stopovers: int
 
     def __post_init__(self):
         """Converts the dates into a Python `datetime.date` object."""
-        self.local_departure = datetime.fromisoformat(
-            self.local_departure.replace('Z', '+00:00')
-        ).date()
-        self.local_arrival = datetime.fromisoformat(
-            self.local_arrival.replace('Z', '+00:00')
-        ).date()
+        # Only the leading YYYY-MM-DD of the ISO timestamp is needed.
+        if isinstance(self.local_departure, str):
+            self.local_departure = date.fromisoformat(self.local_departure[:10])
+        if isinstance(self.local_arrival, str):
+            self.local_arrival = date.fromisoformat(self.local_arrival[:10])
 
     def get_flight_data(self):
         """Returns a formatted string representation of the flight details."""
@@ -63,3 +101,46 @@ class FlightData:
             msg += f" {self.link}"
 
         return msg
+
+
+def flight_records(data, max_stopovers=0):
+    """
+    Builds a structured array from the `data` list of a Kiwi API search.
+
+    Every column is collected in a single pass and dates are parsed by
+    NumPy for the whole column at once, so no FlightData is created per
+    itinerary.
+
+    Args:
+        data (list): Itineraries returned by Kiwi API.
+        max_stopovers (int): Maximum number of stopovers used in the search. When 0, `step_over_city` is left empty.
+
+    Returns:
+        numpy.ndarray: One row per itinerary, with `FLIGHT_RECORD_DTYPE`.
+    """
+    records = np.empty(len(data), dtype=FLIGHT_RECORD_DTYPE)
+    if not data:
+        return records
+
+    records["index"] = np.arange(len(data))
+    records["departure_airport"] = [result["flyFrom"] for result in data]
+    records["arrival_airport"] = [result["flyTo"] for result in data]
+    records["departure_city_code"] = [result.get("cityCodeFrom", "") for result in data]
+    records["arrival_city_code"] = [result.get("cityCodeTo", "") for result in data]
+    records["from_city"] = [result["cityFrom"] for result in data]
+    records["to_city"] = [result["cityTo"] for result in data]
+    records["price"] = [result["price"] for result in data]
+    records["local_departure"] = np.array(
+        [result["route"][0]["local_departure"][:10] for result in data], dtype="datetime64[D]"
+    )
+    records["local_arrival"] = np.array(
+        [result["route"][-1]["local_arrival"][:10] for result in data], dtype="datetime64[D]"
+    )
+    records["step_over_city"] = (
+        [result["route"][0]["cityTo"] for result in data] if max_stopovers > 0 else ""
+    )
+    records["stopovers"] = [
+        max(0, sum(1 for leg in result["route"] if not leg.get("return")) - 1) for result in data
+    ]
+    records["airline"] = [result["route"][0]["airline"] for result in data]
+    return records
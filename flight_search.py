@@ -1,59 +1,150 @@
-import requests
-from datetime import datetime as dt, timedelta
+import heapq
+import re
+from datetime import date, datetime as dt, timedelta
 
-from pyshorteners.exceptions import ShorteningErrorException
-from requests import ReadTimeout
-
-from flight_data import FlightData
-import pyshorteners
+from cache import IataCodeCache, ResponseCache
+from city_index import CityIndex
+from flight_data import FlightData, flight_records
+from http_client import get_default_client
+from json_stream import iter_json_array
+from rate_limiter import get_default_limiter
 from dotenv import load_dotenv
 import os
 
+IATA_CODE_PATTERN = re.compile(r"^[A-Z]{3}$")
+# Itineraries requested per coalesced search; Kiwi API caps this at 1000.
+COALESCED_LIMIT = 250
+# Times a throttled (429) call is retried once the rate limiter lets it through.
+THROTTLE_RETRIES = 5
+# Bytes read from the socket at a time when streaming search results.
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def _departure_week(result):
+    """Monday of the week a raw itinerary departs in."""
+    departure = date.fromisoformat(result["route"][0]["local_departure"][:10])
+    return (departure - timedelta(days=departure.weekday())).isoformat()
+
+
+# Groupings supported by `FlightSearch.search_top_flights`, each mapping a
+# ((from_city, to_city), itinerary) match to its group.
+TOP_K_GROUPS = {
+    "pair": lambda pair, result: pair,
+    "destination": lambda pair, result: pair[1],
+    "week": lambda pair, result: (pair[1], _departure_week(result)),
+    "airline": lambda pair, result: (pair[1], result["route"][0]["airline"]),
+}
+
+
 class FlightSearch:
     """
     This class provides methods for searching flights using Kiwi API.
     
     Attributes:
         - API_KEY: The API key to access Kiwi API. It's obtained from .env file.
-        - BASE_URL: Base URL of Kiwi API.
+        - BASE_URL: Base URL of Kiwi API. Can be overridden with the KIWI_BASE_URL environment variable.
         - QUERY_LOCATIONS: Endpoint for querying locations in Kiwi API.
         - SEARCH: Endpoint for search flights in Kiwi API.
         - HEADERS: Headers used when making HTTP requests to Kiwi API.
+        - iata_cache: Persistent city name to IATA code cache consulted before querying Kiwi API.
+        - http_client: Pooled HTTP client used for every call to Kiwi API.
+        - rate_limiter: Token bucket every call to Kiwi API has to go through.
+        - response_cache: Cache of search results keyed on the normalized query parameters.
+        - city_index: Local index of known cities, consulted before the cache and Kiwi API.
     """
 
-    def __init__(self):
+    def __init__(self, iata_cache=None, http_client=None, rate_limiter=None, response_cache=None, city_index=None):
         """
         Initializes a new instance of FlightSearch.
 
         Loads environment variables from .env file, sets up API key and base URLs.
+
+        Args:
+            - iata_cache (IataCodeCache): Cache used to resolve city names. A default on-disk cache is created when omitted.
+            - http_client (HttpClient): Client used for HTTP calls. The process-wide client is used when omitted.
+            - rate_limiter (RateLimiter): Limiter for Kiwi API calls. The host-wide limiter is used when omitted.
+            - response_cache (ResponseCache): Cache for search results. A default on-disk cache is created when omitted.
+            - city_index (CityIndex): Local city index. One built from destinations/*.json is used when omitted.
         """
         load_dotenv()
         self.API_KEY = os.getenv("KIWI_API_KEY")
-        self.BASE_URL = "https://tequila-api.kiwi.com"
+        self.BASE_URL = os.getenv("KIWI_BASE_URL", "https://tequila-api.kiwi.com")
         self.QUERY_LOCATIONS = "/locations/query"
         self.SEARCH = "/v2/search"
         self.HEADERS = headers = {
             "apikey": self.API_KEY,
         }
+        self.iata_cache = iata_cache if iata_cache is not None else IataCodeCache()
+        self.http_client = http_client or get_default_client()
+        self.rate_limiter = rate_limiter or get_default_limiter()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.city_index = city_index if city_index is not None else CityIndex.from_destinations()
+
+    def _get(self, endpoint, params, stream=False):
+        """
+        Sends a GET request to Kiwi API through the rate limiter.
+
+        Throttled (429) responses feed back into the limiter and are retried
+        instead of being returned, so results are not lost when the provider
+        pushes back.
+
+        Args:
+            - endpoint (str): Endpoint path appended to BASE_URL.
+            - params (dict): Query parameters.
+            - stream (bool): Return as soon as the headers arrive and leave the body on the socket.
+
+        Returns:
+            - requests.Response of the last attempt.
+        """
+        for _ in range(THROTTLE_RETRIES + 1):
+            self.rate_limiter.acquire()
+            response = self.http_client.get(
+                f"{self.BASE_URL}{endpoint}", params=params, headers=self.HEADERS, stream=stream
+            )
+            if response.status_code != 429:
+                self.rate_limiter.on_success()
+                return response
+            response.close()
+            self.rate_limiter.on_throttled(response.headers.get("Retry-After"))
+        return response
 
     def get_iata_code(self, city):
         """
         Returns IATA code for given city name.
 
+        Values that already look like an IATA code are returned untouched and
+        known cities are served from the local city index, which ignores
+        case and accents, or the cache, so only unknown names reach Kiwi API.
+
         Args:
             - city (str): Name of the city whose IATA code we want.
 
         Returns:
             str: IATA code corresponding to given city.
         """
+        city = city.strip()
+        if IATA_CODE_PATTERN.match(city):
+            return city
+
+        local_code = self.city_index.resolve(city)
+        if local_code:
+            return local_code
+
+        cache_key = self.iata_cache.key(city)
+        cached_code = self.iata_cache.get(cache_key)
+        if cached_code:
+            return cached_code
+
         params = {
             "term": city,
             "location_types": "city"
         }
-        response = requests.get(f"{self.BASE_URL}{self.QUERY_LOCATIONS}", params=params, headers=self.HEADERS)
+        response = self._get(self.QUERY_LOCATIONS, params)
         response.raise_for_status()
         locations = response.json()
-        return locations["locations"][0]["code"]
+        iata_code = locations["locations"][0]["code"]
+        self.iata_cache.set(cache_key, iata_code)
+        return iata_code
 
     def search_flight(self, from_city, to_city, max_stopovers=0):
         """
@@ -67,72 +158,480 @@ class FlightSearch:
         Returns:
             - FlightData object if a suitable flight found else None.
         """
+        flights = self.search_flights([from_city], [to_city], max_stopovers, limit=1)
+        return flights.get((from_city, to_city))
 
-        # Check that both 'from_city' and 'to_city' are not empty strings or none
-        if not isinstance(from_city, str) or len(from_city.strip()) == 0:
-            raise ValueError("Invalid value provided for 'from_city'. Please provide valid string.")
+    def search_flights(self, from_cities, to_cities, max_stopovers=0, limit=COALESCED_LIMIT):
+        """
+        Searches the cheapest flight for every origin/destination pair with a single request.
+
+        Kiwi API accepts comma separated `fly_from` and `fly_to` lists, so all
+        pairs are queried at once and the response is split back per pair.
+        Results come back sorted by price, so `limit` only needs to be large
+        enough for every pair to show up at least once.
+
+        Args:
+            - from_cities (list): Cities where you start your journey.
+            - to_cities (list): Destination cities.
+            - max_stopovers (int): Maximum number of stopovers allowed. Defaults to 0.
+            - limit (int): Maximum number of itineraries requested from Kiwi API.
+
+        Returns:
+            - dict mapping (from_city, to_city) tuples, as given, to the cheapest FlightData found.
+              Pairs without any flight are left out.
+        """
+        origins, destinations, params = self._prepare_search(from_cities, to_cities, max_stopovers, limit)
+
+        results = self.response_cache.fetch(
+            params, lambda: self._search_cheapest(params, origins, destinations)
+        )
+        if results is None:
+            return {}
+
+        return {
+            pair: self._build_flight_data(result, max_stopovers)
+            for pair, result in self._cheapest_per_pair(results, origins, destinations).items()
+        }
+
+    def search_top_flights(
+        self, from_cities, to_cities, k=3, per="destination", max_stopovers=0, limit=COALESCED_LIMIT
+    ):
+        """
+        Searches the k cheapest flights per group with a single request.
+
+        One large result set is fetched and reduced with a bounded heap per
+        group, so alternatives come out of the same call as the cheapest
+        flight instead of one query each. Pairs crowded out of that result set
+        are searched again like in `search_flights`, with their cheapest
+        flight only.
+
+        Args:
+            - from_cities (list): Cities where you start your journey.
+            - to_cities (list): Destination cities.
+            - k (int): Number of flights kept per group. Defaults to 3.
+            - per (str): Grouping, one of "pair" (from_city, to_city), "destination" (to_city),
+              "week" (to_city, Monday of the departure week) or "airline" (to_city, airline). Defaults to "destination".
+            - max_stopovers (int): Maximum number of stopovers allowed. Defaults to 0.
+            - limit (int): Maximum number of itineraries requested from Kiwi API.
+
+        Returns:
+            - dict mapping each group to its FlightData objects, cheapest first. Groups without any flight are left out.
+        """
+        if per not in TOP_K_GROUPS:
+            raise ValueError(f"'per' should be one of {', '.join(TOP_K_GROUPS)}.")
+        if not isinstance(k, int) or k < 1:
+            raise ValueError("'k' should be a positive integer.")
+
+        origins, destinations, params = self._prepare_search(from_cities, to_cities, max_stopovers, limit)
+        group_key = TOP_K_GROUPS[per]
+
+        # The grouping is part of the cache key only; Kiwi API never sees it.
+        results = self.response_cache.fetch(
+            dict(params, top_k=f"{per}:{k}"),
+            lambda: self._search_top(params, origins, destinations, k, group_key),
+        )
+        if results is None:
+            return {}
+
+        top = self._top_k(self._match_pairs(results, origins, destinations), k, group_key)
+        return {
+            group: [self._build_flight_data(result, max_stopovers) for result in group_results]
+            for group, group_results in top.items()
+        }
+
+    def _prepare_search(self, from_cities, to_cities, max_stopovers, limit):
+        """
+        Validates the search arguments and builds the Kiwi API query.
+
+        Args:
+            - from_cities (list): Cities where you start your journey.
+            - to_cities (list): Destination cities.
+            - max_stopovers (int): Maximum number of stopovers allowed.
+            - limit (int): Maximum number of itineraries requested from Kiwi API.
+
+        Returns:
+            - tuple of the origin and destination IATA codes, each mapped to the list of city names given, and the query parameters.
+        """
+        # Check that every city is a non-empty string
+        for from_city in from_cities:
+            if not isinstance(from_city, str) or len(from_city.strip()) == 0:
+                raise ValueError("Invalid value provided for 'from_city'. Please provide valid string.")
+
+        for to_city in to_cities:
+            if not isinstance(to_city, str) or len(to_city.strip()) == 0:
+                raise ValueError("Invalid value provided for 'to_city'. Please provide valid string.")
 
-        if not isinstance(to_city, str) or len(to_city.strip()) == 0:
-            raise ValueError("Invalid value provided for 'to_city'. Please provide valid string.")
-        
         # Ensure max_stopover is an integer greater than equal to zero 
         if not isinstance(max_stopovers, int) or max_stopovers < 0:
             raise ValueError("'max_stopovers' should be a non-negative integer.")
 
+        # Several names can resolve to the same code, e.g. "Bangkok" and "BKK",
+        # so each code keeps every name it was asked for.
+        origins, destinations = {}, {}
+        for city in from_cities:
+            origins.setdefault(self.get_iata_code(city), []).append(city)
+        for city in to_cities:
+            destinations.setdefault(self.get_iata_code(city), []).append(city)
+
         today = dt.now()
         tomorrow = (today + timedelta(days=7)).strftime("%d/%m/%Y")
         date_in_six_months = (today + timedelta(days=180)).strftime("%d/%m/%Y")
 
         params = {
-                "fly_from": self.get_iata_code(from_city),
-                "fly_to": self.get_iata_code(to_city),
+                "fly_from": ",".join(origins),
+                "fly_to": ",".join(destinations),
                 "date_from": tomorrow,
                 "date_to": date_in_six_months,
                 "nights_in_dst_from": 5,
                 "nights_in_dst_to": 20,
                 "curr": "USD",
                 "max_stopovers": max_stopovers,
-                "limit": 1
+                "sort": "price",
+                "limit": limit
+            }
+
+        return origins, destinations, params
+
+    def search_flight_records(
+        self, from_cities, to_cities, max_stopovers=0, limit=COALESCED_LIMIT, one_per_date=False
+    ):
+        """
+        Bulk search returning every itinerary as a NumPy structured array.
+
+        No FlightData is created per itinerary, so whole columns can be
+        aggregated at once, e.g. by the price calendar.
+
+        Args:
+            - from_cities (list): Cities where you start your journey.
+            - to_cities (list): Destination cities.
+            - max_stopovers (int): Maximum number of stopovers allowed. Defaults to 0.
+            - limit (int): Maximum number of itineraries requested from Kiwi API.
+            - one_per_date (bool): Only return the cheapest itinerary of every departure date.
+
+        Returns:
+            - tuple of the records (see `flight_data.FLIGHT_RECORD_DTYPE`) and the list of
+              booking links, indexed by the `index` column. Both are empty if the request failed.
+        """
+        _, _, params = self._prepare_search(from_cities, to_cities, max_stopovers, limit)
+        if one_per_date:
+            params["one_per_date"] = 1
+
+        try:
+            data = list(self._stream_search(params))
+        except Exception as e:
+            print(e)
+            return flight_records([]), []
+
+        return flight_records(data, max_stopovers), [result["deep_link"] for result in data]
+
+    def _search_cheapest(self, params, origins, destinations):
+        """
+        Runs a search on Kiwi API and keeps only the cheapest itinerary per pair.
+
+        Itineraries are parsed one by one while the response downloads and go
+        through a generator pipeline: those outside the requested pairs are
+        dropped, then the first, i.e. cheapest, itinerary of each pair is kept.
+        Results are sorted by price, so the download stops as soon as every
+        pair has one.
+
+        A coalesced search only returns the `limit` cheapest itineraries of
+        all pairs, so cheap pairs can crowd the others out. When the results
+        were cut off, the pairs still missing are searched again, one request
+        per origin with `one_for_city`, which returns the cheapest itinerary
+        of every destination.
+
+        Args:
+            - params (dict): Query parameters of the search.
+            - origins (dict): Requested origin IATA codes mapped to lists of city names.
+            - destinations (dict): Requested destination IATA codes mapped to lists of city names.
+
+        Returns:
+            - list of raw itineraries, or None if the request failed.
+        """
+        searched = self._stream_cheapest(params, origins, destinations)
+        if searched is None:
+            return None
+        results, truncated = searched
+        if not truncated:
+            return results
+
+        found = {pair for pair, _ in self._match_pairs(results, origins, destinations)}
+        results.extend(self._search_missing(params, origins, destinations, found))
+        return results
+
+    def _search_missing(self, params, origins, destinations, found):
+        """
+        Searches again the pairs a cut off coalesced search left out.
+
+        One request is made per origin with `one_for_city`, which returns the
+        cheapest itinerary of every destination, so no pair can crowd the
+        others out again.
+
+        Args:
+            - params (dict): Query parameters of the coalesced search.
+            - origins (dict): Requested origin IATA codes mapped to lists of city names.
+            - destinations (dict): Requested destination IATA codes mapped to lists of city names.
+            - found (set): (from_city, to_city) pairs the coalesced search returned.
+
+        Returns:
+            - list of raw itineraries, the cheapest of each missing pair. Failed requests are skipped.
+        """
+        results = []
+        for origin, from_names in origins.items():
+            missing = {
+                code: to_names
+                for code, to_names in destinations.items()
+                if (from_names[0], to_names[0]) not in found
             }
+            if not missing:
+                continue
+            retry_params = dict(params, fly_from=origin, fly_to=",".join(missing), one_for_city=1, limit=len(missing))
+            retried = self._stream_cheapest(retry_params, {origin: from_names}, missing)
+            if retried is not None:
+                results.extend(retried[0])
+        return results
 
-        response = requests.get(f"{self.BASE_URL}{self.SEARCH}", params=params, headers=self.HEADERS)
+    def _stream_cheapest(self, params, origins, destinations):
+        """
+        Streams one search, keeping the first itinerary of every pair.
+
+        Args:
+            - params (dict): Query parameters of the search.
+            - origins (dict): Requested origin IATA codes mapped to lists of city names.
+            - destinations (dict): Requested destination IATA codes mapped to lists of city names.
+
+        Returns:
+            - tuple of the raw itineraries kept and whether the response was cut off at `limit`,
+              or None if the request failed.
+        """
+        streamed = 0
+
+        def counted(results):
+            nonlocal streamed
+            for result in results:
+                streamed += 1
+                yield result
+
+        results = self._stream_search(params)
         try:
-            response.raise_for_status()  
+            matches = self._match_pairs(counted(results), origins, destinations)
+            pairs = sum(map(len, origins.values())) * sum(map(len, destinations.values()))
+            cheapest = list(self._first_per_pair(matches, pairs))
         except Exception as e:
-            print(e) 
-            return None 
-
-        results = response.json()
-
-        type_tiny = pyshorteners.Shortener()
-
-        if int(results['_results']) > 0:
-            result = results['data'][0]
-
-            step_over_city = None
-            if max_stopovers > 0:
-                step_over_city = result["route"][0]["cityTo"]
-                
-            link = None
-            try:
-                link = type_tiny.tinyurl.short(result["deep_link"])
-            except ReadTimeout:
-                link = result["deep_link"]  
-
-            fecha_salida = result['route'][0]['local_arrival']
-            fecha_regreso = result['route'][-1]['local_arrival']
-
-            return FlightData(
-                    result["flyFrom"],
-                    result["flyTo"],
-                    result["cityFrom"], 
-                    result["cityTo"], 
-                    result["price"], 
-                    fecha_salida, 
-                    fecha_regreso, 
-                    step_over_city, 
-                    result["route"][0]["airline"], 
-                    link
-                )
-        else:
-            return None  
\ No newline at end of file
+            print(e)
+            return None
+        finally:
+            results.close()
+        return cheapest, streamed >= params["limit"]
+
+    def _search_top(self, params, origins, destinations, k, group_key):
+        """
+        Runs a search on Kiwi API and keeps only the k cheapest itineraries per group.
+
+        As in `_search_cheapest`, pairs crowded out of a cut off response are
+        searched again, so each of them still gets its cheapest itinerary.
+
+        Args:
+            - params (dict): Query parameters of the search.
+            - origins (dict): Requested origin IATA codes mapped to lists of city names.
+            - destinations (dict): Requested destination IATA codes mapped to lists of city names.
+            - k (int): Number of itineraries kept per group.
+            - group_key (callable): Maps a ((from_city, to_city), itinerary) match to its group.
+
+        Returns:
+            - list of raw itineraries, or None if the request failed.
+        """
+        streamed = 0
+        found = set()
+
+        def counted(results):
+            nonlocal streamed
+            for result in results:
+                streamed += 1
+                yield result
+
+        def recorded(matches):
+            for pair, result in matches:
+                found.add(pair)
+                yield pair, result
+
+        results = self._stream_search(params)
+        try:
+            top = self._top_k(recorded(self._match_pairs(counted(results), origins, destinations)), k, group_key)
+        except Exception as e:
+            print(e)
+            return None
+        finally:
+            results.close()
+
+        # Names sharing a code put the same itinerary in several groups.
+        kept = {id(result): result for group_results in top.values() for result in group_results}
+        results = list(kept.values())
+        if streamed >= params["limit"]:
+            results.extend(self._search_missing(params, origins, destinations, found))
+        return results
+
+    @staticmethod
+    def _top_k(matches, k, group_key):
+        """
+        Selects the k cheapest itineraries of every group with a bounded heap each.
+
+        Each heap holds at most k entries with the most expensive on top, so
+        every itinerary costs O(log k) and the input is consumed in one pass.
+
+        Args:
+            - matches (iterable): ((from_city, to_city), itinerary) tuples, in any order.
+            - k (int): Number of itineraries kept per group.
+            - group_key (callable): Maps a match to its group.
+
+        Returns:
+            - dict mapping each group to its raw itineraries, cheapest first. Ties keep their input order.
+        """
+        heaps = {}
+        for sequence, (pair, result) in enumerate(matches):
+            heap = heaps.setdefault(group_key(pair, result), [])
+            # The heap root is the entry to evict: the highest price, then the latest.
+            entry = (-result["price"], -sequence, result)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heappushpop(heap, entry)
+        return {
+            group: [result for _, _, result in sorted(heap, reverse=True)]
+            for group, heap in heaps.items()
+        }
+
+    def _stream_search(self, params):
+        """
+        Yields the itineraries of a Kiwi API search as they are downloaded.
+
+        Only one itinerary and one network chunk are held in memory at a time.
+        Closing the generator early closes the connection.
+
+        Args:
+            - params (dict): Query parameters of the search.
+
+        Yields:
+            - Raw itineraries, in the order Kiwi API returns them.
+
+        Raises:
+            - requests.HTTPError: If the search failed.
+            - ValueError: If the response body is malformed or truncated.
+        """
+        response = self._get(self.SEARCH, params, stream=True)
+        with response:
+            response.raise_for_status()
+            yield from iter_json_array(response.iter_content(STREAM_CHUNK_SIZE), "data")
+
+    def _match_pairs(self, results, origins, destinations):
+        """
+        Pairs every itinerary with the requested cities it connects, dropping the others.
+
+        Args:
+            - results (iterable): Raw itineraries returned by Kiwi API.
+            - origins (dict): Requested origin IATA codes mapped to lists of city names.
+            - destinations (dict): Requested destination IATA codes mapped to lists of city names.
+
+        Yields:
+            - ((from_city, to_city), itinerary) tuples, one per name pair when several names share a code.
+        """
+        for result in results:
+            from_names = self._match_city(origins, result["flyFrom"], result.get("cityCodeFrom"))
+            to_names = self._match_city(destinations, result["flyTo"], result.get("cityCodeTo"))
+            for from_city in from_names:
+                for to_city in to_names:
+                    yield (from_city, to_city), result
+
+    @staticmethod
+    def _first_per_pair(matches, pairs):
+        """
+        Yields the first itinerary of every pair, stopping once all pairs are seen.
+
+        Args:
+            - matches (iterable): ((from_city, to_city), itinerary) tuples sorted by price.
+            - pairs (int): Number of pairs requested.
+
+        Yields:
+            - The cheapest raw itinerary of each pair, once even if it matches several pairs.
+        """
+        seen = set()
+        kept = None
+        for pair, result in matches:
+            if pair in seen:
+                continue
+            seen.add(pair)
+            # Pairs sharing codes get the same itinerary back to back.
+            if result is not kept:
+                kept = result
+                yield result
+            if len(seen) == pairs:
+                return
+
+    def _cheapest_per_pair(self, results, origins, destinations):
+        """
+        Splits itineraries per origin/destination pair keeping the cheapest of each.
+
+        Args:
+            - results (list): Raw itineraries returned by Kiwi API.
+            - origins (dict): Requested origin IATA codes mapped to lists of city names.
+            - destinations (dict): Requested destination IATA codes mapped to lists of city names.
+
+        Returns:
+            - dict mapping (from_city, to_city) tuples to the cheapest raw itinerary.
+        """
+        cheapest = {}
+        for pair, result in self._match_pairs(results, origins, destinations):
+            if pair not in cheapest or result["price"] < cheapest[pair]["price"]:
+                cheapest[pair] = result
+        return cheapest
+
+    @staticmethod
+    def _match_city(cities, airport_code, city_code):
+        """
+        Finds which of the requested cities an itinerary endpoint belongs to.
+
+        Args:
+            - cities (dict): Requested IATA codes mapped to the lists of city names given by the caller.
+            - airport_code (str): Airport code of the itinerary endpoint.
+            - city_code (str): City code of the itinerary endpoint.
+
+        Returns:
+            - The requested city names, or an empty list if the endpoint matches none of them.
+        """
+        if len(cities) == 1:
+            return next(iter(cities.values()))
+        return cities.get(airport_code) or cities.get(city_code) or []
+
+    def _build_flight_data(self, result, max_stopovers):
+        """
+        Converts a single Kiwi API itinerary into a FlightData object.
+
+        Args:
+            - result (dict): One item of the `data` list returned by Kiwi API.
+            - max_stopovers (int): Maximum number of stopovers used in the search.
+
+        Returns:
+            - FlightData object.
+        """
+        step_over_city = None
+        if max_stopovers > 0:
+            step_over_city = result["route"][0]["cityTo"]
+
+        outbound_legs = [leg for leg in result["route"] if not leg.get("return")]
+
+        fecha_salida = result['route'][0]['local_departure']
+        fecha_regreso = result['route'][-1]['local_arrival']
+
+        return FlightData(
+                result["flyFrom"],
+                result["flyTo"],
+                result["cityFrom"], 
+                result["cityTo"], 
+                result["price"], 
+                fecha_salida, 
+                fecha_regreso, 
+                step_over_city, 
+                result["route"][0]["airline"], 
+                result["deep_link"],
+                max(0, len(outbound_legs) - 1)
+            )
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from async_flight_search import AsyncFlightSearch
+from .caching import city_search_index
+from .serializers import CitySerializer, FlightAlertSerializer
+from tracker.alert_index import get_alert_index
+from tracker.models import City, FlightAlert
+
+# Async views are plain Django views: DRF's APIView runs its handlers
+# synchronously, which would hold a thread for the whole request.
+
+_flight_search = None
+_flight_search_lock = threading.Lock()
+
+
+def get_async_flight_search():
+    """
+    Return the process-wide AsyncFlightSearch, creating it on first use.
+
+    Creating it reads files and builds the city index: call it through
+    `sync_to_async` from async code.
+    """
+    global _flight_search
+    with _flight_search_lock:
+        if _flight_search is None:
+            _flight_search = AsyncFlightSearch()
+        return _flight_search
+
+
+async def authenticate(request):
+    """
+    Return the user of a request, or None.
+
+    Accepts the tokens handed out by LoginView and RegisterView
+    (`Authorization: Token <key>`) as well as a session.
+    """
+    header = request.headers.get('Authorization', '').split()
+    if len(header) == 2 and header[0].lower() == 'token':
+        token = await Token.objects.select_related('user').filter(key=header[1]).afirst()
+        return token.user if token is not None and token.user.is_active else None
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def error(detail, status_code):
+    return JsonResponse({'detail': detail}, status=status_code)
+
+
+class AuthenticatedView(View):
+    """Rejects requests without a user; handlers find it on `request.user`."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await authenticate(request)
+        if user is None:
+            return error('Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED)
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncCitySearch(View):
+    MAX_LIMIT = 50
+
+    async def get(self, request):
+        query = request.GET.get('q', '')
+        try:
+            limit = min(int(request.GET.get('limit', 10)), self.MAX_LIMIT)
+        except ValueError:
+            return JsonResponse({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return JsonResponse(
+                {'limit': ['Ensure this value is greater than or equal to 1.']}, status=status.HTTP_400_BAD_REQUEST
+            )
+        index = await sync_to_async(city_search_index)()
+        cities = index.search(query, limit)
+        return JsonResponse([{'name': name, 'iata_code': iata_code} for name, iata_code in cities], safe=False)
+
+
+class AsyncCityDetail(View):
+    async def get(self, request, pk):
+        city = await City.objects.filter(pk=pk).afirst()
+        if city is None:
+            return error('Not found.', status.HTTP_404_NOT_FOUND)
+        return JsonResponse(CitySerializer(city).data)
+
+
+class AsyncFlightAlertList(AuthenticatedView):
+    async def get(self, request):
+        # Related objects are prefetched while iterating, so serializing runs no query.
+        flight_alerts = [alert async for alert in FlightAlert.objects.with_related().filter(user=request.user)]
+        return JsonResponse(FlightAlertSerializer(flight_alerts, many=True).data, safe=False)
+
+
+class AsyncFlightAlertDetail(AuthenticatedView):
+    async def get(self, request, pk):
+        flight_alert = await FlightAlert.objects.with_related().filter(pk=pk, user=request.user).afirst()
+        if flight_alert is None:
+            return error('Not found.', status.HTTP_404_NOT_FOUND)
+        return JsonResponse(FlightAlertSerializer(flight_alert).data)
+
+
+class RouteSearch(AuthenticatedView):
+    """
+    Live search of the cheapest flights of a route on Kiwi API.
+
+    The search is awaited, not run on a thread, so a worker serves many at
+    once. It is abandoned after TIMEOUT seconds with a 504, and when the
+    client disconnects Django cancels the view, which closes the upstream
+    connection.
+
+    Every flight lists the ids of the user's alerts it satisfies.
+    """
+
+    TIMEOUT = 20
+    MAX_LIMIT = 50
+
+    async def get(self, request):
+        try:
+            max_stopovers = int(request.GET.get('max_stopovers', 0))
+            limit = min(int(request.GET.get('limit', 10)), self.MAX_LIMIT)
+        except ValueError:
+            return error("'max_stopovers' and 'limit' should be integers.", status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return error("'limit' should be a positive integer.", status.HTTP_400_BAD_REQUEST)
+
+        from_code = request.GET.get('from', '').strip().upper()
+        to_code = request.GET.get('to', '').strip().upper()
+        flight_search = await sync_to_async(get_async_flight_search)()
+        try:
+            flights = await asyncio.wait_for(
+                flight_search.search_route(from_code, to_code, max_stopovers, limit), self.TIMEOUT
+            )
+        except ValueError as e:
+            return error(str(e), status.HTTP_400_BAD_REQUEST)
+        except asyncio.TimeoutError:
+            return error('The flight search timed out.', status.HTTP_504_GATEWAY_TIMEOUT)
+        except httpx.HTTPError:
+            return error('The flight search failed.', status.HTTP_502_BAD_GATEWAY)
+
+        alert_index = await sync_to_async(get_alert_index)()
+        matches = [
+            alert_index.match(from_code, to_code, flight.local_departure, flight.price) for flight in flights
+        ]
+        matched = {alert_id for alert_ids in matches for alert_id in alert_ids}
+        user_alerts = set()
+        if matched:
+            user_alerts = {
+                alert_id
+                async for alert_id in FlightAlert.objects.filter(user=request.user, id__in=matched)
+                .values_list('id', flat=True)
+            }
+
+        return JsonResponse([
+            {
+                'departure_airport': flight.departure_airport,
+                'arrival_airport': flight.arrival_airport,
+                'from_city': flight.from_city,
+                'to_city': flight.to_city,
+                'price': flight.price,
+                'local_departure': flight.local_departure,
+                'local_arrival': flight.local_arrival,
+                'step_over_city': flight.step_over_city,
+                'airline': flight.airline,
+                'stopovers': flight.stopovers,
+                'link': flight.link,
+                'alerts': sorted(user_alerts.intersection(alert_ids)),
+            }
+            for flight, alert_ids in zip(flights, matches)
+        ], safe=False)
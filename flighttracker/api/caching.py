@@ -0,0 +1,88 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import chain
+
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from city_index import CityIndex, destination_cities
+from tracker.models import City
+from .models import CityListVersion
+
+# Primary key of the single CityListVersion row.
+CITY_LIST_VERSION_ID = 1
+
+# (city list version, CityIndex) of the last index built in this process.
+_city_index = (None, None)
+_city_index_lock = threading.Lock()
+
+
+def city_list_version():
+    """
+    Return the version of the city list: the time of the last City write, in milliseconds.
+
+    The version lives in the database rather than in the cache, so every
+    process sees a write made by any other one.
+    """
+    version = CityListVersion.objects.filter(pk=CITY_LIST_VERSION_ID).values_list('version', flat=True).first()
+    return version or 0
+
+
+def bump_city_list_version():
+    """Start a new version of the city list, invalidating every cached page."""
+    now = int(time.time() * 1000)
+    # Computed by the database, so concurrent bumps still move the version forward.
+    updated = CityListVersion.objects.filter(pk=CITY_LIST_VERSION_ID).update(
+        version=Greatest(F('version') + 1, Value(now))
+    )
+    if not updated:
+        CityListVersion.objects.get_or_create(pk=CITY_LIST_VERSION_ID, defaults={'version': now})
+
+
+def request_city_list_version(request):
+    """Return the city list version, read once per request for its ETag, Last-Modified and cache key."""
+    # A DRF Request reads attributes it lacks from the HttpRequest it wraps.
+    version = getattr(request, 'city_list_version', None)
+    if version is None:
+        version = request.city_list_version = city_list_version()
+    return version
+
+
+def city_list_cache_key(request):
+    """Return the cache key of a city list page: the list version and the query string."""
+    query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    return f'api:cities:{request_city_list_version(request)}:{query}'
+
+
+def city_list_etag(request, *args, **kwargs):
+    return hashlib.md5(city_list_cache_key(request).encode()).hexdigest()
+
+
+def city_list_last_modified(request, *args, **kwargs):
+    # Last-Modified has whole seconds only; rounding the millisecond version
+    # down would date the list before the write that produced it.
+    return datetime.fromtimestamp(math.ceil(request_city_list_version(request) / 1000), tz=timezone.utc)
+
+
+def city_search_index():
+    """
+    Return the in-process search index of the City table and the destination files.
+
+    The index is rebuilt only when the city list version changes, so
+    lookups between City writes only read the version row.
+    """
+    global _city_index
+    version = city_list_version()
+    with _city_index_lock:
+        built_version, index = _city_index
+        if built_version != version:
+            cities = chain(
+                City.objects.values_list('name', 'iata_code'),
+                destination_cities(),
+            )
+            index = CityIndex(cities)
+            _city_index = (version, index)
+        return index
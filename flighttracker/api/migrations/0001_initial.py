@@ -0,0 +1,27 @@
+import time
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    CityListVersion = apps.get_model('api', 'CityListVersion')
+    CityListVersion.objects.create(pk=1, version=int(time.time() * 1000))
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CityListVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
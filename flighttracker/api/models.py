@@ -1,3 +1,14 @@
 from django.db import models
 
-# Create your models here.
+
+class CityListVersion(models.Model):
+    """
+    Version of the city list shared by every process: the time of the last City write, in milliseconds.
+
+    A single row, bumped by the City signals, keys the cached city list pages
+    and the in-process search indexes.
+    """
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.version)
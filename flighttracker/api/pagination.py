@@ -0,0 +1,34 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CityCursorPagination(CursorPagination):
+    """
+    Keyset pagination over cities by id.
+
+    Pagination is opt-in: only requests with a `page_size` or `cursor`
+    parameter get a page, so clients that do not paginate keep receiving
+    the whole list. The body stays a plain list of cities either way; the
+    neighbouring pages are advertised in a `Link` header.
+    """
+    ordering = 'id'
+    page_size = 500
+    page_size_query_param = 'page_size'
+    max_page_size = 5000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return the requested page, or None when the request asks for no page at all."""
+        if not any(param in request.query_params for param in (self.page_size_query_param, self.cursor_query_param)):
+            self.page = None
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_link_header(self):
+        """Return the `Link` header value for the current page, or None on a single page or unpaginated list."""
+        if self.page is None:
+            return None
+        links = [
+            f'<{url}>; rel="{rel}"'
+            for url, rel in ((self.get_next_link(), 'next'), (self.get_previous_link(), 'prev'))
+            if url
+        ]
+        return ', '.join(links) or None
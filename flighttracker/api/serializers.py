@@ -22,9 +22,39 @@ class RouteSerializer(serializers.ModelSerializer):
         model = Route
         fields = ['id', 'departure_city', 'destination_city', 'lowest_price']
 
+class BulkPrimaryKeyRelatedField(serializers.ManyRelatedField):
+    """A list of primary keys resolved with a single query instead of one per key."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = []
+        for pk in data:
+            # int() would also take True or 1.5; form data sends the ids as strings.
+            if isinstance(pk, bool) or not isinstance(pk, (int, str)):
+                self.child_relation.fail('incorrect_type', data_type=type(pk).__name__)
+            try:
+                pks.append(int(pk))
+            except ValueError:
+                self.child_relation.fail('incorrect_type', data_type=type(pk).__name__)
+        pks = list(dict.fromkeys(pks))
+
+        instances = self.child_relation.get_queryset().in_bulk(pks)
+        for pk in pks:
+            if pk not in instances:
+                self.child_relation.fail('does_not_exist', pk_value=pk)
+        return [instances[pk] for pk in pks]
+
 class FlightAlertSerializer(serializers.ModelSerializer):
     routes = RouteSerializer(many=True, read_only=True)
+    destination_cities = BulkPrimaryKeyRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(queryset=City.objects.all()),
+        allow_empty=False,
+    )
 
     class Meta:
         model = FlightAlert
-        fields = ['id', 'departure_city', 'destination_cities', 'start_date', 'end_date', 'routes']
\ No newline at end of file
+        fields = ['id', 'departure_city', 'destination_cities', 'start_date', 'end_date', 'max_price', 'routes']
\ No newline at end of file
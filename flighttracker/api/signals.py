@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tracker.models import City
+from .caching import bump_city_list_version
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def invalidate_city_list(sender, **kwargs):
+    bump_city_list_version()
@@ -1,13 +1,34 @@
+import asyncio
+import os
+import tempfile
+from datetime import date
 from decimal import Decimal
-from django.test import TestCase
+from unittest import mock
+
+import httpx
+from asgiref.sync import sync_to_async
 from django.test import TestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
 from django.urls import resolve, reverse
+from django.utils.http import http_date
 from rest_framework.test import APIRequestFactory, force_authenticate
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 
+from async_flight_search import AsyncFlightSearch
+from city_index import CityIndex
+from flight_search import FlightSearch
+from rate_limiter import RateLimiter
+from tracker.alert_index import AlertIndex
 from tracker.models import City, FlightAlert, Route
+from .async_views import RouteSearch
+from .caching import bump_city_list_version
+from .models import CityListVersion
+from .pagination import CityCursorPagination
 from .views import (
     CityDetail,
     CityList,
@@ -19,6 +40,17 @@ from .views import (
 )
 
 
+class QueryCountMixin:
+    """Helpers asserting that an endpoint runs a fixed number of queries."""
+
+    def assertViewQueries(self, expected, view, request, **kwargs):
+        """Call a view and assert it ran exactly `expected` queries, rendering included."""
+        with self.assertNumQueries(expected):
+            response = view(request, **kwargs)
+            response.render()
+        return response
+
+
 class LoginViewTestCase(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
@@ -139,6 +171,7 @@ class RegisterViewTestCase(TestCase):
 class CityListTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
+        cache.clear()
 
     def test_get_all_cities(self):
         City.objects.create(name="Test City 1", iata_code="TC1")
@@ -184,6 +217,107 @@ class CityListTest(TestCase):
         self.assertIn("iata_code", response.data)
 
 
+class CityListPaginationCacheTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        cache.clear()
+        City.objects.bulk_create(
+            City(name=f"City{index}", iata_code=f"C{index:02d}") for index in range(5)
+        )
+        # bulk_create sends no signals; start from a new list version.
+        bump_city_list_version()
+
+    def get(self, url="/cities/", **headers):
+        return CityList.as_view()(self.factory.get(url, **headers))
+
+    def test_pages_follow_the_link_header(self):
+        response = self.get("/cities/?page_size=2")
+        names = [city["name"] for city in response.data]
+        while "Link" in response and 'rel="next"' in response["Link"]:
+            next_url = response["Link"].split(">")[0].lstrip("<")
+            response = self.get(next_url)
+            names += [city["name"] for city in response.data]
+        self.assertEqual(names, [f"City{index}" for index in range(5)])
+
+    def test_lists_requested_without_a_page_are_complete(self):
+        with mock.patch.object(CityCursorPagination, "page_size", 2):
+            response = self.get()
+        self.assertEqual([city["name"] for city in response.data], [f"City{index}" for index in range(5)])
+        self.assertNotIn("Link", response)
+
+    def test_last_modified_is_not_earlier_than_the_last_write(self):
+        CityListVersion.objects.update(version=1_700_000_000_500)
+        response = self.get()
+        self.assertEqual(response["Last-Modified"], http_date(1_700_000_001))
+        response = self.get(HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.get(HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_repeated_requests_are_served_from_cache(self):
+        self.get()
+        # Only the list version is read.
+        with self.assertNumQueries(1):
+            response = self.get()
+        self.assertEqual(len(response.data), 5)
+
+    def test_city_write_invalidates_cache_and_etag(self):
+        etag = self.get()["ETag"]
+        City.objects.create(name="New City", iata_code="NEW")
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+
+
+    def test_version_bumped_by_another_process_invalidates_cache_and_etag(self):
+        etag = self.get()["ETag"]
+        # Another process wrote a City: only the shared version row changed here.
+        City.objects.bulk_create([City(name="New City", iata_code="NEW")])
+        CityListVersion.objects.update(version=F("version") + 1)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 6)
+
+
+class CitySearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        City.objects.create(name="São Paulo", iata_code="SAO")
+        City.objects.create(name="Santiago", iata_code="SCL")
+
+    def search(self, query, **params):
+        return self.client.get("/api/cities/search/", {"q": query, **params})
+
+    def test_prefix_ignores_case_and_accents(self):
+        response = self.search("sao p")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{"name": "São Paulo", "iata_code": "SAO"}])
+
+    def test_matches_iata_codes_and_destination_files(self):
+        self.assertEqual(self.search("scl").json()[0]["name"], "Santiago")
+        self.assertIn({"name": "Bangkok", "iata_code": "BKK"}, self.search("bang").json())
+
+    def test_fuzzy_fallback(self):
+        self.assertEqual(self.search("Santaigo").json()[0]["iata_code"], "SCL")
+
+    def test_index_is_rebuilt_after_city_writes_only(self):
+        self.search("sa")
+        # Only the list version is read.
+        with self.assertNumQueries(1):
+            self.search("san")
+        City.objects.create(name="Salvador", iata_code="SSA")
+        self.assertEqual(self.search("salv").json(), [{"name": "Salvador", "iata_code": "SSA"}])
+
+    def test_invalid_limit(self):
+        self.assertEqual(self.search("sa", limit="many").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search("sa", limit=0).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search("sa", limit=-5).status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class CityDetailTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
@@ -337,4 +471,282 @@ class FlightAlertDetailTest(TestCase):
         request.user = self.user
         response = FlightAlertDetail.as_view()(request, pk=self.flight_alert.id)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
-        self.assertFalse(FlightAlert.objects.filter(id=self.flight_alert.id).exists())
\ No newline at end of file
+        self.assertFalse(FlightAlert.objects.filter(id=self.flight_alert.id).exists())
+
+
+class FlightAlertQueryCountTest(QueryCountMixin, TestCase):
+    # The alerts with their user and departure city, then the destination
+    # cities and routes of every alert, each in one query.
+    EXPECTED_QUERIES = 3
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password"
+        )
+        self.departure_city = City.objects.create(name="Departure", iata_code="DEP")
+        self.cities = City.objects.bulk_create(
+            City(name=f"City{index}", iata_code=f"C{index:02d}") for index in range(5)
+        )
+
+    def create_alerts(self, count):
+        for _ in range(count):
+            flight_alert = FlightAlert.objects.create(user=self.user, departure_city=self.departure_city)
+            flight_alert.destination_cities.add(*self.cities)
+            flight_alert.routes.add(
+                *Route.objects.for_destinations(self.departure_city, [city.id for city in self.cities])
+            )
+        return flight_alert
+
+    def list_alerts(self):
+        request = self.factory.get("/flight-alerts/")
+        request.user = self.user
+        return self.assertViewQueries(self.EXPECTED_QUERIES, FlightAlertList.as_view(), request)
+
+    def test_list_query_count_is_constant(self):
+        self.create_alerts(1)
+        self.assertEqual(len(self.list_alerts().data), 1)
+        self.create_alerts(20)
+        response = self.list_alerts()
+        self.assertEqual(len(response.data), 21)
+        self.assertEqual(len(response.data[0]["routes"]), 5)
+
+    def test_detail_query_count(self):
+        flight_alert = self.create_alerts(1)
+        request = self.factory.get("/flight-alerts/{}/".format(flight_alert.id))
+        request.user = self.user
+        response = self.assertViewQueries(
+            self.EXPECTED_QUERIES, FlightAlertDetail.as_view(), request, pk=flight_alert.id
+        )
+        self.assertEqual(len(response.data["destination_cities"]), 5)
+
+    def test_str_query_count_is_constant(self):
+        self.create_alerts(10)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            names = [str(flight_alert) for flight_alert in FlightAlert.objects.with_related()]
+        self.assertEqual(len(names), 10)
+
+
+class FlightAlertBulkCreateTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password"
+        )
+        self.departure_city = City.objects.create(name="Departure", iata_code="DEP")
+        self.cities = City.objects.bulk_create(
+            City(name=f"City{index}", iata_code=f"C{index:02d}") for index in range(60)
+        )
+
+    def post_alert(self, cities):
+        request = self.factory.post(
+            "/flight-alerts/",
+            {
+                "departure_city": self.departure_city.id,
+                "destination_cities": [city.id for city in cities],
+            },
+        )
+        request.user = self.user
+        return FlightAlertList.as_view()(request)
+
+    def test_query_count_does_not_grow_with_destinations(self):
+        with CaptureQueriesContext(connection) as few:
+            self.post_alert(self.cities[:5])
+        with CaptureQueriesContext(connection) as many:
+            response = self.post_alert(self.cities[5:])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(len(response.data["routes"]), 55)
+
+    def test_existing_routes_are_reused(self):
+        existing = Route.objects.create(
+            departure_city=self.departure_city, destination_city=self.cities[0], lowest_price=300
+        )
+        response = self.post_alert(self.cities[:3])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Route.objects.count(), 3)
+        flight_alert = FlightAlert.objects.get(pk=response.data["id"])
+        self.assertIn(existing, flight_alert.routes.all())
+
+    def test_unknown_destination_creates_nothing(self):
+        request = self.factory.post(
+            "/flight-alerts/",
+            {"departure_city": self.departure_city.id, "destination_cities": [self.cities[0].id, 999999]},
+        )
+        request.user = self.user
+        response = FlightAlertList.as_view()(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("destination_cities", response.data)
+        self.assertFalse(FlightAlert.objects.exists())
+        self.assertFalse(Route.objects.exists())
+
+
+    def test_destinations_that_are_not_integers_are_rejected(self):
+        for pk in (True, 1.5, "1.5", None):
+            with self.subTest(pk=pk):
+                request = self.factory.post(
+                    "/flight-alerts/",
+                    {"departure_city": self.departure_city.id, "destination_cities": [self.cities[0].id, pk]},
+                    format="json",
+                )
+                request.user = self.user
+                response = FlightAlertList.as_view()(request)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn("Incorrect type", str(response.data["destination_cities"]))
+                self.assertFalse(FlightAlert.objects.exists())
+
+class AsyncReadViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.token = Token.objects.create(user=self.user)
+        self.departure_city = City.objects.create(name="Departure", iata_code="DEP")
+        self.cities = City.objects.bulk_create(
+            City(name=f"City{index}", iata_code=f"C{index:02d}") for index in range(5)
+        )
+        self.flight_alert = FlightAlert.objects.create(user=self.user, departure_city=self.departure_city)
+        self.flight_alert.destination_cities.add(*self.cities)
+        self.flight_alert.routes.add(
+            *Route.objects.for_destinations(self.departure_city, [city.id for city in self.cities])
+        )
+
+    async def get(self, path, **params):
+        return await self.async_client.get(path, params, headers={"Authorization": f"Token {self.token.key}"})
+
+    async def test_flight_alerts_match_sync_views(self):
+        response = await self.get("/api/async/flight-alerts/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(len(response.json()[0]["routes"]), 5)
+
+        response = await self.get(f"/api/async/flight-alerts/{self.flight_alert.id}/")
+        self.assertEqual(response.json()["destination_cities"], [city.id for city in self.cities])
+        self.assertEqual((await self.get("/api/async/flight-alerts/999999/")).status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_flight_alerts_require_authentication(self):
+        response = await self.async_client.get("/api/async/flight-alerts/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.get("/api/async/flight-alerts/", headers={"Authorization": "Token wrong"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_cities(self):
+        response = await self.get(f"/api/async/cities/{self.cities[0].id}/")
+        self.assertEqual(response.json(), {"id": self.cities[0].id, "name": "City0", "iata_code": "C00"})
+        self.assertEqual((await self.get("/api/async/cities/999999/")).status_code, status.HTTP_404_NOT_FOUND)
+        response = await self.get("/api/async/cities/search/", q="city4")
+        self.assertEqual(response.json(), [{"name": "City4", "iata_code": "C04"}])
+        response = await self.get("/api/async/cities/search/", q="city", limit=0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RouteSearchTest(TestCase):
+    RESULT = {
+        "flyFrom": "MEX", "flyTo": "MAD", "cityFrom": "Mexico City", "cityTo": "Madrid", "price": 512,
+        "deep_link": "https://example.com/deal",
+        "route": [
+            {"local_departure": "2030-01-09T22:00:00.000Z", "local_arrival": "2030-01-10T08:00:00.000Z",
+             "cityTo": "Madrid", "airline": "AM"},
+            {"local_departure": "2030-01-20T10:00:00.000Z", "local_arrival": "2030-01-20T18:00:00.000Z",
+             "cityTo": "Mexico City", "airline": "AM", "return": 1},
+        ],
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password")
+        self.token = Token.objects.create(user=self.user)
+        self.requests = []
+        self.started = asyncio.Event()
+        self.cancelled = False
+        self.delay = 0
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        flight_search = FlightSearch(
+            rate_limiter=RateLimiter(max_rate=1000, burst=1000, path=os.path.join(state_dir.name, "rate.json")),
+            city_index=CityIndex(),
+        )
+        searcher = AsyncFlightSearch(flight_search, transport=httpx.MockTransport(self.kiwi))
+        patcher = mock.patch("api.async_views.get_async_flight_search", return_value=searcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch("tracker.alert_index._alert_index", AlertIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def kiwi(self, request):
+        self.requests.append(request)
+        self.started.set()
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return httpx.Response(200, json={"data": [self.RESULT]})
+
+    async def search(self, **params):
+        params = {"from": "mex", "to": "MAD", **params}
+        return await self.async_client.get(
+            "/api/routes/search/", params, headers={"Authorization": f"Token {self.token.key}"}
+        )
+
+    async def test_returns_flights(self):
+        response = await self.search(limit=5)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        flight, = response.json()
+        self.assertEqual(flight["price"], 512)
+        self.assertEqual(flight["local_departure"], "2030-01-09")
+        self.assertEqual(flight["stopovers"], 0)
+        self.assertEqual(self.requests[0].url.params["fly_from"], "MEX")
+        self.assertEqual(self.requests[0].url.params["limit"], "5")
+
+    def create_alert(self, user, max_price):
+        departure_city = City.objects.get_or_create(name="Mexico City", iata_code="MEX")[0]
+        destination_city = City.objects.get_or_create(name="Madrid", iata_code="MAD")[0]
+        alert = FlightAlert.objects.create(
+            user=user, departure_city=departure_city,
+            start_date=date(2030, 1, 1), end_date=date(2030, 1, 31), max_price=max_price,
+        )
+        alert.routes.add(*Route.objects.for_destinations(departure_city, [destination_city.id]))
+        return alert
+
+    async def test_lists_the_alerts_of_the_user_each_flight_satisfies(self):
+        create_alert = sync_to_async(self.create_alert)
+        satisfied = await create_alert(self.user, Decimal("600"))
+        await create_alert(self.user, Decimal("400"))
+        other_user = await sync_to_async(User.objects.create_user)(username="other", password="password")
+        await create_alert(other_user, None)
+
+        flight, = (await self.search()).json()
+        self.assertEqual(flight["alerts"], [satisfied.id])
+
+    async def test_invalid_arguments(self):
+        self.assertEqual((await self.search(to="Madrid")).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual((await self.search(limit="all")).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual((await self.search(max_stopovers=-1)).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.requests, [])
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get("/api/routes/search/", {"from": "MEX", "to": "MAD"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_times_out(self):
+        self.delay = 10
+        with mock.patch.object(RouteSearch, "TIMEOUT", 0.05):
+            response = await self.search()
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+        self.assertTrue(self.cancelled)
+
+    async def test_disconnect_cancels_upstream_request(self):
+        self.delay = 10
+        request = asyncio.ensure_future(self.search())
+        await asyncio.wait_for(self.started.wait(), timeout=5)
+        # Django cancels the view this way when the client goes away.
+        request.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await request
+        self.assertTrue(self.cancelled)
+
+    async def test_concurrent_searches_share_one_worker(self):
+        self.delay = 0.2
+        responses = await asyncio.wait_for(asyncio.gather(*(self.search() for _ in range(50))), timeout=5)
+        self.assertTrue(all(response.status_code == status.HTTP_200_OK for response in responses))
+        self.assertEqual(len(self.requests), 50)
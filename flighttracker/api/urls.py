@@ -1,12 +1,18 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path("login/", views.LoginView.as_view()),
     path("logout/", views.LogoutView.as_view()),
     path("register/", views.RegisterView.as_view()),
     path("cities/", views.CityList.as_view()),
+    path("cities/search/", views.CitySearch.as_view()),
     path("cities/<int:pk>/", views.CityDetail.as_view()),
     path("flight-alerts/", views.FlightAlertList.as_view()),
     path("flight-alerts/<int:pk>/", views.FlightAlertDetail.as_view()),
+    path("async/cities/search/", async_views.AsyncCitySearch.as_view()),
+    path("async/cities/<int:pk>/", async_views.AsyncCityDetail.as_view()),
+    path("async/flight-alerts/", async_views.AsyncFlightAlertList.as_view()),
+    path("async/flight-alerts/<int:pk>/", async_views.AsyncFlightAlertDetail.as_view()),
+    path("routes/search/", async_views.RouteSearch.as_view()),
 ]
@@ -5,6 +5,12 @@ from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import authenticate, login, logout
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from .caching import city_list_cache_key, city_list_etag, city_list_last_modified, city_search_index
+from .pagination import CityCursorPagination
 from .serializers import FlightAlertSerializer, UserSerializer, CitySerializer
 from tracker.models import City, FlightAlert, Route
 
@@ -42,10 +48,26 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class CityList(APIView):
+    pagination_class = CityCursorPagination
+
+    @method_decorator(condition(etag_func=city_list_etag, last_modified_func=city_list_last_modified))
     def get(self, request):
-        cities = City.objects.all()
-        serializer = CitySerializer(cities, many=True)
-        return Response(serializer.data)
+        # Pages are cached per list version; any City write starts a new one.
+        key = city_list_cache_key(request)
+        page = cache.get(key)
+        if page is None:
+            paginator = self.pagination_class()
+            cities = paginator.paginate_queryset(City.objects.all(), request, view=self)
+            if cities is None:
+                cities = City.objects.all()
+            serializer = CitySerializer(cities, many=True)
+            page = ([dict(city) for city in serializer.data], paginator.get_link_header())
+            cache.set(key, page)
+        data, link = page
+        response = Response(data)
+        if link:
+            response['Link'] = link
+        return response
 
     def post(self, request):
         serializer = CitySerializer(data=request.data)
@@ -54,6 +76,20 @@ class CityList(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class CitySearch(APIView):
+    MAX_LIMIT = 50
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'limit': ['A valid integer is required.']}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'limit': ['Ensure this value is greater than or equal to 1.']}, status=status.HTTP_400_BAD_REQUEST)
+        cities = city_search_index().search(query, limit)
+        return Response([{'name': name, 'iata_code': iata_code} for name, iata_code in cities])
+
 class CityDetail(APIView):
     def get(self, request, pk):
         city = City.objects.get(pk=pk)
@@ -77,17 +113,22 @@ class FlightAlertList(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        flight_alerts = FlightAlert.objects.filter(user=request.user)
+        flight_alerts = FlightAlert.objects.with_related().filter(user=request.user)
         serializer = FlightAlertSerializer(flight_alerts, many=True)
         return Response(serializer.data)
 
     def post(self, request):
         serializer = FlightAlertSerializer(data=request.data)
         if serializer.is_valid():
-            flight_alert = serializer.save(user=request.user)
-            for destination_city in request.data['destination_cities']:
-                route, created = Route.objects.get_or_create(departure_city=flight_alert.departure_city, destination_city_id=destination_city)
-                flight_alert.routes.add(route)
+            with transaction.atomic():
+                flight_alert = serializer.save(user=request.user)
+                routes = Route.objects.for_destinations(
+                    flight_alert.departure_city,
+                    [city.id for city in serializer.validated_data['destination_cities']],
+                )
+                FlightAlert.routes.through.objects.bulk_create(
+                    [FlightAlert.routes.through(flightalert=flight_alert, route=route) for route in routes]
+                )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -96,7 +137,7 @@ class FlightAlertDetail(APIView):
 
     def get(self, request, pk):
         try:
-            flight_alert = FlightAlert.objects.get(pk=pk, user=request.user)
+            flight_alert = FlightAlert.objects.with_related().get(pk=pk, user=request.user)
             serializer = FlightAlertSerializer(flight_alert)
             return Response(serializer.data)
         except FlightAlert.DoesNotExist:
@@ -1,3 +1,14 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import FlightAlert
+
+
+@admin.register(FlightAlert)
+class FlightAlertAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'start_date', 'end_date')
+    filter_horizontal = ('destination_cities',)
+    raw_id_fields = ('user', 'departure_city', 'routes')
+
+    def get_queryset(self, request):
+        # __str__ lists the destination cities of every alert on the page.
+        return super().get_queryset(request).with_related()
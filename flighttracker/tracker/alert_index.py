@@ -0,0 +1,298 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+# Seconds after which the shared index is reloaded from the database. Signals
+# only see the writes of their own process; the reload picks up the others.
+RELOAD_INTERVAL = 5 * 60
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over closed intervals.
+
+    Every node keeps the intervals containing its center sorted by start and
+    by end, so a stabbing query walks one root-to-leaf path and only reads
+    intervals that match: O(log n + k).
+    """
+
+    def __init__(self, intervals):
+        """
+        Args:
+            intervals (list): (start, end, value) tuples with start <= end.
+        """
+        self._root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+        center = endpoints[len(endpoints) // 2]
+        here = [interval for interval in intervals if interval[0] <= center <= interval[1]]
+        return (
+            center,
+            sorted(here, key=lambda interval: interval[0]),
+            sorted(here, key=lambda interval: interval[1], reverse=True),
+            self._build([interval for interval in intervals if interval[1] < center]),
+            self._build([interval for interval in intervals if interval[0] > center]),
+        )
+
+    def stab(self, point):
+        """
+        Yield the value of every interval containing a point.
+
+        Args:
+            point: A value comparable with the interval bounds.
+        """
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if point < center:
+                for start, _, value in by_start:
+                    if start > point:
+                        break
+                    yield value
+                node = left
+            elif point > center:
+                for _, end, value in by_end:
+                    if end < point:
+                        break
+                    yield value
+                node = right
+            else:
+                for _, _, value in by_start:
+                    yield value
+                return
+
+
+class RouteAlerts:
+    """The alerts watching one route: their date windows and price thresholds."""
+
+    def __init__(self, alerts):
+        """
+        Args:
+            alerts (dict): Alert ids mapped to (start_date, end_date, max_price); max_price may be None.
+        """
+        self.alerts = alerts
+        self.windows = IntervalTree(
+            (start_date, end_date, alert_id) for alert_id, (start_date, end_date, _) in alerts.items()
+        )
+        # Alerts sorted by the highest price they accept; None accepts any price.
+        thresholds = sorted(
+            (Decimal("Infinity") if max_price is None else max_price, alert_id)
+            for alert_id, (_, _, max_price) in alerts.items()
+        )
+        self.prices = [price for price, _ in thresholds]
+        self.price_alerts = [alert_id for _, alert_id in thresholds]
+
+    def match(self, departure_date, price):
+        """Return the ids of the alerts whose window contains the date and whose threshold the price meets."""
+        # Walk whichever side is narrower and check the other condition per alert.
+        first_affordable = bisect.bisect_left(self.prices, price)
+        affordable = len(self.prices) - first_affordable
+        if affordable <= len(self.alerts) // 2:
+            return [
+                alert_id
+                for alert_id in self.price_alerts[first_affordable:]
+                if self.alerts[alert_id][0] <= departure_date <= self.alerts[alert_id][1]
+            ]
+        return [
+            alert_id
+            for alert_id in self.windows.stab(departure_date)
+            if self.alerts[alert_id][2] is None or price <= self.alerts[alert_id][2]
+        ]
+
+
+class AlertIndex:
+    """
+    In-memory index answering "which alerts does this fare satisfy?".
+
+    Alerts are grouped by the (departure, destination) IATA codes of their
+    routes; each group holds an interval tree of the alert date windows and
+    the alerts sorted by price threshold. Changing an alert only rebuilds the
+    groups of the routes it touches.
+
+    The index lives in the process that built it; `tracker.signals` keeps it
+    in sync with writes made through the ORM in that process.
+
+    Attributes:
+        loaded_at (float): Time of the last full load, or None if never loaded.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded_at = None
+        # alert id -> (route keys, start_date, end_date, max_price)
+        self._alerts = {}
+        # route key -> ids of the alerts watching it
+        self._route_alert_ids = defaultdict(set)
+        # route key -> RouteAlerts
+        self._routes = {}
+        # ids of the alerts added or removed while a load reads the database
+        self._changed_during_load = None
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def load(self, alerts=None):
+        """
+        Index every alert, replacing the current contents.
+
+        The new contents are built aside, outside the lock, and swapped in at
+        once, so matches made meanwhile keep seeing the previous ones. Alerts
+        changed while the database is read are re-read afterwards.
+
+        Args:
+            alerts (iterable): FlightAlert objects. Defaults to every alert in the database.
+        """
+        with self._lock:
+            if self._changed_during_load is None:
+                self._changed_during_load = set()
+        loaded_at = time.time()
+        if alerts is None:
+            alerts = self._queryset()
+        entries = {alert.id: self._entry(alert) for alert in alerts}
+        route_alert_ids = defaultdict(set)
+        for alert_id, entry in entries.items():
+            for route_key in entry[0]:
+                route_alert_ids[route_key].add(alert_id)
+        routes = {
+            route_key: RouteAlerts({alert_id: entries[alert_id][1:] for alert_id in alert_ids})
+            for route_key, alert_ids in route_alert_ids.items()
+        }
+        with self._lock:
+            self._alerts, self._route_alert_ids, self._routes = entries, route_alert_ids, routes
+            self.loaded_at = loaded_at
+            changed, self._changed_during_load = self._changed_during_load, None
+        for alert_id in changed:
+            self.refresh(alert_id)
+
+    def refresh(self, alert_id):
+        """
+        Re-read one alert from the database and update the index.
+
+        Args:
+            alert_id (int): The alert created, updated or deleted.
+        """
+        alert = self._queryset().filter(pk=alert_id).first()
+        if alert is None:
+            self.remove(alert_id)
+        else:
+            self.add(alert)
+
+    def add(self, alert):
+        """
+        Index an alert, replacing its previous version.
+
+        Args:
+            alert (FlightAlert): The alert, with its routes and their cities loaded.
+        """
+        with self._lock:
+            self._note_change(alert.id)
+            previous = self._unindex(alert.id)
+            entry = self._index(alert.id, self._entry(alert))
+            self._rebuild(set(entry[0]) | set(previous[0] if previous else ()))
+
+    def remove(self, alert_id):
+        """
+        Drop an alert from the index.
+
+        Args:
+            alert_id (int): The alert deleted.
+        """
+        with self._lock:
+            self._note_change(alert_id)
+            previous = self._unindex(alert_id)
+            if previous is not None:
+                self._rebuild(previous[0])
+
+    def match(self, departure_code, destination_code, departure_date, price):
+        """
+        Return the alerts a fare satisfies.
+
+        Args:
+            departure_code (str): IATA code the fare departs from.
+            destination_code (str): IATA code the fare flies to.
+            departure_date (datetime.date): Departure date of the fare.
+            price (Decimal): Price of the fare.
+
+        Returns:
+            list: Ids of the alerts watching the route whose date window contains the departure
+            date and whose maximum price, if any, is not exceeded.
+        """
+        route_alerts = self._routes.get((departure_code, destination_code))
+        if route_alerts is None:
+            return []
+        return route_alerts.match(departure_date, Decimal(str(price)))
+
+    def _note_change(self, alert_id):
+        if self._changed_during_load is not None:
+            self._changed_during_load.add(alert_id)
+
+    def _index(self, alert_id, entry):
+        self._alerts[alert_id] = entry
+        for route_key in entry[0]:
+            self._route_alert_ids[route_key].add(alert_id)
+        return entry
+
+    def _unindex(self, alert_id):
+        entry = self._alerts.pop(alert_id, None)
+        if entry is not None:
+            for route_key in entry[0]:
+                self._route_alert_ids[route_key].discard(alert_id)
+        return entry
+
+    def _rebuild(self, route_keys):
+        """Rebuild the structures of the given routes from the alerts watching them."""
+        for route_key in route_keys:
+            alert_ids = self._route_alert_ids.get(route_key)
+            if alert_ids:
+                self._routes[route_key] = RouteAlerts(
+                    {alert_id: self._alerts[alert_id][1:] for alert_id in alert_ids}
+                )
+            else:
+                self._route_alert_ids.pop(route_key, None)
+                self._routes.pop(route_key, None)
+
+    @staticmethod
+    def _entry(alert):
+        routes = tuple(
+            (route.departure_city.iata_code, route.destination_city.iata_code)
+            for route in alert.routes.all()
+        )
+        return routes, alert.start_date, alert.end_date, alert.max_price
+
+    @staticmethod
+    def _queryset():
+        from .models import FlightAlert
+
+        return FlightAlert.objects.prefetch_related('routes__departure_city', 'routes__destination_city')
+
+
+_alert_index = AlertIndex()
+
+
+def get_alert_index(load=True):
+    """
+    Return the process-wide AlertIndex.
+
+    Args:
+        load (bool): Load every alert on first use, and again once the index is older than
+            `RELOAD_INTERVAL`. Pass False to get the index as it is, e.g. to update it only if loaded.
+
+    Returns:
+        AlertIndex: The shared index.
+    """
+    index = _alert_index
+    if load and not _fresh(index):
+        with index._lock:
+            if not _fresh(index):
+                index.load()
+    return index
+
+
+def _fresh(index):
+    return index.loaded and time.time() - index.loaded_at < RELOAD_INTERVAL
@@ -0,0 +1,148 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from flight_search import FlightSearch
+from tracker.alert_index import get_alert_index
+from tracker.models import FlightData, Route
+
+
+class Command(BaseCommand):
+    help = "Search every route, store the flights found and update the lowest prices."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Routes loaded and written per batch.")
+        parser.add_argument("--workers", type=int, default=8, help="Searches running at the same time.")
+        parser.add_argument(
+            "--destinations-per-query",
+            type=int,
+            default=10,
+            help="Destinations of the same departure city coalesced into one search.",
+        )
+        parser.add_argument("--max-stopovers", type=int, default=0)
+
+    def handle(self, *args, **options):
+        flight_searcher = FlightSearch()
+        routes_seen = flights_found = prices_lowered = 0
+        matched_alerts = set()
+        last_id = 0
+
+        # Keyset pagination keeps every batch a single indexed query, however
+        # many routes there are.
+        while True:
+            batch = list(
+                Route.objects.select_related("departure_city", "destination_city")
+                .filter(id__gt=last_id)
+                .order_by("id")[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            flights = self.search_batch(flight_searcher, batch, options)
+            lowered = self.store_batch(batch, flights)
+            # Fetched per batch so a long run picks up the periodic reload.
+            alert_index = get_alert_index()
+            for (departure, destination), flight in flights.items():
+                matched_alerts.update(
+                    alert_index.match(departure, destination, flight.local_departure, flight.price)
+                )
+            routes_seen += len(batch)
+            flights_found += len(flights)
+            prices_lowered += lowered
+            self.stdout.write(f"{routes_seen} routes searched, {prices_lowered} lowest prices updated")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Refreshed {routes_seen} routes: {flights_found} flights stored, "
+                f"{prices_lowered} lowest prices updated, {len(matched_alerts)} alerts matched."
+            )
+        )
+
+    def search_batch(self, flight_searcher, routes, options):
+        """
+        Search every distinct departure/destination pair of a batch of routes.
+
+        Destinations sharing a departure city are coalesced into one request
+        and the requests run concurrently.
+
+        Args:
+            flight_searcher (FlightSearch): Used to run the searches.
+            routes (list): The routes of the batch, with their cities loaded.
+            options (dict): The command options.
+
+        Returns:
+            dict: (departure IATA code, destination IATA code) tuples mapped to the cheapest flight found.
+        """
+        destinations = defaultdict(set)
+        for route in routes:
+            destinations[route.departure_city.iata_code].add(route.destination_city.iata_code)
+
+        size = options["destinations_per_query"]
+        queries = []
+        for departure, codes in destinations.items():
+            codes = sorted(codes)
+            queries.extend((departure, codes[start:start + size]) for start in range(0, len(codes), size))
+
+        def search(query):
+            departure, codes = query
+            try:
+                return flight_searcher.search_flights([departure], codes, options["max_stopovers"])
+            except Exception as e:
+                self.stderr.write(f"Error searching {departure} to {', '.join(codes)}: {e}")
+                return {}
+
+        flights = {}
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for found in executor.map(search, queries):
+                flights.update(found)
+        return flights
+
+    def store_batch(self, routes, flights):
+        """
+        Store the flights found for a batch and lower the prices they beat.
+
+        Everything is written in one transaction with one `bulk_create` and
+        one `bulk_update`, whatever the size of the batch.
+
+        Args:
+            routes (list): The routes of the batch, with their cities loaded.
+            flights (dict): (departure IATA code, destination IATA code) tuples mapped to the cheapest flight found.
+
+        Returns:
+            int: Number of routes whose lowest price went down.
+        """
+        observations = [
+            FlightData(
+                departure_airport=flight.departure_airport,
+                arrival_airport=flight.arrival_airport,
+                from_city=flight.from_city,
+                to_city=flight.to_city,
+                price=self.to_decimal(flight.price),
+                local_departure=flight.local_departure,
+                local_arrival=flight.local_arrival,
+                step_over_city=flight.step_over_city,
+                airline=flight.airline,
+                link=flight.link,
+            )
+            for flight in flights.values()
+        ]
+
+        lowered = []
+        for route in routes:
+            flight = flights.get((route.departure_city.iata_code, route.destination_city.iata_code))
+            if flight is not None and self.to_decimal(flight.price) < route.lowest_price:
+                route.lowest_price = self.to_decimal(flight.price)
+                lowered.append(route)
+
+        with transaction.atomic():
+            FlightData.objects.bulk_create(observations)
+            Route.objects.bulk_update(lowered, ["lowest_price"])
+        return len(lowered)
+
+    @staticmethod
+    def to_decimal(price):
+        return Decimal(str(price)).quantize(Decimal("0.01"))
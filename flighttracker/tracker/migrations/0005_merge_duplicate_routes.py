@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+def merge_duplicate_routes(apps, schema_editor):
+    """Keep the oldest route per city pair, moving alerts and the lowest price onto it."""
+    Route = apps.get_model('tracker', 'Route')
+    FlightAlertRoutes = apps.get_model('tracker', 'FlightAlert').routes.through
+
+    kept = {}
+    for route in Route.objects.order_by('id'):
+        pair = (route.departure_city_id, route.destination_city_id)
+        original = kept.setdefault(pair, route)
+        if original is route:
+            continue
+        if route.lowest_price < original.lowest_price:
+            original.lowest_price = route.lowest_price
+            original.save(update_fields=['lowest_price'])
+        alert_ids = FlightAlertRoutes.objects.filter(route=route).values_list('flightalert_id', flat=True)
+        FlightAlertRoutes.objects.bulk_create(
+            [FlightAlertRoutes(flightalert_id=alert_id, route=original) for alert_id in alert_ids],
+            ignore_conflicts=True,
+        )
+        route.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0004_remove_flightalert_flights_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='route',
+            name='lowest_price',
+            field=models.DecimalField(decimal_places=2, default=9999.99, max_digits=10),
+        ),
+        migrations.RunPython(merge_duplicate_routes, migrations.RunPython.noop),
+    ]
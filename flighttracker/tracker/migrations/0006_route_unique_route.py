@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Kept apart from the data migration: PostgreSQL refuses to alter a
+    # table with pending trigger events in the same transaction.
+    dependencies = [
+        ('tracker', '0005_merge_duplicate_routes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='route',
+            constraint=models.UniqueConstraint(fields=('departure_city', 'destination_city'), name='unique_route'),
+        ),
+    ]
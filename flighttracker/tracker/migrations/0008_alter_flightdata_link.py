@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0007_flightalert_max_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='flightdata',
+            name='link',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
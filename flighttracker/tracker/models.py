@@ -9,19 +9,61 @@ class City(models.Model):
     def __str__(self):
         return f"{self.name} ({self.iata_code})"
 
+class RouteQuerySet(models.QuerySet):
+    def for_destinations(self, departure_city, destination_city_ids):
+        """
+        Return the routes from a city to each destination, creating the missing ones in bulk.
+
+        Existing routes are read with one query and the missing ones are
+        inserted with one `bulk_create`; a concurrent insert of the same route
+        is absorbed by the unique constraint and picked up by a final read.
+        Call it inside a transaction.
+        """
+        destination_city_ids = list(dict.fromkeys(destination_city_ids))
+        routes = {
+            route.destination_city_id: route
+            for route in self.filter(departure_city=departure_city, destination_city_id__in=destination_city_ids)
+        }
+        missing = [city_id for city_id in destination_city_ids if city_id not in routes]
+        if missing:
+            self.bulk_create(
+                [Route(departure_city=departure_city, destination_city_id=city_id) for city_id in missing],
+                ignore_conflicts=True,
+            )
+            routes.update(
+                (route.destination_city_id, route)
+                for route in self.filter(departure_city=departure_city, destination_city_id__in=missing)
+            )
+        return [routes[city_id] for city_id in destination_city_ids]
+
 class Route(models.Model):
     departure_city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='departure_routes')
     destination_city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='arrival_routes')
     lowest_price = models.DecimalField(max_digits=10, decimal_places=2, default=9999.99)
 
+    objects = RouteQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['departure_city', 'destination_city'], name='unique_route'),
+        ]
+
+class FlightAlertQuerySet(models.QuerySet):
+    def with_related(self):
+        """Load the cities and routes every alert is displayed with, in a constant number of queries."""
+        return self.select_related('user', 'departure_city').prefetch_related('destination_cities', 'routes')
+
 class FlightAlert(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     departure_city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='departure_city')
     destination_cities = models.ManyToManyField(City, related_name='destination_cities')
     start_date = models.DateField(default=date.today)
     end_date = models.DateField(default=date(date.today().year + 1, 12, 31))
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     routes = models.ManyToManyField(Route, related_name='flight_alerts')
 
+    objects = FlightAlertQuerySet.as_manager()
+
     def __str__(self):
         destination_cities_str = ', '.join(city.name for city in self.destination_cities.all())
         return f"{self.user.username} - {self.departure_city.name} to {destination_cities_str}"
@@ -36,7 +78,8 @@ class FlightData(models.Model):
     local_arrival = models.DateField()
     step_over_city = models.CharField(max_length=100, null=True, blank=True)
     airline = models.CharField(max_length=100)
-    link = models.URLField(null=True, blank=True)
+    # Kiwi deep links carry a booking token and run well past URLField's 200 characters.
+    link = models.TextField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.from_city} to {self.to_city} on {self.local_departure}"
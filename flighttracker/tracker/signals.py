@@ -0,0 +1,57 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .alert_index import get_alert_index
+from .models import FlightAlert, Route
+
+
+def loaded_index():
+    # An index this process has not loaded yet reads every alert on first use anyway.
+    index = get_alert_index(load=False)
+    return index if index.loaded else None
+
+
+def schedule_refresh(alert_id):
+    # Routes are attached after the alert is saved, so the alert is re-read
+    # once the transaction commits.
+    index = loaded_index()
+    if index is not None:
+        transaction.on_commit(lambda: index.refresh(alert_id))
+
+
+@receiver(post_save, sender=FlightAlert)
+def refresh_saved_alert(sender, instance, **kwargs):
+    schedule_refresh(instance.pk)
+
+
+@receiver(post_delete, sender=FlightAlert)
+def remove_deleted_alert(sender, instance, **kwargs):
+    index = loaded_index()
+    if index is not None:
+        alert_id = instance.pk
+        transaction.on_commit(lambda: index.remove(alert_id))
+
+
+@receiver(m2m_changed, sender=FlightAlert.routes.through)
+def refresh_alert_routes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_refresh(instance.pk)
+    elif pk_set:
+        for alert_id in pk_set:
+            schedule_refresh(alert_id)
+    else:
+        # A route cleared of its alerts does not report which ones they were.
+        index = loaded_index()
+        if index is not None:
+            transaction.on_commit(index.load)
+
+
+@receiver(pre_delete, sender=Route)
+def refresh_route_alerts(sender, instance, **kwargs):
+    # Deleting a route drops its alert links without an m2m_changed signal.
+    if loaded_index() is not None:
+        for alert_id in instance.flight_alerts.values_list('id', flat=True):
+            schedule_refresh(alert_id)
@@ -1,3 +1,214 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from flight_data import FlightData as SearchResult
+from tracker.alert_index import AlertIndex, IntervalTree, get_alert_index
+from tracker.models import City, FlightAlert, FlightData, Route
+
+
+class FakeFlightSearch:
+    """Stands in for FlightSearch, answering every pair at a fixed price."""
+
+    def __init__(self, price, link="https://example.com/deal"):
+        self.price = price
+        self.link = link
+        self.queries = []
+
+    def search_flights(self, from_cities, to_cities, max_stopovers=0):
+        self.queries.append((list(from_cities), list(to_cities)))
+        return {
+            (from_city, to_city): SearchResult(
+                from_city, to_city, from_city, to_city, self.price,
+                "2030-01-10", "2030-01-20", None, "AM", self.link, 0,
+            )
+            for from_city in from_cities
+            for to_city in to_cities
+        }
+
+
+class RefreshRoutesCommandTest(TestCase):
+    def setUp(self):
+        self.origin = City.objects.create(name="Mexico City", iata_code="MEX")
+        # Loaded up front so that only the refreshes are counted.
+        self.alert_index = AlertIndex()
+        self.alert_index.load()
+        patcher = mock.patch("tracker.alert_index._alert_index", self.alert_index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_routes(self, count, lowest_price=500, prefix="D"):
+        destinations = City.objects.bulk_create(
+            City(name=f"City {prefix}{index}", iata_code=f"{prefix}{index:02d}")
+            for index in range(count)
+        )
+        return Route.objects.bulk_create(
+            Route(departure_city=self.origin, destination_city=destination, lowest_price=lowest_price)
+            for destination in destinations
+        )
+
+    def refresh(self, searcher, stdout=None, **options):
+        with mock.patch("tracker.management.commands.refresh_routes.FlightSearch", return_value=searcher):
+            with CaptureQueriesContext(connection) as queries:
+                call_command("refresh_routes", stdout=stdout or StringIO(), **options)
+        return len(queries)
+
+    def test_lowers_prices_and_stores_flights(self):
+        cheaper, = self.create_routes(1, lowest_price=500, prefix="A")
+        pricier, = self.create_routes(1, lowest_price=100, prefix="B")
+
+        self.refresh(FakeFlightSearch(price=250))
+
+        cheaper.refresh_from_db()
+        pricier.refresh_from_db()
+        self.assertEqual(cheaper.lowest_price, Decimal("250.00"))
+        self.assertEqual(pricier.lowest_price, Decimal("100.00"))
+        self.assertEqual(FlightData.objects.count(), 2)
+        self.assertEqual(FlightData.objects.first().local_departure, date(2030, 1, 10))
+
+    def test_stores_long_booking_links_in_full(self):
+        self.create_routes(1)
+        link = "https://www.kiwi.com/deep?booking_token=" + "x" * 1500
+        self.refresh(FakeFlightSearch(price=250, link=link))
+        self.assertEqual(FlightData.objects.get().link, link)
+
+    def test_query_count_does_not_grow_with_routes(self):
+        self.create_routes(3)
+        few = self.refresh(FakeFlightSearch(price=250))
+        Route.objects.all().delete()
+        self.create_routes(40, prefix="E")
+        many = self.refresh(FakeFlightSearch(price=200))
+        self.assertEqual(few, many)
+
+    def test_reports_alerts_matched_by_the_shared_index(self):
+        route, = self.create_routes(1)
+        user = User.objects.create_user(username="traveller", password="secret")
+        with self.captureOnCommitCallbacks(execute=True):
+            alert = FlightAlert.objects.create(
+                user=user, departure_city=self.origin, start_date=date(2030, 1, 1), end_date=date(2030, 1, 31),
+            )
+            alert.routes.add(route)
+        stdout = StringIO()
+        self.refresh(FakeFlightSearch(price=250), stdout=stdout)
+        self.assertIn("1 alerts matched", stdout.getvalue())
+
+    def test_coalesces_destinations_per_departure_city(self):
+        self.create_routes(25)
+        searcher = FakeFlightSearch(price=250)
+        self.refresh(searcher, destinations_per_query=10)
+        self.assertEqual([len(to_cities) for _, to_cities in searcher.queries], [10, 10, 5])
+
+
+class AlertIndexTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="traveller", password="secret")
+        self.origin = City.objects.create(name="Mexico City", iata_code="MEX")
+        self.destination = City.objects.create(name="Madrid", iata_code="MAD")
+        self.route = Route.objects.create(departure_city=self.origin, destination_city=self.destination)
+        self.index = AlertIndex()
+        patcher = mock.patch("tracker.alert_index._alert_index", self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_alert(self, start_date, end_date, max_price=None):
+        alert = FlightAlert.objects.create(
+            user=self.user, departure_city=self.origin,
+            start_date=start_date, end_date=end_date, max_price=max_price,
+        )
+        alert.routes.add(self.route)
+        return alert
+
+    def match(self, day, price):
+        return sorted(self.index.match("MEX", "MAD", date(2030, 1, day), Decimal(price)))
+
+    def test_interval_tree_stabs_every_containing_interval(self):
+        intervals = [(start, start + length, (start, length)) for start in range(30) for length in (0, 3, 10)]
+        tree = IntervalTree(intervals)
+        for point in range(-1, 42):
+            expected = sorted(value for start, end, value in intervals if start <= point <= end)
+            self.assertEqual(sorted(tree.stab(point)), expected)
+
+    def test_matches_date_window_and_price_threshold(self):
+        january = self.create_alert(date(2030, 1, 1), date(2030, 1, 31))
+        early = self.create_alert(date(2030, 1, 1), date(2030, 1, 10), max_price=Decimal("300"))
+        late = self.create_alert(date(2030, 1, 20), date(2030, 2, 10), max_price=Decimal("800"))
+        self.index.load()
+
+        self.assertEqual(self.match(5, "250"), sorted([january.id, early.id]))
+        self.assertEqual(self.match(5, "350"), [january.id])
+        self.assertEqual(self.match(25, "800"), sorted([january.id, late.id]))
+        self.assertEqual(self.match(25, "900"), [january.id])
+        self.assertEqual(self.index.match("MEX", "BCN", date(2030, 1, 5), 100), [])
+
+    def test_matches_keep_the_previous_contents_during_a_reload(self):
+        alert = self.create_alert(date(2030, 1, 1), date(2030, 1, 10))
+        self.index.load()
+        seen_during_reload = []
+
+        def alerts():
+            for reloaded in FlightAlert.objects.all():
+                seen_during_reload.append(self.match(5, "500"))
+                yield reloaded
+
+        self.index.load(alerts())
+        self.assertEqual(seen_during_reload, [[alert.id]])
+        self.assertEqual(self.match(5, "500"), [alert.id])
+
+    def test_alerts_added_during_a_reload_are_kept(self):
+        first = self.create_alert(date(2030, 1, 1), date(2030, 1, 10))
+        added = []
+
+        def alerts():
+            # Read before the second alert exists, as a reload racing a write would.
+            for reloaded in list(FlightAlert.objects.all()):
+                second = self.create_alert(date(2030, 1, 1), date(2030, 1, 10))
+                self.index.add(second)
+                added.append(second)
+                yield reloaded
+
+        self.index.load(alerts())
+        self.assertEqual(self.match(5, "500"), sorted([first.id, added[0].id]))
+
+    def test_shared_index_loads_on_first_use_and_reloads_when_stale(self):
+        alert = self.create_alert(date(2030, 1, 1), date(2030, 1, 10))
+        self.assertFalse(get_alert_index(load=False).loaded)
+        self.assertIs(get_alert_index(), self.index)
+        self.assertEqual(self.match(5, "500"), [alert.id])
+
+        # A write from another process, invisible to this one's signals.
+        FlightAlert.objects.filter(pk=alert.pk).update(max_price=Decimal("300"))
+        self.assertEqual(self.match(5, "500"), [alert.id])
+        self.index.loaded_at -= 60 * 60
+        get_alert_index()
+        self.assertEqual(self.match(5, "500"), [])
+
+    def test_follows_alert_changes(self):
+        get_alert_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            alert = self.create_alert(date(2030, 1, 1), date(2030, 1, 10))
+        self.assertEqual(self.match(5, "500"), [alert.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            alert.max_price = Decimal("300")
+            alert.save()
+        self.assertEqual(self.match(5, "500"), [])
+        self.assertEqual(self.match(5, "300"), [alert.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            alert.routes.clear()
+        self.assertEqual(self.match(5, "300"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            alert.routes.add(self.route)
+        self.assertEqual(self.match(5, "300"), [alert.id])
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks(execute=True):
+            alert.delete()
+        self.assertEqual(self.match(5, "300"), [])
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "PUT", "DELETE"}
+
+
+class HttpClient:
+    """
+    A pooled HTTP client shared by the API wrappers.
+
+    Every host gets its own `requests.Session` with a keep-alive connection
+    pool, so repeated calls to the same API reuse TCP/TLS connections.
+    Idempotent requests that time out, fail to connect or return a 5xx are
+    retried with jittered exponential backoff.
+
+    Attributes:
+        timeout (float | tuple): Default (connect, read) timeout in seconds applied to every request.
+        max_retries (int): Number of retries after the first attempt.
+        backoff_factor (float): Base delay in seconds for the exponential backoff.
+        max_backoff (float): Upper bound in seconds for a single backoff delay.
+        pool_maxsize (int): Maximum number of pooled connections kept per host.
+    """
+
+    def __init__(
+        self,
+        timeout=(5, 30),
+        max_retries=3,
+        backoff_factor=0.5,
+        max_backoff=30,
+        pool_maxsize=16,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, url):
+        """
+        Return the pooled session for the host of a URL.
+
+        Args:
+            url (str): Any URL on the host.
+
+        Returns:
+            requests.Session: The session bound to that host.
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount(f"{host}/", adapter)
+                self._sessions[host] = session
+            return session
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request, retrying transient failures of idempotent methods.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Target URL.
+            **kwargs: Passed through to `requests.Session.request`.
+
+        Returns:
+            requests.Response: The last response received.
+
+        Raises:
+            requests.RequestException: If the last attempt failed to get a response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        method = method.upper()
+        retries = self.max_retries if method in RETRY_METHODS else 0
+        session = self.session(url)
+        for attempt in range(retries + 1):
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == retries:
+                    return response
+                # Release the connection to the pool before waiting for the next attempt.
+                response.close()
+            time.sleep(self._backoff(attempt))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close every pooled connection."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    def _backoff(self, attempt):
+        """Full jitter: a random delay up to the exponential cap."""
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """
+    Return the process-wide HttpClient, creating it on first use.
+
+    Returns:
+        HttpClient: The shared client.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
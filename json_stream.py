@@ -0,0 +1,106 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",]}"
+
+
+class _Buffer:
+    """Text decoded so far from a stream of byte chunks, consumed from the front."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.text = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def read_more(self):
+        """Append the next chunk, dropping what was already consumed. Returns False at the end of the stream."""
+        if self.exhausted:
+            return False
+        self.text = self.text[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            if chunk:
+                self.text += self._utf8.decode(chunk)
+                return True
+        self.text += self._utf8.decode(b"", final=True)
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Skip whitespace and return the next character, or "" at the end of the stream."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.read_more():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in the JSON stream, found {found or 'end of stream'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value, reading more of the stream until it is complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.read_more():
+                    raise
+                continue
+            # A number cut by a chunk boundary ("12" of "12.5") decodes fine, so
+            # scalars only count once the delimiter after them has arrived.
+            if not isinstance(value, (dict, list, str)):
+                if (end == len(self.text) or self.text[end] not in _DELIMITERS) and self.read_more():
+                    continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks, key):
+    """
+    Yields the items of an array nested under `key` in a streamed JSON object.
+
+    Only the object's top level is walked: other members are decoded and
+    discarded, and each array item is yielded as soon as its closing
+    bracket arrives, so at most one item and one network chunk are held in
+    memory at a time.
+
+    Args:
+        chunks (iterable): Byte chunks of a UTF-8 JSON document, e.g. `requests.Response.iter_content()`.
+        key (str): Top-level member holding the array.
+
+    Yields:
+        The decoded array items, in order. Nothing is yielded if the member is missing.
+
+    Raises:
+        ValueError: If the document is malformed or truncated.
+    """
+    buffer = _Buffer(chunks)
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        name = buffer.value()
+        buffer.expect(":")
+        if name == key and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() == "]":
+                return
+            while True:
+                yield buffer.value()
+                if buffer.peek() == "]":
+                    return
+                buffer.expect(",")
+        buffer.value()
+        if buffer.peek() == "}":
+            return
+        buffer.expect(",")
@@ -0,0 +1,73 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pyshorteners
+from pyshorteners.exceptions import BadAPIResponseException, BadURLException, ShorteningErrorException
+from requests import RequestException
+
+from cache import CACHE_DIR, PersistentCache
+
+
+class LinkShortener:
+    """
+    Shortens booking links through TinyURL, remembering every link it has shortened.
+
+    Attributes:
+        cache (PersistentCache): Persistent deep link to short link cache.
+        max_workers (int): Maximum number of links shortened at the same time.
+    """
+
+    def __init__(self, cache=None, max_workers=8, timeout=5):
+        self.cache = cache if cache is not None else PersistentCache(
+            os.path.join(CACHE_DIR, "short_links.json"), max_entries=10000
+        )
+        self.max_workers = max_workers
+        self.shortener = pyshorteners.Shortener(timeout=timeout)
+
+    def shorten(self, link):
+        """
+        Returns the short version of a link.
+
+        Args:
+            link (str): The link to shorten.
+
+        Returns:
+            str: The short link, or the original link if TinyURL could not shorten it.
+        """
+        return self.shorten_many([link])[link]
+
+    def shorten_many(self, links):
+        """
+        Shortens several links concurrently, only calling TinyURL for links not cached yet.
+
+        Args:
+            links (list): Links to shorten.
+
+        Returns:
+            dict: Every given link mapped to its short link, or to itself if it could not be shortened.
+        """
+        short_links = {}
+        pending = []
+        for link in set(links):
+            cached = self.cache.get(link)
+            if cached:
+                short_links[link] = cached
+            else:
+                pending.append(link)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                shortened = dict(zip(pending, executor.map(self._shorten_remote, pending)))
+            self.cache.update({link: short for link, short in shortened.items() if short})
+            for link, short in shortened.items():
+                short_links[link] = short or link
+
+        return short_links
+
+    def _shorten_remote(self, link):
+        try:
+            return self.shortener.tinyurl.short(link)
+        # pyshorteners exceptions share no base class besides Exception.
+        except (BadURLException, BadAPIResponseException, ShorteningErrorException, RequestException) as e:
+            print(f"Error shortening link: {str(e)}")
+            return None
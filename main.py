@@ -1,7 +1,20 @@
-import json
+import glob
+import heapq
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
 from data_manager import DataManager
+from deals import PriceMatrix, evaluate_deals
+from destination_store import DESTINATIONS_DIR, DestinationStore
 from flight_search import FlightSearch
+from link_shortener import LinkShortener
 from notification_manager import NotificationManager
+from price_history import PriceHistory
+from scheduler import RouteScheduler
 
 
 class PriceTracker:
@@ -12,17 +25,46 @@ class PriceTracker:
         data_manager (DataManager): An instance of DataManager for managing destination data.
         flight_searcher (FlightSearch): An instance of FlightSearch for searching flights.
         notification_manager (NotificationManager): An instance of NotificationManager for sending notifications.
+        link_shortener (LinkShortener): An instance of LinkShortener for shortening the links of notified flights.
+        scheduler (RouteScheduler): An instance of RouteScheduler for picking destinations in incremental runs.
+        price_history (PriceHistory): An instance of PriceHistory recording every price observed.
+        deal_thresholds (dict): Keyword arguments for `evaluate_deals` (min_drop, min_drop_pct, min_zscore).
+        max_workers (int): Maximum number of flight searches allowed in flight at the same time.
+        destinations_per_query (int): Number of destinations coalesced into a single search request.
+        alternatives (int): Number of other flights listed under each deal in the notification.
     """
 
-    def __init__(self):
+    def __init__(self, max_workers=8, destinations_per_query=1, deal_thresholds=None, alternatives=0):
         self.data_manager = DataManager()
         self.flight_searcher = FlightSearch()
         self.notification_manager = NotificationManager()
+        self.link_shortener = LinkShortener()
+        self.scheduler = RouteScheduler()
+        self.price_history = PriceHistory()
+        self.max_workers = max_workers
+        self.destinations_per_query = destinations_per_query
+        self.destination_stores = {}
+        self.deal_thresholds = deal_thresholds or {}
+        self.alternatives = alternatives
 
-    @staticmethod
-    def load_data(continent):
+    def destination_store(self, continent):
         """
-        Load destination data from a JSON file.
+        Return the journaled store backing a continent's destination file.
+
+        Args:
+            continent (str): The name of the continent.
+
+        Returns:
+            DestinationStore: The store, created on first use.
+        """
+        store = self.destination_stores.get(continent)
+        if store is None:
+            store = self.destination_stores[continent] = DestinationStore(continent)
+        return store
+
+    def load_data(self, continent):
+        """
+        Load destination data from its JSON file and change journal.
 
         Args:
             continent (str): The name of the continent for which to load data.
@@ -30,8 +72,20 @@ class PriceTracker:
         Returns:
             dict: The loaded destination data.
         """
-        with open(f"destinations/{continent}.json", "r") as destinations_file:
-            return json.load(destinations_file)
+        return self.destination_store(continent).load()
+
+    def update_destination(self, continent, destination_data, city, **fields):
+        """
+        Change fields of a destination, recording them for the next save.
+
+        Args:
+            continent (str): The name of the continent the destination belongs to.
+            destination_data (dict): The destination data containing the destination.
+            city (str): The destination city.
+            **fields: Field names and their new values.
+        """
+        self.destination_store(continent).update(city, **fields)
+        destination_data["destinations"][city].update(fields)
 
     def update_iata_codes(self, continent, destination_data):
         """
@@ -41,47 +95,239 @@ class PriceTracker:
             continent (str): The name of the continent for which to update data.
             destination_data (dict): The destination data containing information about cities and their lowest prices.
         """
-        for destination in destination_data["destinations"].values():
+        for city, destination in destination_data["destinations"].items():
             if not destination.get("iataCode"):
                 iata_code = self.flight_searcher.get_iata_code(destination["city"])
-                destination["iataCode"] = iata_code
-                destination_data["destinations"][destination["city"]][
-                    "iataCode"
-                ] = iata_code
-        self.save_destination_data(continent, destination_data)
+                self.update_destination(continent, destination_data, city, iataCode=iata_code)
+        self.save_destination_data(continent)
 
-    def find_lowest_prices(self, continent, destination_data):
+    def find_lowest_prices(self, continent, destination_data, cities=None, notify=True):
         """
         Find the lowest price for each city by comparing it with current prices fetched using FlightSearch.
 
         Args:
             continent (str): The name of the continent for which to check prices.
             destination_data (dict): The destination data containing information about cities and their lowest prices.
+            cities (list, optional): Only search these destination cities. Defaults to every destination.
+            notify (bool, optional): Send the notification right away. Defaults to True.
+
+        Returns:
+            str: The notification text for the new lowest prices, or None if there are none.
         """
-        text = None
-        for destination in destination_data["destinations"].values():
-            new_low_price_flight = None
-            for depart_city in destination_data["departure_cities"]:
-                flight = self.flight_searcher.search_flight(
-                    depart_city, destination["iataCode"], 2
-                )
-                if flight and (
-                    not new_low_price_flight
-                    or flight.price < new_low_price_flight.price
-                ):
-                    new_low_price_flight = flight
-
-            if (
-                new_low_price_flight
-                and new_low_price_flight.price < destination["lowestPrice"]
-            ):
-                destination["lowestPrice"] = new_low_price_flight.price
-                flight_details = new_low_price_flight.get_flight_data()
-                text = f"{text}\n{flight_details}"
-                print(flight_details)
-
-        if text is not None:
+        matrix = self.search_price_matrix(destination_data, cities)
+        return self.report_deals(continent, destination_data, matrix, notify)
+
+    def search_price_matrix(self, destination_data, cities=None):
+        """
+        Search flights from every departure city to each destination.
+
+        Args:
+            destination_data (dict): The destination data containing information about cities and their lowest prices.
+            cities (list, optional): Only search these destination cities. Defaults to every destination.
+
+        Returns:
+            PriceMatrix: The cheapest flight per destination and departure city.
+        """
+        destinations = destination_data["destinations"]
+        cities = [city for city in destinations if cities is None or city in cities]
+        matrix = PriceMatrix(cities, destination_data["departure_cities"])
+        # Whole seconds, like the history timestamps, so the observations
+        # recorded below all fall at or after it.
+        matrix.searched_at = int(time.time())
+        observations = {}
+
+        # Every departure city (and a block of destinations) is coalesced
+        # into one request; the blocks are network bound, so they are fanned
+        # out to the pool and collected into the matrix as they land. When
+        # alternatives are wanted, the same request returns the cheapest few
+        # flights per pair instead of one.
+        top_k = self.alternatives + 1
+        blocks = [
+            {
+                destinations[city]["iataCode"]: city
+                for city in cities[start:start + self.destinations_per_query]
+            }
+            for start in range(0, len(cities), self.destinations_per_query)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.search_block, destination_data["departure_cities"], list(block), top_k): block
+                for block in blocks
+            }
+            for future in as_completed(futures):
+                block = futures[future]
+                candidates = {}
+                for (depart_city, iata_code), flights in future.result().items():
+                    observations[f"{depart_city}-{iata_code}"] = flights[0]
+                    matrix.add(block[iata_code], depart_city, flights[0])
+                    candidates.setdefault(block[iata_code], []).extend(flights)
+                if self.alternatives:
+                    for city, flights in candidates.items():
+                        matrix.alternatives[city] = heapq.nsmallest(top_k, flights, key=lambda flight: flight.price)
+
+        # Every origin/destination result is kept, not only the winners.
+        self.price_history.append_flights(observations)
+        self.price_history.flush()
+
+        return matrix
+
+    def search_block(self, departure_cities, iata_codes, top_k=1):
+        """
+        Search a block of destinations from every departure city with one request.
+
+        Args:
+            departure_cities (list): The departure cities.
+            iata_codes (list): IATA codes of the destinations in the block.
+            top_k (int, optional): Number of flights kept per departure city and destination. Defaults to 1.
+
+        Returns:
+            dict: (departure city, IATA code) tuples mapped to their cheapest flights, cheapest first.
+        """
+        if top_k > 1:
+            return self.flight_searcher.search_top_flights(departure_cities, iata_codes, top_k, "pair", 2)
+        return {
+            pair: [flight]
+            for pair, flight in self.flight_searcher.search_flights(departure_cities, iata_codes, 2).items()
+        }
+
+    def report_deals(self, continent, destination_data, matrix, notify=True):
+        """
+        Store the flights that beat the known lowest prices and notify about them.
+
+        The whole matrix is evaluated in one pass by `evaluate_deals`, using
+        the thresholds in `deal_thresholds`.
+
+        Args:
+            continent (str): The name of the continent the flights belong to.
+            destination_data (dict): The destination data containing information about cities and their lowest prices.
+            matrix (PriceMatrix): The prices found by the sweep.
+            notify (bool, optional): Send the notification right away. Defaults to True.
+
+        Returns:
+            str: The notification text for the new lowest prices, or None if there are none.
+        """
+        destinations = destination_data["destinations"]
+        lowest_prices = [destinations[city]["lowestPrice"] for city in matrix.destinations]
+        thresholds = dict(self.deal_thresholds)
+        if thresholds.get("min_zscore") is not None:
+            routes = [
+                f"{origin}-{destinations[city]['iataCode']}"
+                for city in matrix.destinations
+                for origin in matrix.origins
+            ]
+            # The sweep's own observations are already in the history; scoring a
+            # price against a sample containing it pulls every z-score towards 0.
+            mean, std, _ = self.price_history.moments(routes, until=matrix.searched_at)
+            thresholds["mean"] = mean.reshape(matrix.prices.shape)
+            thresholds["std"] = std.reshape(matrix.prices.shape)
+        evaluation = evaluate_deals(matrix.prices, lowest_prices, **thresholds)
+
+        deals = []
+        for row in np.flatnonzero(evaluation["is_deal"]):
+            city = matrix.destinations[row]
+            new_low_price_flight = matrix.flights[(row, evaluation["best_origin"][row])]
+            self.update_destination(
+                continent,
+                destination_data,
+                city,
+                lowestPrice=new_low_price_flight.price,
+            )
+            alternatives = [
+                flight
+                for flight in matrix.alternatives.get(city, [])
+                if flight is not new_low_price_flight
+            ][:self.alternatives]
+            deals.append((new_low_price_flight, alternatives))
+
+        if not deals:
+            return None
+
+        # Only flights that make it into the notification get a short link.
+        notified = [
+            flight for deal, alternatives in deals for flight in [deal, *alternatives]
+        ]
+        short_links = self.link_shortener.shorten_many(
+            [flight.link for flight in notified if flight.link]
+        )
+        for flight in notified:
+            if flight.link:
+                flight.link = short_links[flight.link]
+
+        lines = []
+        for flight, alternatives in deals:
+            flight_details = flight.get_flight_data()
+            lines.append(flight_details)
+            print(flight_details)
+            for alternative in alternatives:
+                lines.append(f"  - {alternative.get_flight_data()}")
+
+        text = "\n".join(lines)
+        self.save_destination_data(continent)
+        if notify:
             self.send_notification(text)
+        return text
+
+    def find_lowest_prices_incremental(self, continent, destination_data, budget, notify=True):
+        """
+        Search only the destinations the scheduler considers due, up to a budget.
+
+        Stable routes are refreshed rarely and volatile ones often, so a fixed
+        number of searches per run is spent where prices actually move.
+
+        Args:
+            continent (str): The name of the continent for which to check prices.
+            destination_data (dict): The destination data containing information about cities and their lowest prices.
+            budget (int): Maximum number of destinations searched on this run.
+            notify (bool, optional): Send the notification right away. Defaults to True.
+
+        Returns:
+            str: The notification text for the new lowest prices, or None if there are none.
+        """
+        routes = {
+            f"{continent}:{destination['iataCode']}": city
+            for city, destination in destination_data["destinations"].items()
+        }
+        due_routes = self.scheduler.select(list(routes), budget)
+        cities = [routes[route] for route in due_routes]
+        if not cities:
+            return None
+
+        matrix = self.search_price_matrix(destination_data, cities)
+        cheapest_flights = matrix.cheapest()
+        self.scheduler.record(
+            {
+                route: cheapest_flights[routes[route]].price if routes[route] in cheapest_flights else None
+                for route in due_routes
+            }
+        )
+        return self.report_deals(continent, destination_data, matrix, notify)
+
+    def run(self, continent, reset_prices=True, scan_budget=None, notify=True):
+        """
+        Run the full flow for one continent: reset, IATA update, price search and sheet sync.
+
+        Args:
+            continent (str): The name of the continent to sweep.
+            reset_prices (bool, optional): Reset the stored lowest prices first. Defaults to True.
+            scan_budget (int, optional): Maximum number of destinations searched. None sweeps every destination.
+            notify (bool, optional): Send the notification right away. Defaults to True.
+
+        Returns:
+            str: The notification text for the new lowest prices, or None if there are none.
+        """
+        if reset_prices:
+            self.reset_lowest_prices(continent)
+
+        destination_data = self.load_data(continent)
+        self.update_iata_codes(continent, destination_data)
+        if scan_budget is None:
+            text = self.find_lowest_prices(continent, destination_data, notify=notify)
+        else:
+            text = self.find_lowest_prices_incremental(
+                continent, destination_data, scan_budget, notify=notify
+            )
+        self.sync_sheet(destination_data)
+        return text
 
     def reset_lowest_prices(self, continent, price=1500):
         """
@@ -92,20 +338,46 @@ class PriceTracker:
             price (int, optional): The new lowest price. Defaults to 1500.
         """
         destination_data = self.load_data(continent)
-        for destination in destination_data["destinations"].values():
-            destination["lowestPrice"] = price
-        self.save_destination_data(continent, destination_data)
+        for city in destination_data["destinations"]:
+            self.update_destination(continent, destination_data, city, lowestPrice=price)
+        self.save_destination_data(continent)
 
-    def save_destination_data(self, continent, data):
+    def save_destination_data(self, continent):
         """
-        Save the updated destination data back into its corresponding JSON file.
+        Save the changed destinations to the continent's change journal.
+
+        Only the changed records are written, under a per-file lock; the
+        journal is periodically compacted into the JSON file with an atomic
+        rename.
 
         Args:
             continent (str): The name of the continent for which to save data.
-            data (dict): The updated destination data.
         """
-        with open(f"destinations/{continent}.json", "w+") as destinations_file:
-            json.dump(data, destinations_file)
+        self.destination_store(continent).flush()
+
+    def sync_sheet(self, destination_data):
+        """
+        Write the IATA codes and lowest prices of the destinations to the Sheety sheet.
+
+        Sheet rows are matched to destinations by city; cities missing on
+        either side are left alone and only the fields that changed are sent.
+
+        Args:
+            destination_data (dict): The destination data containing information about cities and their lowest prices.
+
+        Returns:
+            int: Number of rows written.
+        """
+        destinations = destination_data["destinations"]
+        current_rows = self.data_manager.get_prices() or []
+        rows = []
+        for row in current_rows:
+            destination = destinations.get(row.get("city"))
+            if destination is not None:
+                rows.append(
+                    {"id": row["id"], "iataCode": destination.get("iataCode"), "lowestPrice": destination["lowestPrice"]}
+                )
+        return self.data_manager.sync_prices(rows, current_rows)
 
     def send_notification(self, message):
         """
@@ -117,16 +389,75 @@ class PriceTracker:
         self.notification_manager.send_email(message)
 
 
-if __name__ == "__main__":
-    tracker = PriceTracker()
+def sweep_continent(continent, reset_prices=True, scan_budget=None):
+    """
+    Sweep one continent without notifying, for use in a worker process.
 
-    RESET_PRICES = True
+    Args:
+        continent (str): The name of the continent to sweep.
+        reset_prices (bool, optional): Reset the stored lowest prices first. Defaults to True.
+        scan_budget (int, optional): Maximum number of destinations searched. None sweeps every destination.
+
+    Returns:
+        str: The notification text for the new lowest prices, or None if there are none.
+    """
+    return PriceTracker().run(continent, reset_prices, scan_budget, notify=False)
 
-    continent = sys.argv[1].lower() if len(sys.argv) > 1 else "asia"
 
-    if RESET_PRICES:
-        tracker.reset_lowest_prices(continent)
+def sweep(continents, reset_prices=True, scan_budget=None):
+    """
+    Sweep several continents in parallel and send a single merged notification.
+
+    Each continent runs in its own process. The IATA code, search result and
+    short link caches and the rate limiter live on disk, so the processes
+    share them. A continent whose sweep fails is reported and left out of the
+    notification.
+
+    Args:
+        continents (list): The names of the continents to sweep.
+        reset_prices (bool, optional): Reset the stored lowest prices first. Defaults to True.
+        scan_budget (int, optional): Maximum number of destinations searched per continent.
+    """
+    texts = {}
+    with ProcessPoolExecutor(max_workers=len(continents)) as executor:
+        futures = {
+            executor.submit(sweep_continent, continent, reset_prices, scan_budget): continent
+            for continent in continents
+        }
+        for future in as_completed(futures):
+            continent = futures[future]
+            try:
+                texts[continent] = future.result()
+            except Exception as e:
+                # The other continents still get their notification.
+                print(f"Error sweeping {continent}: {str(e)}")
+
+    text = "\n".join(texts[continent] for continent in continents if texts.get(continent))
+    if text:
+        NotificationManager().send_email(text)
+
+
+def available_continents():
+    """Return the names of every continent with a file in `destinations/`."""
+    return sorted(
+        os.path.splitext(os.path.basename(file_name))[0]
+        for file_name in glob.glob(os.path.join(DESTINATIONS_DIR, "*.json"))
+    )
+
+
+if __name__ == "__main__":
+    RESET_PRICES = True
+    # Maximum number of destinations searched per run. None sweeps every
+    # destination; a number lets the scheduler pick the most overdue ones
+    # (use it with RESET_PRICES = False so stored prices carry over).
+    SCAN_BUDGET = None
+
+    # One or more continents, or "all" for every file in destinations/.
+    continents = [arg.lower() for arg in sys.argv[1:]] or ["asia"]
+    if "all" in continents:
+        continents = available_continents()
 
-    destination_data = tracker.load_data(continent)
-    tracker.update_iata_codes(continent, destination_data)
-    tracker.find_lowest_prices(continent, destination_data)
+    if len(continents) == 1:
+        PriceTracker().run(continents[0], RESET_PRICES, SCAN_BUDGET)
+    else:
+        sweep(continents, RESET_PRICES, SCAN_BUDGET)
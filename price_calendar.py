@@ -0,0 +1,224 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+
+from cache import CACHE_DIR, PersistentCache
+from flight_search import FlightSearch
+
+# Itineraries requested per calendar search; Kiwi API caps this at 1000. With
+# `one_per_date` a route returns one itinerary per departure day, well below it.
+CALENDAR_LIMIT = 1000
+
+
+class RouteCalendar:
+    """
+    Cheapest price per departure day of one route.
+
+    A sparse table of running minimum positions is built once, so the
+    cheapest day of any range is answered with two lookups.
+
+    Attributes:
+        start (datetime.date): First day of the calendar.
+        prices (numpy.ndarray): Cheapest price per day from `start`, `inf` on days without a known flight.
+    """
+
+    def __init__(self, start, prices):
+        self.start = start
+        self.prices = np.asarray(prices, dtype=np.float64)
+        # _table[j][i] is the position of the minimum of prices[i:i + 2**j].
+        self._table = [np.arange(len(self.prices))]
+        width = 1
+        while 2 * width <= len(self.prices):
+            previous = self._table[-1]
+            left, right = previous[:len(previous) - width], previous[width:]
+            self._table.append(np.where(self.prices[left] <= self.prices[right], left, right))
+            width *= 2
+
+    @classmethod
+    def from_records(cls, start, days, records):
+        """
+        Builds a calendar from the itineraries of a bulk search.
+
+        Args:
+            start (datetime.date): First day of the calendar.
+            days (int): Number of days covered.
+            records (numpy.ndarray): Itineraries of the route, with `flight_data.FLIGHT_RECORD_DTYPE`.
+
+        Returns:
+            RouteCalendar: The calendar.
+        """
+        prices = np.full(days, np.inf)
+        offsets = (records["local_departure"] - np.datetime64(start, "D")).astype(np.int64)
+        inside = (offsets >= 0) & (offsets < days)
+        np.minimum.at(prices, offsets[inside], records["price"][inside])
+        return cls(start, prices)
+
+    @classmethod
+    def from_json(cls, value):
+        """Builds a calendar from the value stored by `to_json`."""
+        prices = [np.inf if price is None else price for price in value["prices"]]
+        return cls(date.fromisoformat(value["start"]), prices)
+
+    def to_json(self):
+        """Returns a JSON serialisable form of the calendar."""
+        return {
+            "start": self.start.isoformat(),
+            "prices": [None if np.isinf(price) else float(price) for price in self.prices],
+        }
+
+    def price_on(self, day):
+        """
+        Returns the cheapest price departing on a day.
+
+        Args:
+            day (datetime.date): Departure day.
+
+        Returns:
+            float: The price, or None if no flight is known for that day.
+        """
+        offset = (day - self.start).days
+        if not 0 <= offset < len(self.prices) or np.isinf(self.prices[offset]):
+            return None
+        return float(self.prices[offset])
+
+    def cheapest(self, since=None, until=None):
+        """
+        Returns the cheapest day to depart in a date range.
+
+        Args:
+            since (datetime.date): First day of the range. Defaults to the first day of the calendar.
+            until (datetime.date): Day after the end of the range. Defaults to the end of the calendar.
+
+        Returns:
+            tuple: (day, price), or None if no flight is known in the range.
+        """
+        low = 0 if since is None else max(0, (since - self.start).days)
+        high = len(self.prices) if until is None else min(len(self.prices), (until - self.start).days)
+        if low >= high:
+            return None
+        level = (high - low).bit_length() - 1
+        left, right = self._table[level][low], self._table[level][high - (1 << level)]
+        best = left if self.prices[left] <= self.prices[right] else right
+        if np.isinf(self.prices[best]):
+            return None
+        return self.start + timedelta(days=int(best)), float(self.prices[best])
+
+
+class PriceCalendar:
+    """
+    Per-route price calendars built from searches and cached on disk.
+
+    Each route is searched once with `one_per_date`, so Kiwi API returns the
+    cheapest itinerary of every departure day in the window; they are
+    folded into a cheapest-per-day calendar, so later questions such as
+    "cheapest day to fly in March" need no API call. Days without any
+    flight have no price.
+
+    Attributes:
+        flight_searcher (FlightSearch): Used to run the bulk searches.
+        cache (PersistentCache): Calendars keyed on the route and maximum number of stopovers.
+        days (int): Number of departure days covered, starting a week from today like `FlightSearch`.
+    """
+
+    def __init__(self, flight_searcher=None, cache=None, ttl=6 * 60 * 60, days=174):
+        self.flight_searcher = flight_searcher or FlightSearch()
+        self.cache = cache if cache is not None else PersistentCache(
+            os.path.join(CACHE_DIR, "price_calendars.json"), ttl=ttl, max_entries=5000
+        )
+        self.days = days
+        self._calendars = {}
+
+    @staticmethod
+    def key(from_code, to_code, max_stopovers=0):
+        """Returns the cache key of a route calendar."""
+        return f"{from_code}-{to_code}:{max_stopovers}"
+
+    def calendar(self, from_code, to_code, max_stopovers=0):
+        """
+        Returns the calendar of a route, searching only when it is not cached.
+
+        Args:
+            from_code (str): IATA code of the departure city.
+            to_code (str): IATA code of the destination.
+            max_stopovers (int): Maximum number of stopovers allowed. Defaults to 0.
+
+        Returns:
+            RouteCalendar: The calendar, or None if the search failed.
+        """
+        key = self.key(from_code, to_code, max_stopovers)
+        value = self.cache.get(key)
+        if value is None:
+            return self.build([from_code], [to_code], max_stopovers).get((from_code, to_code))
+        # The sparse table is rebuilt only when the cached value was replaced.
+        source, calendar = self._calendars.get(key, (None, None))
+        if source is not value:
+            calendar = RouteCalendar.from_json(value)
+            self._calendars[key] = (value, calendar)
+        return calendar
+
+    def build(self, from_codes, to_codes, max_stopovers=0):
+        """
+        Builds and caches the calendars of every route, with one search per route.
+
+        Args:
+            from_codes (list): IATA codes of the departure cities.
+            to_codes (list): IATA codes of the destinations.
+            max_stopovers (int): Maximum number of stopovers allowed. Defaults to 0.
+
+        Returns:
+            dict: (from_code, to_code) tuples mapped to their RouteCalendar; routes whose search failed are left out.
+        """
+        start = date.today() + timedelta(days=7)
+        calendars = {}
+        for from_code in from_codes:
+            for to_code in to_codes:
+                # A coalesced search would share its itineraries among every
+                # route and leave most days of each calendar empty.
+                records, _ = self.flight_searcher.search_flight_records(
+                    [from_code], [to_code], max_stopovers, limit=CALENDAR_LIMIT, one_per_date=True
+                )
+                if len(records):
+                    calendars[(from_code, to_code)] = RouteCalendar.from_records(start, self.days, records)
+
+        values = {self.key(*route, max_stopovers): calendar.to_json() for route, calendar in calendars.items()}
+        self.cache.update(values)
+        for route, calendar in calendars.items():
+            key = self.key(*route, max_stopovers)
+            self._calendars[key] = (self.cache.get(key), calendar)
+        return calendars
+
+    def cheapest_day(self, from_code, to_code, since=None, until=None, max_stopovers=0):
+        """
+        Returns the cheapest day to fly a route in a date range.
+
+        Args:
+            from_code (str): IATA code of the departure city.
+            to_code (str): IATA code of the destination.
+            since (datetime.date): First departure day considered. Defaults to the start of the calendar.
+            until (datetime.date): Day after the last departure day considered. Defaults to the end of the calendar.
+            max_stopovers (int): Maximum number of stopovers allowed. Defaults to 0.
+
+        Returns:
+            tuple: (day, price), or None if no flight is known in the range.
+        """
+        calendar = self.calendar(from_code, to_code, max_stopovers)
+        if calendar is None:
+            return None
+        return calendar.cheapest(since, until)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: python price_calendar.py FROM TO [since] [until], with dates as YYYY-MM-DD")
+    from_code, to_code = sys.argv[1].upper(), sys.argv[2].upper()
+    since = date.fromisoformat(sys.argv[3]) if len(sys.argv) > 3 else None
+    until = date.fromisoformat(sys.argv[4]) if len(sys.argv) > 4 else None
+
+    cheapest = PriceCalendar().cheapest_day(from_code, to_code, since, until)
+    if cheapest is None:
+        print(f"No flight known from {from_code} to {to_code} in that range.")
+    else:
+        day, price = cheapest
+        print(f"Cheapest day from {from_code} to {to_code}: {day.isoformat()} at ${price:.0f}")
@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from cache import CACHE_DIR
+from file_lock import file_lock
+
+EPOCH = date(1970, 1, 1)
+
+
+class PriceHistory:
+    """
+    Append-only, columnar store of every price observation.
+
+    Observations are kept in fixed-size segments, one memory-mapped `.npy`
+    file per column, so appending writes straight into the mapped arrays and
+    queries scan the columns with NumPy without building a Python object per
+    row. Route and airline names are dictionary encoded into integer codes.
+    Several processes can append to the same directory: every flush holds a
+    file lock and re-reads the metadata first.
+
+    Attributes:
+        directory (str): Directory holding the segments and `meta.json`.
+        segment_size (int): Number of rows per segment.
+    """
+
+    COLUMNS = {
+        "route": np.int32,
+        "observed_at": np.int64,
+        "price": np.float64,
+        "departure": np.int32,
+        "return": np.int32,
+        "stopovers": np.int8,
+        "airline": np.int32,
+    }
+    # Columns appended as strings and stored as dictionary codes.
+    ENCODED_COLUMNS = ("route", "airline")
+
+    def __init__(self, directory=os.path.join(CACHE_DIR, "price_history"), segment_size=1 << 20):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.meta_path = os.path.join(directory, "meta.json")
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def append(self, route, price, departure, return_date, stopovers=0, airline="", observed_at=None):
+        """
+        Buffer one observation; it is written on the next `flush`.
+
+        Args:
+            route (str): Route key, e.g. "MEX-BKK".
+            price (float): Price observed.
+            departure (datetime.date): Departure date of the itinerary.
+            return_date (datetime.date): Return date of the itinerary.
+            stopovers (int): Number of stopovers on the way out.
+            airline (str): Airline operating the first leg.
+            observed_at (float): Unix timestamp of the observation. Defaults to now.
+        """
+        observed_at = int(time.time() if observed_at is None else observed_at)
+        with self._lock:
+            self._rows.append(
+                (
+                    route,
+                    observed_at,
+                    price,
+                    (departure - EPOCH).days,
+                    (return_date - EPOCH).days,
+                    stopovers,
+                    airline or "",
+                )
+            )
+
+    def append_flights(self, flights, observed_at=None):
+        """
+        Buffer a FlightData observation per route.
+
+        Args:
+            flights (dict): Route keys mapped to FlightData objects.
+            observed_at (float): Unix timestamp of the observations. Defaults to now.
+        """
+        for route, flight in flights.items():
+            self.append(
+                route,
+                flight.price,
+                flight.local_departure,
+                flight.local_arrival,
+                flight.stopovers,
+                flight.airline,
+                observed_at,
+            )
+
+    def flush(self):
+        """Write the buffered observations to disk."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+        pending = {
+            name: np.array(
+                [row[position] for row in rows],
+                dtype=str if name in self.ENCODED_COLUMNS else dtype,
+            )
+            for position, (name, dtype) in enumerate(self.COLUMNS.items())
+        }
+        total = len(pending["price"])
+
+        with file_lock(self.meta_path):
+            meta = self._read_meta()
+            pending["route"] = self._encode(meta["routes"], pending["route"])
+            pending["airline"] = self._encode(meta["airlines"], pending["airline"])
+
+            written = 0
+            while written < total:
+                if not meta["segments"] or meta["segments"][-1]["rows"] == self.segment_size:
+                    meta["segments"].append({"name": f"{len(meta['segments']):06d}", "rows": 0})
+                segment = meta["segments"][-1]
+                start = segment["rows"]
+                count = min(self.segment_size - start, total - written)
+                for name, values in pending.items():
+                    mapped = self._open_column(segment["name"], name, writable=True)
+                    mapped[start:start + count] = values[written:written + count]
+                    mapped.flush()
+                    del mapped
+                segment["rows"] = start + count
+                written += count
+
+            self._write_meta(meta)
+
+    @staticmethod
+    def _encode(dictionary, values):
+        """Map strings to their dictionary codes, adding new strings to the dictionary."""
+        unique, inverse = np.unique(values, return_inverse=True)
+        codes = np.array([dictionary.setdefault(str(value), len(dictionary)) for value in unique], dtype=np.int32)
+        return codes[inverse.reshape(-1)]
+
+    def prices(self, route, since=None, until=None):
+        """
+        Return every price observed for a route in a time window.
+
+        Args:
+            route (str): Route key.
+            since (float): Only observations at or after this Unix timestamp.
+            until (float): Only observations before this Unix timestamp.
+
+        Returns:
+            numpy.ndarray: The prices, oldest first.
+        """
+        return self._select(route, since, until, "price")
+
+    def stats(self, route, since=None, until=None, percentiles=(10, 25, 75, 90)):
+        """
+        Summarise the prices observed for a route in a time window.
+
+        Args:
+            route (str): Route key.
+            since (float): Only observations at or after this Unix timestamp.
+            until (float): Only observations before this Unix timestamp.
+            percentiles (tuple): Percentiles to compute, between 0 and 100.
+
+        Returns:
+            dict: `count`, `min`, `median`, `max` and `percentiles` (percentile -> price),
+            or None when there are no observations.
+        """
+        prices = self.prices(route, since, until)
+        if not len(prices):
+            return None
+        values = np.percentile(prices, [50, *percentiles])
+        return {
+            "count": int(len(prices)),
+            "min": float(prices.min()),
+            "median": float(values[0]),
+            "max": float(prices.max()),
+            "percentiles": {p: float(v) for p, v in zip(percentiles, values[1:])},
+        }
+
+    def moments(self, routes, since=None, until=None):
+        """
+        Compute the mean and standard deviation of many routes in one scan.
+
+        Args:
+            routes (list): Route keys.
+            since (float): Only observations at or after this Unix timestamp.
+            until (float): Only observations before this Unix timestamp.
+
+        Returns:
+            tuple: `mean`, `std` and `count` arrays aligned with `routes`; mean and std are NaN
+            for routes without observations.
+        """
+        meta = self._read_meta()
+        size = len(meta["routes"])
+        total = np.zeros(size)
+        squares = np.zeros(size)
+        count = np.zeros(size)
+        for segment in meta["segments"]:
+            rows = segment["rows"]
+            codes = np.asarray(self._open_column(segment["name"], "route")[:rows])
+            prices = np.asarray(self._open_column(segment["name"], "price")[:rows])
+            if since is not None or until is not None:
+                observed_at = self._open_column(segment["name"], "observed_at")[:rows]
+                mask = np.ones(rows, dtype=bool)
+                if since is not None:
+                    mask &= observed_at >= since
+                if until is not None:
+                    mask &= observed_at < until
+                codes, prices = codes[mask], prices[mask]
+            total += np.bincount(codes, weights=prices, minlength=size)
+            squares += np.bincount(codes, weights=prices * prices, minlength=size)
+            count += np.bincount(codes, minlength=size)
+
+        indexes = np.array([meta["routes"].get(route, -1) for route in routes], dtype=np.int64)
+        known = indexes >= 0
+        route_count = np.zeros(len(routes))
+        route_count[known] = count[indexes[known]]
+        mean = np.full(len(routes), np.nan)
+        std = np.full(len(routes), np.nan)
+        seen = route_count > 0
+        mean[seen] = total[indexes[seen]] / route_count[seen]
+        variance = squares[indexes[seen]] / route_count[seen] - mean[seen] ** 2
+        std[seen] = np.sqrt(np.maximum(variance, 0))
+        return mean, std, route_count
+
+    def routes(self):
+        """Return every route key with at least one observation."""
+        return list(self._read_meta()["routes"])
+
+    def _select(self, route, since, until, column):
+        meta = self._read_meta()
+        code = meta["routes"].get(route)
+        if code is None:
+            return np.empty(0, dtype=self.COLUMNS[column])
+
+        selected = []
+        for segment in meta["segments"]:
+            rows = segment["rows"]
+            mask = self._open_column(segment["name"], "route")[:rows] == code
+            if since is not None or until is not None:
+                observed_at = self._open_column(segment["name"], "observed_at")[:rows]
+                if since is not None:
+                    mask &= observed_at >= since
+                if until is not None:
+                    mask &= observed_at < until
+            if mask.any():
+                selected.append(np.asarray(self._open_column(segment["name"], column)[:rows][mask]))
+        if not selected:
+            return np.empty(0, dtype=self.COLUMNS[column])
+        return np.concatenate(selected)
+
+    def _open_column(self, segment, column, writable=False):
+        path = os.path.join(self.directory, f"{segment}.{column}.npy")
+        if writable and not os.path.exists(path):
+            return open_memmap(path, mode="w+", dtype=self.COLUMNS[column], shape=(self.segment_size,))
+        return np.load(path, mmap_mode="r+" if writable else "r")
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, "r") as meta_file:
+                return json.load(meta_file)
+        except (OSError, ValueError):
+            return {"segments": [], "routes": {}, "airlines": {}}
+
+    def _write_meta(self, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, self.meta_path)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from cache import CACHE_DIR
+from file_lock import file_lock
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every thread and process on the host.
+
+    The bucket state lives in a small JSON file guarded by a file lock, so
+    several sweeps running at once draw from the same budget. When the
+    provider answers 429 the current rate is halved and every caller is held
+    back until `Retry-After` has passed; successful calls then grow the rate
+    back towards the configured maximum.
+
+    Attributes:
+        max_rate (float): Requests per second allowed when the provider is not throttling.
+        burst (int): Maximum number of tokens the bucket can hold.
+        min_rate (float): Floor for the rate after repeated throttling.
+        recovery (float): Fraction of `max_rate` added back after each successful call.
+        path (str): Location of the shared bucket state.
+    """
+
+    def __init__(
+        self,
+        max_rate=5.0,
+        burst=10,
+        min_rate=0.2,
+        recovery=0.05,
+        path=os.path.join(CACHE_DIR, "tequila_rate.json"),
+    ):
+        self.max_rate = max_rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.path = path
+        self._lock = threading.Lock()
+        self._waiting = 0
+
+    def acquire(self, tokens=1):
+        """
+        Block until the bucket can hand out the requested tokens.
+
+        Args:
+            tokens (int): Number of tokens to take. Defaults to 1.
+        """
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                wait = self._take(tokens)
+                if wait <= 0:
+                    return
+                time.sleep(wait)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    async def aacquire(self, tokens=1):
+        """
+        Wait, without blocking the event loop, until the bucket can hand out the requested tokens.
+
+        The shared state is read and written on a worker thread, since its
+        file lock may be held by another process.
+
+        Args:
+            tokens (int): Number of tokens to take. Defaults to 1.
+        """
+        with self._lock:
+            self._waiting += 1
+        try:
+            while True:
+                wait = await asyncio.to_thread(self._take, tokens)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def on_success(self):
+        """Additively grow the rate back after a throttling episode."""
+        with file_lock(self.path):
+            state = self._read()
+            if state["rate"] >= self.max_rate:
+                return
+            state["rate"] = min(self.max_rate, state["rate"] + self.recovery * self.max_rate)
+            self._write(state)
+
+    def on_throttled(self, retry_after=None):
+        """
+        Apply backpressure after a 429 response.
+
+        Args:
+            retry_after (str): Value of the `Retry-After` header, in seconds or as an HTTP date.
+        """
+        delay = self._parse_retry_after(retry_after)
+        with file_lock(self.path):
+            state = self._read()
+            now = time.time()
+            state["rate"] = max(self.min_rate, state["rate"] / 2)
+            state["tokens"] = 0
+            state["updated"] = now
+            if delay is None:
+                delay = 1 / state["rate"]
+            state["blocked_until"] = max(state["blocked_until"], now + delay)
+            self._write(state)
+
+    def stats(self):
+        """
+        Report the current state of the limiter.
+
+        Returns:
+            dict: Current `rate` (requests per second), available `tokens`,
+            `queue_depth` (callers of this process waiting for a token) and
+            `blocked_for` (seconds left of a `Retry-After` pause).
+        """
+        with file_lock(self.path):
+            state = self._read()
+        now = time.time()
+        tokens = min(self.burst, state["tokens"] + (now - state["updated"]) * state["rate"])
+        return {
+            "rate": state["rate"],
+            "tokens": tokens,
+            "queue_depth": self._waiting,
+            "blocked_for": max(0.0, state["blocked_until"] - now),
+        }
+
+    def _take(self, tokens):
+        """Take tokens if available, otherwise return the seconds to wait."""
+        with file_lock(self.path):
+            state = self._read()
+            now = time.time()
+            if state["blocked_until"] > now:
+                return state["blocked_until"] - now
+            available = min(
+                self.burst, state["tokens"] + (now - state["updated"]) * state["rate"]
+            )
+            state["updated"] = now
+            if available >= tokens:
+                state["tokens"] = available - tokens
+                self._write(state)
+                return 0
+            state["tokens"] = available
+            self._write(state)
+            return (tokens - available) / state["rate"]
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return {
+                "tokens": self.burst,
+                "updated": time.time(),
+                "rate": self.max_rate,
+                "blocked_until": 0,
+            }
+
+    def _write(self, state):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _parse_retry_after(retry_after):
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_limiter():
+    """
+    Return the process-wide RateLimiter for Kiwi API, creating it on first use.
+
+    The maximum rate and burst can be tuned with the `KIWI_RATE_LIMIT` and
+    `KIWI_RATE_BURST` environment variables.
+
+    Returns:
+        RateLimiter: The shared limiter.
+    """
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter(
+                max_rate=float(os.getenv("KIWI_RATE_LIMIT", 5.0)),
+                burst=int(os.getenv("KIWI_RATE_BURST", 10)),
+            )
+        return _default_limiter
@@ -0,0 +1,116 @@
+import os
+import time
+
+from cache import CACHE_DIR, PersistentCache
+
+
+class RouteScheduler:
+    """
+    Decides which routes are worth re-checking on a given run.
+
+    Every route keeps when it was last checked, the last price seen and an
+    exponentially weighted average of its relative price changes
+    (volatility). Volatile routes get a short refresh interval and stable ones
+    drift towards `max_interval`; each run refreshes the routes that are the
+    most overdue relative to their own interval, up to a fixed budget.
+
+    Attributes:
+        state (PersistentCache): Per-route state, shared by every process on the host.
+        min_interval (float): Shortest refresh interval in seconds, used for the most volatile routes.
+        max_interval (float): Longest refresh interval in seconds, used for routes that never move.
+        sensitivity (float): How strongly volatility shortens the refresh interval.
+        smoothing (float): Weight of the newest observation in the volatility average.
+    """
+
+    def __init__(
+        self,
+        state=None,
+        min_interval=6 * 60 * 60,
+        max_interval=14 * 24 * 60 * 60,
+        sensitivity=50.0,
+        smoothing=0.3,
+    ):
+        self.state = state if state is not None else PersistentCache(
+            os.path.join(CACHE_DIR, "route_schedule.json"), max_entries=100000
+        )
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.sensitivity = sensitivity
+        self.smoothing = smoothing
+
+    def interval(self, route_state):
+        """
+        Return the refresh interval of a route.
+
+        Args:
+            route_state (dict): The stored state of the route.
+
+        Returns:
+            float: Seconds between two checks of the route.
+        """
+        interval = self.max_interval / (1 + self.sensitivity * route_state["volatility"])
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def priority(self, route, now=None):
+        """
+        Return how overdue a route is; 1.0 means exactly due.
+
+        Args:
+            route (str): Route key.
+            now (float): Current timestamp. Defaults to the current time.
+
+        Returns:
+            float: Elapsed time since the last check divided by the route's interval,
+            or infinity for routes never checked.
+        """
+        route_state = self.state.get(route)
+        if route_state is None:
+            return float("inf")
+        now = time.time() if now is None else now
+        return (now - route_state["last_checked"]) / self.interval(route_state)
+
+    def select(self, routes, budget, due_only=True):
+        """
+        Pick the routes to refresh on this run.
+
+        Args:
+            routes (list): Candidate route keys.
+            budget (int): Maximum number of routes to return.
+            due_only (bool): When True, routes not yet due are never returned, even if the budget allows.
+
+        Returns:
+            list: The chosen routes, most overdue first.
+        """
+        now = time.time()
+        priorities = {route: self.priority(route, now) for route in routes}
+        ranked = sorted(routes, key=lambda route: priorities[route], reverse=True)
+        if due_only:
+            ranked = [route for route in ranked if priorities[route] >= 1]
+        return ranked[:budget]
+
+    def record(self, observations):
+        """
+        Store the outcome of the routes checked on this run.
+
+        Args:
+            observations (dict): Route keys mapped to the price found, or None when no flight was found.
+        """
+        now = time.time()
+        updates = {}
+        for route, price in observations.items():
+            route_state = self.state.get(route) or {
+                "last_checked": now,
+                "last_price": None,
+                "volatility": 0.0,
+            }
+            last_price = route_state["last_price"]
+            if price is not None and last_price:
+                change = abs(price - last_price) / last_price
+                route_state["volatility"] = (
+                    self.smoothing * change + (1 - self.smoothing) * route_state["volatility"]
+                )
+            if price is not None:
+                route_state["last_price"] = price
+            route_state["last_checked"] = now
+            updates[route] = route_state
+        self.state.update(updates)
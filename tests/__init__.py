@@ -0,0 +1,11 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# The modules under test read these when they are imported: point them at a
+# scratch directory so the tests never touch the real caches and destinations.
+STATE_DIR = tempfile.mkdtemp(prefix="flighttracker-tests-")
+atexit.register(shutil.rmtree, STATE_DIR, ignore_errors=True)
+os.environ["FLIGHT_CACHE_DIR"] = os.path.join(STATE_DIR, "cache")
+os.environ["FLIGHT_DESTINATIONS_DIR"] = os.path.join(STATE_DIR, "destinations")
@@ -0,0 +1,89 @@
+import json
+import os
+
+from cache import IataCodeCache, ResponseCache
+from city_index import CityIndex
+from flight_search import FlightSearch
+from rate_limiter import RateLimiter
+
+
+def itinerary(fly_from, fly_to, price, departure="2030-01-10T23:30:00.000Z", arrival="2030-01-11T06:00:00.000Z"):
+    """A Kiwi API itinerary flying out on `departure` and back ten days later."""
+    return {
+        "flyFrom": fly_from, "flyTo": fly_to, "cityFrom": fly_from, "cityTo": fly_to,
+        "cityCodeFrom": fly_from, "cityCodeTo": fly_to, "price": price,
+        "deep_link": f"https://example.com/{fly_from}-{fly_to}-{price}",
+        "route": [
+            {"local_departure": departure, "local_arrival": arrival, "cityTo": fly_to, "airline": "AM"},
+            {"local_departure": "2030-01-20T10:00:00.000Z", "local_arrival": "2030-01-20T18:00:00.000Z",
+             "cityTo": fly_from, "airline": "AM", "return": 1},
+        ],
+    }
+
+
+class FakeKiwiResponse:
+    def __init__(self, data):
+        self.status_code = 200
+        self.headers = {}
+        self.body = json.dumps({"data": data}).encode()
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.body)
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeKiwi:
+    """Stands in for the HTTP client, answering searches from a fixed list of itineraries like Kiwi API."""
+
+    def __init__(self, itineraries):
+        self.itineraries = itineraries
+        self.searches = []
+
+    def get(self, url, params=None, headers=None, stream=False):
+        self.searches.append(params)
+        origins = params["fly_from"].split(",")
+        destinations = params["fly_to"].split(",")
+        data = sorted(
+            (
+                result for result in self.itineraries
+                if result["flyFrom"] in origins and result["flyTo"] in destinations
+            ),
+            key=lambda result: result["price"],
+        )
+        if params.get("one_for_city"):
+            cheapest = {}
+            for result in data:
+                cheapest.setdefault(result["flyTo"], result)
+            data = list(cheapest.values())
+        if params.get("one_per_date"):
+            cheapest = {}
+            for result in data:
+                cheapest.setdefault(result["route"][0]["local_departure"][:10], result)
+            data = list(cheapest.values())
+        return FakeKiwiResponse(data[:int(params["limit"])])
+
+
+def kiwi_flight_search(directory, itineraries):
+    """A FlightSearch backed by FakeKiwi, with its caches and rate limiter state in `directory`."""
+    return FlightSearch(
+        iata_cache=IataCodeCache(os.path.join(directory, "iata_codes.json")),
+        http_client=FakeKiwi(itineraries),
+        rate_limiter=RateLimiter(max_rate=1000, burst=1000, path=os.path.join(directory, "rate.json")),
+        response_cache=ResponseCache(os.path.join(directory, "responses.json")),
+        city_index=CityIndex(),
+    )
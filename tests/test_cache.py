@@ -0,0 +1,202 @@
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from cache import IataCodeCache, PersistentCache, ResponseCache
+
+
+def store_keys(path, prefix, count):
+    """Store `count` keys from another process."""
+    cache = PersistentCache(path)
+    for index in range(count):
+        cache.set(f"{prefix}{index}", index)
+
+
+class PersistentCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.json")
+        self.now = 1000.0
+        patcher = mock.patch("cache.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def journal_lines(self):
+        with open(f"{self.path}.journal") as journal:
+            return journal.read().splitlines()
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = PersistentCache(self.path, ttl=60)
+        cache.set("MEX", "Mexico City")
+        self.now += 59
+        self.assertEqual(cache.get("MEX"), "Mexico City")
+        self.now += 1
+        self.assertIsNone(cache.get("MEX"))
+        self.assertEqual(cache.get("MEX", "missing"), "missing")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = PersistentCache(self.path, max_entries=3)
+        for key in ("a", "b", "c"):
+            cache.set(key, key)
+            self.now += 1
+        cache.get("a")
+        self.now += 1
+        cache.set("d", "d")
+
+        reloaded = PersistentCache(self.path, max_entries=3)
+        self.assertEqual([reloaded.get(key) for key in "abcd"], ["a", None, "c", "d"])
+
+    def test_update_keeps_fresh_entries_unless_overwriting(self):
+        cache = PersistentCache(self.path)
+        cache.set("MEX", "old")
+        cache.update({"MEX": "new", "BKK": "Bangkok"}, overwrite=False)
+        self.assertEqual((cache.get("MEX"), cache.get("BKK")), ("old", "Bangkok"))
+        cache.update({"MEX": "new"})
+        self.assertEqual(cache.get("MEX"), "new")
+
+    def test_new_entries_are_appended_to_the_journal(self):
+        cache = PersistentCache(self.path)
+        for index in range(20):
+            cache.set(f"key{index}", index)
+
+        self.assertEqual(len(self.journal_lines()), 20)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(PersistentCache(self.path).get("key19"), 19)
+
+    def test_rewritten_entries_are_compacted_into_the_snapshot(self):
+        cache = PersistentCache(self.path)
+        cache.update({f"key{index}": index for index in range(5)})
+        for version in range(50):
+            self.now += 1
+            cache.set("key0", version)
+            self.assertLessEqual(len(self.journal_lines()), 5)
+
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(PersistentCache(self.path).get("key0"), 49)
+
+    def test_instances_on_the_same_file_share_entries(self):
+        first, second = PersistentCache(self.path), PersistentCache(self.path)
+        first.set("MEX", "Mexico City")
+        self.assertEqual(second.get("MEX"), "Mexico City")
+        self.now += 1
+        second.set("MEX", "Ciudad de México")
+        self.assertEqual(first.get("MEX"), "Ciudad de México")
+
+    def test_entries_appended_after_a_torn_line_are_read(self):
+        PersistentCache(self.path).set("MEX", "Mexico City")
+        with open(f"{self.path}.journal", "a") as journal:
+            journal.write('["BKK", ["Bang')
+        PersistentCache(self.path).set("NRT", "Tokyo")
+
+        reloaded = PersistentCache(self.path)
+        self.assertEqual([reloaded.get(key) for key in ("MEX", "BKK", "NRT")], ["Mexico City", None, "Tokyo"])
+
+
+class CrossProcessTest(unittest.TestCase):
+    def test_processes_writing_the_same_cache_keep_every_entry(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "cache.json")
+
+        processes = [
+            multiprocessing.Process(target=store_keys, args=(path, prefix, 25)) for prefix in "abcd"
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        cache = PersistentCache(path)
+        self.assertEqual(
+            {f"{prefix}{index}": cache.get(f"{prefix}{index}") for prefix in "abcd" for index in range(25)},
+            {f"{prefix}{index}": index for prefix in "abcd" for index in range(25)},
+        )
+
+
+class IataCodeCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "iata_codes.json")
+        self.destinations_dir = os.path.join(directory.name, "destinations")
+        os.mkdir(self.destinations_dir)
+        destinations = {
+            "Bangkok": {"city": "Bangkok", "iataCode": "BKK", "lowestPrice": 900},
+            "Tokyo": {"city": "Tokyo", "iataCode": "", "lowestPrice": 700},
+        }
+        with open(os.path.join(self.destinations_dir, "asia.json"), "w") as destinations_file:
+            json.dump({"departure_cities": ["MEX"], "destinations": destinations}, destinations_file)
+        with open(os.path.join(self.destinations_dir, "broken.json"), "w") as destinations_file:
+            destinations_file.write("{")
+
+    def test_codes_are_seeded_from_the_destination_files(self):
+        cache = IataCodeCache(self.path, destinations_dir=self.destinations_dir)
+        self.assertEqual(cache.get(IataCodeCache.key("  BANGKOK ")), "BKK")
+        self.assertIsNone(cache.get(IataCodeCache.key("Tokyo")))
+
+    def test_seeding_keeps_codes_already_cached(self):
+        IataCodeCache(self.path, destinations_dir=self.destinations_dir).set("bangkok", "DMK")
+        cache = IataCodeCache(self.path, destinations_dir=self.destinations_dir)
+        self.assertEqual(cache.get("bangkok"), "DMK")
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(os.path.join(directory.name, "responses.json"), fresh_ttl=60, stale_ttl=600)
+        self.now = 1000.0
+        patcher = mock.patch("cache.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.params = {"fly_from": "mex,gdl", "fly_to": "BKK", "limit": 10}
+        self.loads = []
+
+    def loader(self, value):
+        def load():
+            self.loads.append(value)
+            return value
+        return load
+
+    def test_keys_ignore_location_order_and_case(self):
+        self.assertEqual(
+            ResponseCache.key(self.params),
+            ResponseCache.key({"limit": "10", "fly_to": "bkk", "fly_from": "GDL, MEX"}),
+        )
+
+    def test_fresh_entries_are_served_without_loading(self):
+        self.assertEqual(self.cache.fetch(self.params, self.loader("first")), "first")
+        self.now += 59
+        self.assertEqual(self.cache.fetch(self.params, self.loader("second")), "first")
+        self.assertEqual(self.loads, ["first"])
+
+    def test_stale_entries_are_served_while_refreshed_in_the_background(self):
+        self.cache.fetch(self.params, self.loader("first"))
+        self.now += 120
+
+        self.assertEqual(self.cache.fetch(self.params, self.loader("second")), "first")
+        self.cache.join_refreshes()
+
+        self.assertEqual(self.loads, ["first", "second"])
+        self.assertEqual(self.cache.fetch(self.params, self.loader("third")), "second")
+
+    def test_refresh_threads_are_waited_for_at_exit(self):
+        self.cache.fetch(self.params, self.loader("first"))
+        self.now += 120
+        with mock.patch("cache.threading.Thread") as thread:
+            self.cache.fetch(self.params, self.loader("second"))
+        self.assertFalse(thread.call_args.kwargs.get("daemon"))
+
+    def test_expired_entries_are_loaded_inline(self):
+        self.cache.fetch(self.params, self.loader("first"))
+        self.now += 660
+        self.assertEqual(self.cache.fetch(self.params, self.loader("second")), "second")
+
+    def test_failed_loads_are_not_cached(self):
+        self.assertIsNone(self.cache.fetch(self.params, self.loader(None)))
+        self.assertEqual(self.cache.fetch(self.params, self.loader("later")), "later")
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from cache import PersistentCache
+from data_manager import DataManager
+from main import PriceTracker
+
+
+class FakeSheety:
+    """Stands in for the HTTP client of DataManager, serving a prices sheet with ETags."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.gets = 0
+        self.puts = []
+
+    def etag(self):
+        return f'"{hash(json.dumps(self.rows, sort_keys=True))}"'
+
+    def get(self, url, headers=None):
+        self.gets += 1
+        if headers.get("If-None-Match") == self.etag():
+            return mock.Mock(status_code=304)
+        return mock.Mock(status_code=200, headers={"ETag": self.etag()}, json=lambda: {"prices": self.rows})
+
+    def put(self, url, headers=None, json=None):
+        row_id = int(url.rsplit("/", 1)[1])
+        self.puts.append((row_id, json["price"]))
+        for row in self.rows:
+            if row["id"] == row_id:
+                row.update(json["price"])
+        return mock.Mock(status_code=200)
+
+
+class DataManagerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.sheety = FakeSheety([
+            {"id": 2, "city": "Bangkok", "iataCode": "BKK", "lowestPrice": 900},
+            {"id": 3, "city": "Tokyo", "iataCode": "TYO", "lowestPrice": 700},
+        ])
+        self.data_manager = DataManager(
+            http_client=self.sheety, snapshot=PersistentCache(os.path.join(directory.name, "snapshot.json"))
+        )
+
+    def test_sync_writes_only_changed_fields(self):
+        written = self.data_manager.sync_prices([
+            {"id": 2, "iataCode": "BKK", "lowestPrice": 650},
+            {"id": 3, "iataCode": "TYO", "lowestPrice": 700},
+        ])
+        self.assertEqual(written, 1)
+        self.assertEqual(self.sheety.puts, [(2, {"lowestPrice": 650})])
+
+    def test_sync_diffs_against_edits_made_on_the_sheet_since_the_last_sync(self):
+        rows = [{"id": 2, "lowestPrice": 650}]
+        self.data_manager.sync_prices(rows)
+        self.sheety.rows[0]["lowestPrice"] = 1500
+
+        written = self.data_manager.sync_prices(rows)
+
+        self.assertEqual(written, 1)
+        self.assertEqual(self.sheety.puts, [(2, {"lowestPrice": 650}), (2, {"lowestPrice": 650})])
+        self.assertEqual(self.data_manager.sync_prices(rows), 0)
+
+    def test_sync_reuses_rows_already_fetched(self):
+        current_rows = self.data_manager.get_prices()
+        written = self.data_manager.sync_prices([{"id": 3, "lowestPrice": 650}], current_rows)
+        self.assertEqual(written, 1)
+        self.assertEqual(self.sheety.gets, 1)
+
+    def test_price_tracker_syncs_its_destinations_to_the_sheet(self):
+        tracker = PriceTracker()
+        tracker.data_manager = self.data_manager
+        destination_data = {
+            "departure_cities": ["MEX"],
+            "destinations": {
+                "Bangkok": {"city": "Bangkok", "iataCode": "BKK", "lowestPrice": 610},
+                "Tokyo": {"city": "Tokyo", "iataCode": "TYO", "lowestPrice": 700},
+                "Seoul": {"city": "Seoul", "iataCode": "SEL", "lowestPrice": 500},
+            },
+        }
+
+        self.assertEqual(tracker.sync_sheet(destination_data), 1)
+        self.assertEqual(self.sheety.puts, [(2, {"lowestPrice": 610})])
+        self.assertEqual(self.sheety.gets, 1)
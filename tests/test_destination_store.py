@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+from destination_store import DestinationStore
+
+
+class DestinationStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.snapshot = {
+            "departure_cities": ["MEX"],
+            "destinations": {
+                "Tokyo": {"city": "Tokyo", "iataCode": "TYO", "lowestPrice": 700},
+                "Bangkok": {"city": "Bangkok", "iataCode": "BKK", "lowestPrice": 900},
+            },
+        }
+        with open(os.path.join(self.directory, "asia.json"), "w") as destinations_file:
+            json.dump(self.snapshot, destinations_file)
+
+    def store(self, **kwargs):
+        return DestinationStore("asia", directory=self.directory, **kwargs)
+
+    def journal(self):
+        with open(os.path.join(self.directory, "asia.journal")) as journal:
+            return journal.read()
+
+    def snapshot_on_disk(self):
+        with open(os.path.join(self.directory, "asia.json")) as destinations_file:
+            return json.load(destinations_file)
+
+    def test_flush_journals_only_changed_fields(self):
+        store = self.store()
+        store.update("Tokyo", lowestPrice=300, iataCode="TYO")
+        store.update("Bangkok", lowestPrice=900)
+        store.flush()
+
+        self.assertEqual(self.journal(), '{"city": "Tokyo", "fields": {"lowestPrice": 300}}\n')
+        self.assertEqual(self.snapshot_on_disk(), self.snapshot)
+        self.assertEqual(self.store().load()["destinations"]["Tokyo"]["lowestPrice"], 300)
+
+    def test_load_discards_unflushed_changes(self):
+        store = self.store()
+        store.update("Tokyo", lowestPrice=300)
+        self.assertEqual(store.load()["destinations"]["Tokyo"]["lowestPrice"], 700)
+        store.flush()
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "asia.journal")))
+
+    def test_a_long_journal_is_compacted_into_the_snapshot(self):
+        store = self.store(compact_size=100)
+        store.update("Tokyo", lowestPrice=300)
+        store.flush()
+        self.assertNotEqual(self.journal(), "")
+        store.update("Bangkok", lowestPrice=500)
+        store.flush()
+
+        self.assertEqual(self.journal(), "")
+        destinations = self.snapshot_on_disk()["destinations"]
+        self.assertEqual((destinations["Tokyo"]["lowestPrice"], destinations["Bangkok"]["lowestPrice"]), (300, 500))
+
+    def test_a_torn_last_record_is_skipped_on_load(self):
+        with open(os.path.join(self.directory, "asia.journal"), "w") as journal:
+            journal.write('{"city": "Tokyo", "fields": {"lowestPrice": 300}}\n{"city": "Bangkok", "fie')
+        destinations = self.store().load()["destinations"]
+        self.assertEqual((destinations["Tokyo"]["lowestPrice"], destinations["Bangkok"]["lowestPrice"]), (300, 900))
+
+    def test_records_flushed_after_a_torn_record_survive_a_reload(self):
+        with open(os.path.join(self.directory, "asia.journal"), "w") as journal:
+            journal.write('{"city": "Bangkok", "fields": {"lowestPrice": 500}}\n{"city": "Tokyo", "fie')
+        store = self.store()
+        store.load()
+        store.update("Tokyo", lowestPrice=300)
+        store.flush()
+
+        destinations = self.store().load()["destinations"]
+        self.assertEqual((destinations["Tokyo"]["lowestPrice"], destinations["Bangkok"]["lowestPrice"]), (300, 500))
+        self.assertEqual(self.journal().count("\n"), 2)
+
+    def test_a_journal_holding_only_a_torn_record_is_cleared(self):
+        with open(os.path.join(self.directory, "asia.journal"), "w") as journal:
+            journal.write('{"city": "Tok')
+        store = self.store()
+        store.update("Tokyo", lowestPrice=300)
+        store.flush()
+        self.assertEqual(self.journal(), '{"city": "Tokyo", "fields": {"lowestPrice": 300}}\n')
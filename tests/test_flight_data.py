@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+
+from flight_data import FLIGHT_RECORD_DTYPE, flight_records
+from tests.support import itinerary, kiwi_flight_search
+
+
+def stopover_itinerary(fly_from, fly_to, price, departure):
+    """An itinerary with one stop in Madrid on the way out."""
+    result = itinerary(fly_from, fly_to, price, departure)
+    result["route"][0]["cityTo"] = "Madrid"
+    result["route"].insert(1, dict(result["route"][0], cityTo=fly_to))
+    return result
+
+
+class FlightRecordsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.data = [
+            itinerary("MEX", "BKK", 640, "2030-01-10T23:30:00.000Z"),
+            stopover_itinerary("GDL", "NRT", 880.5, "2030-02-03T08:00:00.000Z"),
+        ]
+        self.flight_search = kiwi_flight_search(directory.name, self.data)
+
+    def test_records_match_flight_data(self):
+        records = flight_records(self.data, max_stopovers=1)
+
+        self.assertEqual(records.dtype, FLIGHT_RECORD_DTYPE)
+        self.assertEqual(records["index"].tolist(), [0, 1])
+        for record, result in zip(records, self.data):
+            flight = self.flight_search._build_flight_data(result, 1)
+            self.assertEqual(
+                (
+                    str(record["departure_airport"]), str(record["arrival_airport"]), float(record["price"]),
+                    record["local_departure"].astype(date), record["local_arrival"].astype(date),
+                    str(record["step_over_city"]), int(record["stopovers"]), str(record["airline"]),
+                ),
+                (
+                    flight.departure_airport, flight.arrival_airport, flight.price,
+                    flight.local_departure, flight.local_arrival,
+                    flight.step_over_city, flight.stopovers, flight.airline,
+                ),
+            )
+
+    def test_step_over_city_is_empty_for_direct_searches(self):
+        self.assertEqual(flight_records(self.data)["step_over_city"].tolist(), ["", ""])
+
+    def test_no_itineraries_give_an_empty_array(self):
+        records = flight_records([])
+        self.assertEqual((len(records), records.dtype), (0, FLIGHT_RECORD_DTYPE))
+
+    def test_search_returns_records_and_their_links(self):
+        records, links = self.flight_search.search_flight_records(["MEX", "GDL"], ["BKK", "NRT"])
+
+        self.assertEqual(records["price"].tolist(), [640, 880.5])
+        self.assertEqual(links[records["index"][np.argmax(records["price"])]], self.data[1]["deep_link"])
+        self.assertEqual(records["local_departure"].tolist(), [date(2030, 1, 10), date(2030, 2, 3)])
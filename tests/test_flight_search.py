@@ -0,0 +1,151 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from flight_search import FlightSearch
+from tests.support import itinerary, kiwi_flight_search
+
+
+class CoalescedSearchTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_pairs_crowded_out_of_a_coalesced_search_are_searched_again(self):
+        itineraries = [itinerary("MEX", "BKK", price) for price in (100, 110, 120, 130)] + [
+            itinerary("MEX", "NRT", 900),
+            itinerary("GDL", "BKK", 400),
+            itinerary("GDL", "NRT", 800),
+        ]
+        flight_search = kiwi_flight_search(self.directory, itineraries)
+
+        flights = flight_search.search_flights(["MEX", "GDL"], ["BKK", "NRT"], limit=3)
+
+        self.assertEqual(
+            {pair: flight.price for pair, flight in flights.items()},
+            {("MEX", "BKK"): 100, ("MEX", "NRT"): 900, ("GDL", "BKK"): 400, ("GDL", "NRT"): 800},
+        )
+        retries = flight_search.http_client.searches[1:]
+        self.assertEqual(
+            sorted((retry["fly_from"], retry["fly_to"], retry["one_for_city"]) for retry in retries),
+            [("GDL", "BKK,NRT", 1), ("MEX", "NRT", 1)],
+        )
+
+    def test_complete_results_are_not_searched_again(self):
+        flight_search = kiwi_flight_search(self.directory, [itinerary("MEX", "BKK", 100)])
+        flights = flight_search.search_flights(["MEX"], ["BKK", "NRT"], limit=3)
+        self.assertEqual(list(flights), [("MEX", "BKK")])
+        self.assertEqual(len(flight_search.http_client.searches), 1)
+
+
+class IataCodeTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.flight_search = self.kiwi()
+
+    def kiwi(self):
+        flight_search = kiwi_flight_search(self.directory, [])
+        flight_search.http_client.get = mock.Mock(
+            return_value=mock.Mock(status_code=200, json=lambda: {"locations": [{"code": "BKK"}]})
+        )
+        return flight_search
+
+    def test_iata_codes_are_returned_without_a_lookup(self):
+        self.assertEqual(self.flight_search.get_iata_code(" MEX "), "MEX")
+        self.flight_search.http_client.get.assert_not_called()
+
+    def test_looked_up_codes_are_cached_on_disk(self):
+        self.assertEqual(self.flight_search.get_iata_code("Bangkok"), "BKK")
+        self.assertEqual(self.flight_search.get_iata_code("bangkok"), "BKK")
+        self.assertEqual(self.flight_search.http_client.get.call_count, 1)
+
+        restarted = self.kiwi()
+        self.assertEqual(restarted.get_iata_code("BANGKOK"), "BKK")
+        restarted.http_client.get.assert_not_called()
+
+
+class TopFlightsTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_top_k_keeps_the_cheapest_of_each_group_in_order(self):
+        matches = [
+            (("MEX", "BKK"), {"price": price, "id": index})
+            for index, price in enumerate((300, 100, 200, 100, 50))
+        ] + [(("MEX", "NRT"), {"price": 900, "id": "nrt"})]
+
+        top = FlightSearch._top_k(matches, 3, lambda pair, result: pair[1])
+
+        self.assertEqual([result["id"] for result in top["BKK"]], [4, 1, 3])
+        self.assertEqual([result["id"] for result in top["NRT"]], ["nrt"])
+
+    def test_flights_are_grouped_per_destination(self):
+        flight_search = kiwi_flight_search(self.directory, [
+            itinerary("MEX", "BKK", 300), itinerary("GDL", "BKK", 100), itinerary("MEX", "BKK", 200),
+            itinerary("GDL", "NRT", 800),
+        ])
+
+        top = flight_search.search_top_flights(["MEX", "GDL"], ["BKK", "NRT"], k=2)
+
+        self.assertEqual(
+            {group: [(flight.departure_airport, flight.price) for flight in flights] for group, flights in top.items()},
+            {"BKK": [("GDL", 100), ("MEX", 200)], "NRT": [("GDL", 800)]},
+        )
+
+    def test_invalid_groupings_are_rejected(self):
+        flight_search = kiwi_flight_search(self.directory, [])
+        with self.assertRaises(ValueError):
+            flight_search.search_top_flights(["MEX"], ["BKK"], per="month")
+        with self.assertRaises(ValueError):
+            flight_search.search_top_flights(["MEX"], ["BKK"], k=0)
+
+    def test_pairs_crowded_out_of_a_top_k_search_are_searched_again(self):
+        itineraries = [itinerary("MEX", "BKK", price) for price in (100, 110, 120, 130)] + [
+            itinerary("MEX", "NRT", 900),
+            itinerary("GDL", "NRT", 800),
+        ]
+        flight_search = kiwi_flight_search(self.directory, itineraries)
+
+        top = flight_search.search_top_flights(["MEX", "GDL"], ["BKK", "NRT"], k=2, per="pair", limit=3)
+
+        self.assertEqual(
+            {pair: [flight.price for flight in flights] for pair, flights in top.items()},
+            {("MEX", "BKK"): [100, 110], ("MEX", "NRT"): [900], ("GDL", "NRT"): [800]},
+        )
+        retries = flight_search.http_client.searches[1:]
+        self.assertEqual(
+            sorted((retry["fly_from"], retry["fly_to"]) for retry in retries),
+            [("GDL", "BKK,NRT"), ("MEX", "NRT")],
+        )
+
+
+class DuplicateCodesTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.flight_search = kiwi_flight_search(directory.name, [
+            itinerary("MEX", "BKK", 300), itinerary("MEX", "BKK", 200), itinerary("MEX", "NRT", 900),
+        ])
+        self.flight_search.iata_cache.set("bangkok", "BKK")
+
+    def test_every_name_of_a_shared_code_gets_its_flight(self):
+        flights = self.flight_search.search_flights(["MEX"], ["Bangkok", "BKK", "NRT"])
+
+        self.assertEqual(
+            {pair: flight.price for pair, flight in flights.items()},
+            {("MEX", "Bangkok"): 200, ("MEX", "BKK"): 200, ("MEX", "NRT"): 900},
+        )
+        self.assertEqual(self.flight_search.http_client.searches[0]["fly_to"], "BKK,NRT")
+
+    def test_every_name_of_a_shared_code_gets_its_top_flights_once(self):
+        top = self.flight_search.search_top_flights(["MEX"], ["Bangkok", "BKK"], k=2, per="pair")
+
+        self.assertEqual(
+            {pair: [flight.price for flight in flights] for pair, flights in top.items()},
+            {("MEX", "Bangkok"): [200, 300], ("MEX", "BKK"): [200, 300]},
+        )
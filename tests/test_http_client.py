@@ -0,0 +1,18 @@
+import unittest
+from unittest import mock
+
+from http_client import HttpClient
+
+
+class HttpClientTest(unittest.TestCase):
+    def test_retried_server_errors_are_closed_before_backing_off(self):
+        failed, succeeded = mock.Mock(status_code=503), mock.Mock(status_code=200)
+        http_client = HttpClient(backoff_factor=0)
+        session = http_client.session("https://example.com/")
+
+        with mock.patch.object(session, "request", side_effect=[failed, succeeded]):
+            response = http_client.get("https://example.com/search")
+
+        self.assertIs(response, succeeded)
+        failed.close.assert_called_once_with()
+        succeeded.close.assert_not_called()
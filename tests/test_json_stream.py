@@ -0,0 +1,61 @@
+import json
+import unittest
+
+from json_stream import iter_json_array
+
+
+def chunked(document, size):
+    """Split a JSON document into UTF-8 byte chunks of `size` bytes."""
+    body = json.dumps(document, ensure_ascii=False).encode()
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    document = {
+        "currency": "USD",
+        "search_params": {"flyFrom_type": "airport", "seats": {"adults": 1}},
+        "data": [
+            {"cityTo": "São Paulo", "price": 12.5, "route": [{"airline": "AM"}]},
+            {"cityTo": "東京", "price": 700, "bags": None},
+            [1, True, "]", "}"],
+            -3e2,
+        ],
+        "_results": 4,
+    }
+
+    def test_items_match_the_decoded_document_for_any_chunk_size(self):
+        for size in (1, 2, 3, 7, 64, 4096):
+            with self.subTest(size=size):
+                self.assertEqual(list(iter_json_array(chunked(self.document, size), "data")), self.document["data"])
+
+    def test_items_are_yielded_before_the_stream_ends(self):
+        read = []
+
+        def chunks():
+            for chunk in chunked(self.document, 16):
+                read.append(chunk)
+                yield chunk
+
+        items = iter_json_array(chunks(), "data")
+        next(items)
+        self.assertLess(sum(map(len, read)), len(json.dumps(self.document, ensure_ascii=False).encode()))
+
+    def test_missing_or_empty_arrays_yield_nothing(self):
+        for document in ({}, {"data": []}, {"other": [1, 2]}, {"data": {"nested": [1]}}):
+            with self.subTest(document=document):
+                self.assertEqual(list(iter_json_array(chunked(document, 3), "data")), [])
+
+    def test_truncated_documents_raise(self):
+        body = json.dumps(self.document).encode()
+        # Whatever follows the array is never read, so only cuts before its end count.
+        end = body.index(b"-300.0]") + len(b"-300.0")
+        for cut in (0, 40, len(body) // 2, end):
+            with self.subTest(cut=cut):
+                with self.assertRaises(ValueError):
+                    list(iter_json_array([body[:cut]], "data"))
+
+    def test_malformed_documents_raise(self):
+        for body in (b"[1, 2]", b'{"data": [1 2]}', b'{"data" [1]}'):
+            with self.subTest(body=body):
+                with self.assertRaises(ValueError):
+                    list(iter_json_array([body], "data"))
@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pyshorteners.exceptions import BadURLException, ShorteningErrorException
+from requests import ConnectionError
+
+from cache import PersistentCache
+from link_shortener import LinkShortener
+
+
+class LinkShortenerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = PersistentCache(os.path.join(directory.name, "short_links.json"))
+        self.shortener = LinkShortener(cache=self.cache)
+        self.short = mock.Mock(side_effect=lambda link: f"https://tinyurl.com/{link[-1]}")
+        self.shortener.shortener = mock.Mock(tinyurl=mock.Mock(short=self.short))
+
+    def test_links_are_shortened_once_and_cached(self):
+        links = ["https://example.com/a", "https://example.com/b", "https://example.com/a"]
+
+        self.assertEqual(
+            self.shortener.shorten_many(links),
+            {"https://example.com/a": "https://tinyurl.com/a", "https://example.com/b": "https://tinyurl.com/b"},
+        )
+        self.assertEqual(self.shortener.shorten("https://example.com/a"), "https://tinyurl.com/a")
+        self.assertEqual(self.short.call_count, 2)
+        self.assertEqual(self.cache.get("https://example.com/b"), "https://tinyurl.com/b")
+
+    def test_links_that_cannot_be_shortened_are_kept_and_not_cached(self):
+        for error in (BadURLException("bad"), ShorteningErrorException("down"), ConnectionError("offline")):
+            with self.subTest(error=error):
+                self.short.side_effect = error
+                self.assertEqual(self.shortener.shorten("https://example.com/c"), "https://example.com/c")
+                self.assertIsNone(self.cache.get("https://example.com/c"))
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from unittest import mock
+
+import main
+from main import PriceTracker
+from price_history import PriceHistory
+from tests.support import itinerary, kiwi_flight_search
+
+
+class SweepTest(unittest.TestCase):
+    def test_a_failed_continent_does_not_cancel_the_others_notification(self):
+        def sweep_continent(continent, reset_prices, scan_budget):
+            if continent == "europe":
+                raise RuntimeError("Sheety is down")
+            return f"{continent} deal"
+
+        with mock.patch.object(main, "ProcessPoolExecutor", ThreadPoolExecutor), \
+                mock.patch.object(main, "sweep_continent", sweep_continent), \
+                mock.patch.object(main, "NotificationManager") as notification_manager, \
+                mock.patch("builtins.print") as print_:
+            main.sweep(["asia", "europe", "africa"])
+
+        notification_manager.return_value.send_email.assert_called_once_with("asia deal\nafrica deal")
+        print_.assert_called_once_with("Error sweeping europe: Sheety is down")
+
+
+class PriceTrackerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.tracker = PriceTracker()
+        self.tracker.price_history = PriceHistory(os.path.join(self.directory, "history"))
+        self.tracker.update_destination = mock.Mock()
+        self.tracker.save_destination_data = mock.Mock()
+        self.tracker.link_shortener = mock.Mock(shorten_many=lambda links: {link: link for link in links})
+
+    def destination_data(self, origins, codes, lowest_price=1000):
+        return {
+            "departure_cities": origins,
+            "destinations": {
+                code: {"city": code, "iataCode": code, "lowestPrice": lowest_price} for code in codes
+            },
+        }
+
+    def sweep(self, itineraries, destination_data):
+        self.tracker.flight_searcher = kiwi_flight_search(self.directory, itineraries)
+        return self.tracker.find_lowest_prices("asia", destination_data, notify=False)
+
+    def test_zscore_ignores_the_sweeps_own_observations(self):
+        self.tracker.deal_thresholds = {"min_zscore": 2}
+        self.tracker.price_history.append(
+            "MEX-BKK", 800, date(2030, 1, 10), date(2030, 1, 20), observed_at=time.time() - 24 * 60 * 60
+        )
+        self.tracker.price_history.flush()
+
+        text = self.sweep([itinerary("MEX", "BKK", 300)], self.destination_data(["MEX"], ["BKK"]))
+
+        self.assertIn("$300", text)
+        self.tracker.update_destination.assert_called_once_with("asia", mock.ANY, "BKK", lowestPrice=300)
+
+    def test_destinations_are_searched_concurrently_and_reported_in_order(self):
+        itineraries = [itinerary("MEX", "BKK", 300), itinerary("MEX", "NRT", 400), itinerary("MEX", "SEL", 500)]
+        destination_data = self.destination_data(["MEX"], ["BKK", "NRT", "SEL"])
+        # Every search waits for the other two, so they only finish if they run at once.
+        all_started = threading.Barrier(3, timeout=5)
+        last_done = threading.Event()
+        order = []
+
+        def search_block(departure_cities, iata_codes, top_k=1):
+            all_started.wait()
+            if iata_codes == ["BKK"]:
+                last_done.wait(5)
+            flights = search_flights(departure_cities, iata_codes, 2)
+            order.append(iata_codes[0])
+            if len(order) == 2:
+                last_done.set()
+            return {pair: [flight] for pair, flight in flights.items()}
+
+        self.tracker.max_workers = 3
+        self.tracker.flight_searcher = kiwi_flight_search(self.directory, itineraries)
+        search_flights = self.tracker.flight_searcher.search_flights
+        self.tracker.search_block = search_block
+        text = self.tracker.find_lowest_prices("asia", destination_data, notify=False)
+
+        self.assertEqual(order[-1], "BKK")
+        self.assertLess(text.index("$300"), text.index("$400"))
+        self.assertLess(text.index("$400"), text.index("$500"))
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+
+from cache import PersistentCache
+from price_calendar import PriceCalendar, RouteCalendar
+from tests.support import itinerary, kiwi_flight_search
+
+
+class RouteCalendarTest(unittest.TestCase):
+    def test_cheapest_matches_a_scan_of_every_range(self):
+        start = date(2030, 1, 1)
+        prices = [np.inf, 300, 250, np.inf, 250, 400, 120, np.inf, 500, 130, 120]
+        calendar = RouteCalendar(start, prices)
+        for low in range(-2, len(prices) + 2):
+            for high in range(-2, len(prices) + 3):
+                window = [(price, day) for day, price in enumerate(prices) if max(low, 0) <= day < high]
+                best = min(window, default=(np.inf, None))
+                expected = None if np.isinf(best[0]) else (start + timedelta(days=best[1]), best[0])
+                got = calendar.cheapest(start + timedelta(days=low), start + timedelta(days=high))
+                self.assertEqual(got, expected, (low, high))
+
+    def test_cheapest_defaults_and_empty_calendars(self):
+        start = date(2030, 1, 1)
+        self.assertEqual(RouteCalendar(start, [300, 200, 200]).cheapest(), (date(2030, 1, 2), 200))
+        self.assertIsNone(RouteCalendar(start, [np.inf, np.inf]).cheapest())
+        self.assertIsNone(RouteCalendar(start, []).cheapest())
+
+    def test_json_round_trip(self):
+        calendar = RouteCalendar(date(2030, 1, 1), [np.inf, 300, 250])
+        restored = RouteCalendar.from_json(calendar.to_json())
+        self.assertEqual(restored.start, calendar.start)
+        self.assertEqual(restored.price_on(date(2030, 1, 1)), None)
+        self.assertEqual(restored.price_on(date(2030, 1, 3)), 250)
+
+
+class PriceCalendarTest(unittest.TestCase):
+    def test_build_searches_each_route_for_its_cheapest_flight_per_day(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        first_day = date.today() + timedelta(days=7)
+
+        def departing(fly_from, fly_to, price, days, hour="10:00"):
+            day = first_day + timedelta(days=days)
+            return itinerary(
+                fly_from, fly_to, price,
+                departure=f"{day.isoformat()}T{hour}:00.000Z",
+                arrival=f"{(day + timedelta(days=1)).isoformat()}T06:00:00.000Z",
+            )
+
+        itineraries = [
+            departing("MEX", "BKK", 700, 3),
+            departing("MEX", "BKK", 650, 3),
+            # A red-eye lands the next day but departs on day 10.
+            departing("MEX", "BKK", 600, 10, hour="23:30"),
+            departing("MEX", "NRT", 90, 10),
+            departing("GDL", "BKK", 400, 5),
+        ]
+        flight_search = kiwi_flight_search(directory.name, itineraries)
+        calendar = PriceCalendar(flight_search, cache=PersistentCache(os.path.join(directory.name, "calendars.json")))
+
+        calendars = calendar.build(["MEX", "GDL"], ["BKK", "NRT"])
+
+        searches = flight_search.http_client.searches
+        self.assertEqual(
+            sorted((search["fly_from"], search["fly_to"]) for search in searches),
+            [("GDL", "BKK"), ("GDL", "NRT"), ("MEX", "BKK"), ("MEX", "NRT")],
+        )
+        self.assertTrue(all(search["one_per_date"] == 1 for search in searches))
+        mex_bkk = calendars[("MEX", "BKK")]
+        self.assertEqual(mex_bkk.price_on(first_day + timedelta(days=3)), 650)
+        self.assertEqual(mex_bkk.price_on(first_day + timedelta(days=10)), 600)
+        self.assertIsNone(mex_bkk.price_on(first_day + timedelta(days=11)))
+        self.assertEqual(calendars[("GDL", "BKK")].cheapest(), (first_day + timedelta(days=5), 400))
+        self.assertNotIn(("GDL", "NRT"), calendars)
+
+        # Served from the cache afterwards.
+        self.assertEqual(
+            calendar.cheapest_day("MEX", "BKK", until=first_day + timedelta(days=5)),
+            (first_day + timedelta(days=3), 650),
+        )
+        self.assertEqual(len(searches), 4)
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+
+from flight_data import FlightData
+from price_history import PriceHistory
+
+
+class PriceHistoryTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = os.path.join(directory.name, "price_history")
+
+    def history(self, segment_size=3):
+        return PriceHistory(self.directory, segment_size=segment_size)
+
+    def append(self, history, route, prices, observed_at=1000):
+        for offset, price in enumerate(prices):
+            history.append(route, price, date(2030, 1, 10), date(2030, 1, 20), observed_at=observed_at + offset)
+
+    def test_observations_are_written_on_flush_across_segments(self):
+        history = self.history()
+        self.append(history, "MEX-BKK", [500, 450, 480, 470])
+        self.append(history, "MEX-NRT", [900, 880, 860])
+        self.assertEqual(len(history.prices("MEX-BKK")), 0)
+
+        history.flush()
+
+        self.assertEqual(history.prices("MEX-BKK").tolist(), [500, 450, 480, 470])
+        self.assertEqual(history.prices("MEX-NRT").tolist(), [900, 880, 860])
+        self.assertEqual(len(history._read_meta()["segments"]), 3)
+        self.assertEqual(sorted(history.routes()), ["MEX-BKK", "MEX-NRT"])
+
+    def test_prices_are_filtered_by_observation_time(self):
+        history = self.history()
+        self.append(history, "MEX-BKK", [500, 450, 480, 470], observed_at=1000)
+        history.flush()
+        self.assertEqual(history.prices("MEX-BKK", since=1001, until=1003).tolist(), [450, 480])
+        self.assertEqual(len(history.prices("GDL-BKK")), 0)
+
+    def test_stats_summarise_a_route(self):
+        history = self.history()
+        self.append(history, "MEX-BKK", range(100, 1100, 100))
+        history.flush()
+
+        stats = history.stats("MEX-BKK", percentiles=(10, 90))
+
+        self.assertEqual((stats["count"], stats["min"], stats["median"], stats["max"]), (10, 100, 550, 1000))
+        self.assertEqual(stats["percentiles"], {10: 190, 90: 910})
+        self.assertIsNone(history.stats("GDL-BKK"))
+
+    def test_moments_match_numpy_for_every_route(self):
+        history = self.history(segment_size=4)
+        samples = {"MEX-BKK": [500, 450, 480, 470, 510], "MEX-NRT": [900, 880], "GDL-BKK": [620]}
+        for route, prices in samples.items():
+            self.append(history, route, prices)
+        history.flush()
+
+        mean, std, count = history.moments(["MEX-NRT", "GDL-NRT", "MEX-BKK", "GDL-BKK"])
+
+        self.assertEqual(count.tolist(), [2, 0, 5, 1])
+        observed = [samples[route] for route in ("MEX-NRT", "MEX-BKK", "GDL-BKK")]
+        np.testing.assert_allclose(mean[[0, 2, 3]], [np.mean(prices) for prices in observed])
+        np.testing.assert_allclose(std[[0, 2, 3]], [np.std(prices) for prices in observed])
+        self.assertTrue(np.isnan(mean[1]) and np.isnan(std[1]))
+
+    def test_moments_exclude_observations_outside_the_window(self):
+        history = self.history()
+        self.append(history, "MEX-BKK", [500, 450, 480], observed_at=1000)
+        history.flush()
+        mean, _, count = history.moments(["MEX-BKK"], until=1002)
+        self.assertEqual((mean.tolist(), count.tolist()), ([475], [2]))
+
+    def test_histories_sharing_a_directory_append_to_the_same_store(self):
+        first, second = self.history(), self.history()
+        self.append(first, "MEX-BKK", [500])
+        first.flush()
+        self.append(second, "MEX-NRT", [900])
+        self.append(second, "MEX-BKK", [450], observed_at=2000)
+        second.flush()
+
+        self.assertEqual(first.prices("MEX-BKK").tolist(), [500, 450])
+        self.assertEqual(first.prices("MEX-NRT").tolist(), [900])
+
+    def test_flights_are_recorded_per_route(self):
+        history = self.history()
+        flight = FlightData(
+            "MEX", "BKK", "Mexico City", "Bangkok", 640, "2030-01-10T23:30:00.000Z", "2030-01-20T18:00:00.000Z",
+            None, "AM", "https://example.com", 1,
+        )
+        history.append_flights({"MEX-BKK": flight}, observed_at=1000)
+        history.flush()
+
+        self.assertEqual(history.prices("MEX-BKK").tolist(), [640])
+        departure = (date(2030, 1, 10) - date(1970, 1, 1)).days
+        self.assertEqual(history._select("MEX-BKK", None, None, "departure").tolist(), [departure])
+        self.assertEqual(history._select("MEX-BKK", None, None, "stopovers").tolist(), [1])
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from email.utils import formatdate
+from unittest import mock
+
+from rate_limiter import RateLimiter
+from tests.support import FakeKiwiResponse, kiwi_flight_search
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "rate.json")
+        self.now = 1000.0
+        self.sleeps = []
+        for target, replacement in (("rate_limiter.time.time", lambda: self.now), ("rate_limiter.time.sleep", self.sleep)):
+            patcher = mock.patch(target, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def limiter(self, **kwargs):
+        return RateLimiter(path=self.path, **kwargs)
+
+    def test_calls_beyond_the_burst_wait_for_a_token(self):
+        limiter = self.limiter(max_rate=2, burst=3)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(self.sleeps, [0.5])
+
+    def test_the_bucket_is_shared_through_its_file(self):
+        self.limiter(max_rate=1, burst=1).acquire()
+        self.limiter(max_rate=1, burst=1).acquire()
+        self.assertEqual(self.sleeps, [1.0])
+
+    def test_throttling_halves_the_rate_and_pauses_for_retry_after(self):
+        limiter = self.limiter(max_rate=4, burst=4)
+        limiter.on_throttled("30")
+
+        stats = limiter.stats()
+        self.assertEqual((stats["rate"], stats["tokens"], stats["blocked_for"]), (2, 0, 30))
+        limiter.acquire()
+        self.assertEqual(self.sleeps, [30])
+
+    def test_retry_after_is_read_as_an_http_date(self):
+        limiter = self.limiter()
+        limiter.on_throttled(formatdate(self.now + 120, usegmt=True))
+        self.assertEqual(limiter.stats()["blocked_for"], 120)
+
+    def test_throttling_without_retry_after_waits_one_interval(self):
+        limiter = self.limiter(max_rate=1, min_rate=0.25)
+        for _ in range(3):
+            limiter.on_throttled()
+        self.assertEqual(limiter.stats()["rate"], 0.25)
+        self.assertEqual(limiter.stats()["blocked_for"], 4)
+
+    def test_successful_calls_grow_the_rate_back(self):
+        limiter = self.limiter(max_rate=10, recovery=0.1)
+        limiter.on_throttled("0")
+        for expected in (6, 7, 8, 9, 10, 10):
+            limiter.on_success()
+            self.assertEqual(limiter.stats()["rate"], expected)
+
+    def test_throttled_calls_are_retried_through_the_limiter(self):
+        flight_search = kiwi_flight_search(os.path.dirname(self.path), [])
+        throttled = FakeKiwiResponse([])
+        throttled.status_code = 429
+        throttled.headers = {"Retry-After": "2"}
+        flight_search.http_client.get = mock.Mock(side_effect=[throttled, FakeKiwiResponse([])])
+
+        response = flight_search._get(flight_search.SEARCH, {})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(flight_search.http_client.get.call_count, 2)
+        self.assertEqual(self.sleeps, [2])
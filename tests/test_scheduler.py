@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from cache import PersistentCache
+from scheduler import RouteScheduler
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+class RouteSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.now = 1_000_000.0
+        for target in ("scheduler.time.time", "cache.time.time"):
+            patcher = mock.patch(target, lambda: self.now)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.scheduler = RouteScheduler(
+            PersistentCache(os.path.join(directory.name, "route_schedule.json")),
+            min_interval=6 * HOUR,
+            max_interval=14 * DAY,
+            sensitivity=50.0,
+            smoothing=0.5,
+        )
+
+    def test_routes_never_checked_come_first(self):
+        self.scheduler.record({"MEX-BKK": 500})
+        self.now += 30 * DAY
+        self.assertEqual(self.scheduler.select(["MEX-BKK", "MEX-NRT"], budget=2), ["MEX-NRT", "MEX-BKK"])
+        self.assertEqual(self.scheduler.priority("MEX-NRT"), float("inf"))
+
+    def test_stable_routes_wait_for_the_longest_interval(self):
+        self.scheduler.record({"MEX-BKK": 500})
+        self.now += DAY
+        self.scheduler.record({"MEX-BKK": 500})
+
+        self.now += 13 * DAY
+        self.assertEqual(self.scheduler.select(["MEX-BKK"], budget=1), [])
+        self.now += DAY
+        self.assertEqual(self.scheduler.select(["MEX-BKK"], budget=1), ["MEX-BKK"])
+
+    def test_volatile_routes_are_refreshed_sooner(self):
+        self.scheduler.record({"MEX-BKK": 500, "MEX-NRT": 900})
+        self.now += HOUR
+        self.scheduler.record({"MEX-BKK": 600, "MEX-NRT": 900})
+
+        volatility = self.scheduler.state.get("MEX-BKK")["volatility"]
+        self.assertAlmostEqual(volatility, 0.1)
+        self.assertAlmostEqual(self.scheduler.interval({"volatility": volatility}), 14 * DAY / 6)
+        self.now += 3 * DAY
+        self.assertEqual(self.scheduler.select(["MEX-NRT", "MEX-BKK"], budget=2), ["MEX-BKK"])
+
+    def test_intervals_stay_within_bounds(self):
+        self.assertEqual(self.scheduler.interval({"volatility": 0.0}), 14 * DAY)
+        self.assertEqual(self.scheduler.interval({"volatility": 100.0}), 6 * HOUR)
+
+    def test_the_budget_keeps_the_most_overdue_routes(self):
+        for route in ("MEX-BKK", "MEX-NRT", "MEX-SEL"):
+            self.scheduler.record({route: 500})
+            self.now += DAY
+        self.now += 14 * DAY
+
+        self.assertEqual(self.scheduler.select(["MEX-SEL", "MEX-NRT", "MEX-BKK"], budget=2), ["MEX-BKK", "MEX-NRT"])
+
+    def test_routes_not_yet_due_fill_a_spare_budget_on_request(self):
+        self.scheduler.record({"MEX-BKK": 500})
+        self.now += DAY
+        self.assertEqual(self.scheduler.select(["MEX-BKK"], budget=1), [])
+        self.assertEqual(self.scheduler.select(["MEX-BKK"], budget=1, due_only=False), ["MEX-BKK"])
+
+    def test_routes_without_flights_keep_their_last_price(self):
+        self.scheduler.record({"MEX-BKK": 500})
+        self.now += DAY
+        self.scheduler.record({"MEX-BKK": None})
+
+        route_state = self.scheduler.state.get("MEX-BKK")
+        self.assertEqual((route_state["last_price"], route_state["last_checked"]), (500, self.now))
+        self.assertEqual(route_state["volatility"], 0.0)